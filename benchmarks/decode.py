@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Compares the size of each output format for a large aggregate, and how long
+it takes to decode in Python.  As with benchmarks/output.py, the aggregate
+is a synthetic one shaped like real output.  The msgpack and cbor formats
+need the msgpack and cbor2 packages.
+
+    python benchmarks/decode.py
+"""
+
+import gc
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from burger.output import create_writer, read_msgpack
+
+def make_aggregate(scale=8000):
+    random.seed(1)
+    return {
+        "blocks": {"block": {"b%d" % i: {
+            "hardness": random.random() * 10,
+            "text_id": "b%d" % i,
+            "states": [{
+                "name": random.choice(["facing", "waterlogged", "powered", "half", "axis"]),
+                "type": "enum",
+                "values": ["north", "south", "east", "west"],
+            } for j in range(4)],
+        } for i in range(scale)}},
+        "packets": {"packet": {"p%d" % i: {
+            "instructions": [{
+                "operation": "write",
+                "type": random.choice(["varint", "string", "boolean", "long"]),
+                "field": "f%d" % j,
+            } for j in range(30)],
+        } for i in range(scale // 13)}},
+        "items": {"item": {"i%d" % i: {
+            "text_id": "i%d" % i,
+            "max_stack_size": 64,
+            "class": "net/minecraft/world/item/Item",
+        } for i in range(scale // 5)}},
+    }
+
+def best_of(function, runs=5):
+    best = None
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    aggregate = make_aggregate()
+    formats = [("json", False), ("json", True), ("msgpack", False), ("cbor", False)]
+    for format, compact in formats:
+        output = io.StringIO() if format == "json" else io.BytesIO()
+        try:
+            writer = create_writer(format, output, compact)
+        except Exception as e:
+            print("%-15s skipped: %s" % (format, e))
+            continue
+        writer.write(aggregate)
+        writer.close()
+        data = output.getvalue()
+
+        if format == "json":
+            decode = lambda: json.loads(data)
+        elif format == "msgpack":
+            decode = lambda: list(read_msgpack(io.BytesIO(data)))
+        else:
+            import cbor2
+            decode = lambda: cbor2.loads(data)
+        label = format + (" --compact" if compact else "")
+        print("%-15s %6.2f MB  decode %.3fs" % (label, len(data) / 1e6, best_of(decode)))
+
+if __name__ == "__main__":
+    main()
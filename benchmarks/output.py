@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Times writing a large aggregate with JsonWriter against dumping a rounded
+copy of it (what munch.py did before RoundedFloatEncoder), reporting the
+wall time and peak RSS growth of each.  No jar is needed; the aggregate is
+a synthetic one shaped like real output (blocks with float properties,
+packet instruction lists and entity metadata).
+
+Each measurement runs in a fresh process, so that peak RSS isn't shared:
+
+    python benchmarks/output.py
+"""
+
+import os
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from burger.output import JsonWriter
+from burger.roundedfloats import transform_floats
+
+def make_aggregate(scale=8000):
+    random.seed(1)
+    return {
+        "blocks": {"block": {"b%d" % i: {
+            "hardness": random.random() * 10,
+            "resistance": random.random(),
+            "text_id": "b%d" % i,
+            "states": [{"name": "s%d" % j, "type": "int", "values": list(range(8))} for j in range(4)],
+        } for i in range(scale)}},
+        "packets": {"packet": {"p%d" % i: {
+            "instructions": [{"operation": "write", "type": "varint", "field": "f%d" % j} for j in range(30)],
+        } for i in range(scale // 13)}},
+        "entities": {"entity": {"e%d" % i: {
+            "width": random.random(),
+            "height": random.random(),
+            "metadata": [{"index": j, "default": random.random()} for j in range(10)],
+        } for i in range(scale // 20)}},
+    }
+
+def measure(method, compact):
+    aggregate = make_aggregate()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open(os.devnull, "w") as output:
+        if method == "copy":
+            if compact:
+                json.dump(transform_floats([aggregate]), output)
+            else:
+                json.dump(transform_floats([aggregate]), output, sort_keys=True, indent=4)
+        else:
+            writer = JsonWriter(output, compact)
+            writer.write(aggregate)
+            writer.close()
+    elapsed = time.perf_counter() - start
+    growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024.0
+    print("%-7s %-9s %.2fs  peak RSS +%.1f MB" % (method, "compact" if compact else "indented", elapsed, growth))
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        measure(sys.argv[1], sys.argv[2] == "compact")
+    else:
+        for compact in ("indented", "compact"):
+            for method in ("copy", "writer"):
+                subprocess.check_call([sys.executable, __file__, method, compact])
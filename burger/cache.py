@@ -0,0 +1,163 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import types
+
+from importlib.metadata import version
+
+_jar_hashes = {}
+
+def jar_hash(path):
+    """
+    Returns the SHA-1 of the given file, which matches the hash given for
+    client jars in the version manifest.  The result is remembered for as long
+    as the file's size and modification time don't change.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    if key not in _jar_hashes:
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as fin:
+            for block in iter(lambda: fin.read(1024 * 1024), b""):
+                sha1.update(block)
+        _jar_hashes[key] = sha1.hexdigest()
+    return _jar_hashes[key]
+
+def source_fingerprint(*module_names):
+    """
+    Returns a hash of the source code of the given (already imported) modules,
+    along with the Jawa version, so that cached results are discarded whenever
+    the code that produced them changes.
+    """
+    sha1 = hashlib.sha1(version("jawa").encode("utf-8"))
+    for name in module_names:
+        with open(sys.modules[name].__file__, "rb") as fin:
+            sha1.update(fin.read())
+    return sha1.hexdigest()
+
+def topping_fingerprint(topping):
+    """
+    Returns a hash of the source of the module a topping is defined in, and of
+    every other Burger module that it (transitively) uses.
+    """
+    names = set()
+    pending = [topping.__module__]
+    while pending:
+        name = pending.pop()
+        if name in names:
+            continue
+        names.add(name)
+        for value in vars(sys.modules[name]).values():
+            if isinstance(value, types.ModuleType):
+                other = value.__name__
+            else:
+                other = getattr(value, "__module__", None)
+            if isinstance(other, str) and other.startswith("burger.") and other in sys.modules:
+                pending.append(other)
+    return source_fingerprint(*sorted(names))
+
+def run_key(jar, topping, dependency_keys):
+    """
+    Returns the key that a topping's result is stored under: the jar, the
+    topping's code and options, and the keys of the runs that provided its
+    dependencies.
+    """
+    sha1 = hashlib.sha1(jar.encode("utf-8"))
+    sha1.update(topping_fingerprint(topping).encode("utf-8"))
+    options = getattr(topping, "OPTIONS", ())
+    if options:
+        sha1.update(repr([(name, getattr(topping, name)) for name in options]).encode("utf-8"))
+    for key in sorted(set(dependency_keys)):
+        sha1.update(key.encode("utf-8"))
+    return sha1.hexdigest()
+
+def modified_keys(topping):
+    """
+    Returns the top-level keys of the aggregate that a topping may change:
+    the first part of everything it PROVIDES (with "identify" standing for
+    "classes"), and anything listed in its MODIFIES.
+    """
+    keys = set(topping.MODIFIES)
+    for provides in topping.PROVIDES:
+        key = provides.split(".", 1)[0]
+        keys.add("classes" if key == "identify" else key)
+    return keys
+
+# Markers used in patches produced by diff()
+_DELETED = "deleted"
+_REPLACED = "replaced"
+_PATCHED = "patched"
+
+def diff(before, after):
+    """
+    Computes the changes a topping made to the aggregate, as a patch that
+    can be re-applied with apply_patch().  Nested dictionaries are compared
+    recursively; anything else is replaced outright if it changed.
+    """
+    patch = {}
+    for key in before:
+        if key not in after:
+            patch[key] = (_DELETED, None)
+    for key, value in after.items():
+        if key not in before:
+            patch[key] = (_REPLACED, value)
+        elif isinstance(value, dict) and isinstance(before[key], dict):
+            sub_patch = diff(before[key], value)
+            if sub_patch:
+                patch[key] = (_PATCHED, sub_patch)
+        elif before[key] != value or type(before[key]) is not type(value):
+            patch[key] = (_REPLACED, value)
+    return patch
+
+def apply_patch(target, patch):
+    """
+    Applies a patch produced by diff().  The target doesn't need to be the
+    same dictionary the patch was computed from, as long as the changes made
+    to it since don't overlap with the patch.
+    """
+    for key, (action, value) in patch.items():
+        if action == _DELETED:
+            target.pop(key, None)
+        elif action == _REPLACED:
+            target[key] = value
+        else:
+            apply_patch(target.setdefault(key, {}), value)
+
+class ResultCache(object):
+    """
+    Stores results on disk, grouped by the jar they were produced from and
+    keyed by a fingerprint of whatever else they depend on.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, jar, name, fingerprint):
+        return os.path.join(self.directory, jar, "%s-%s.pickle" % (name, fingerprint))
+
+    def load(self, jar, name, fingerprint):
+        """Returns the stored result, or None if there isn't one."""
+        try:
+            with open(self._path(jar, name, fingerprint), "rb") as fin:
+                return pickle.load(fin)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def store(self, jar, name, fingerprint, value):
+        path = self._path(jar, name, fingerprint)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        # Write to a temporary file first so that an interrupted (or
+        # concurrent) run never leaves a partial result behind
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fout:
+                pickle.dump(value, fout, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,375 @@
+import copy
+import hashlib
+import re
+from struct import unpack_from
+
+from burger.cache import ResultCache
+from burger.hierarchy import _CONSTANT_SIZES, _CONSTANT_UTF8, _WIDE_CONSTANTS
+
+from jawa.util.utf import decode_modified_utf8
+
+# Number of results remembered for each root class, e.g. one per jar that
+# has a different version of the classes it depends on
+MAX_CANDIDATES = 8
+
+# Obfuscated class names are replaced with these in hashes and stored results
+_PLACEHOLDER = "\x00%d\x00"
+_PLACEHOLDER_RE = re.compile("\x00(\\d+)\x00")
+_TOKEN_RE = re.compile(r"[\w$/]+")
+
+class _Unreplayable(Exception):
+    """Raised when a result refers to a class that a later jar can't find again."""
+    pass
+
+class _Normalizer(object):
+    """
+    Renames the obfuscated classes of a jar (those in the default package)
+    to placeholders numbered in the order they are first seen, so that two
+    jars that differ only in how their classes were named produce the same
+    hashes and results.
+
+    Names are replaced wherever they appear as a whole token (so "abc",
+    "Labc;" and "abc.a" all refer to class abc, but "net/minecraft/abc" does
+    not).  That includes field and method names that happen to be the same
+    as a class's name (such as a field "a" when there is a class "a"); they
+    are numbered along with the classes, so another jar only matches if its
+    names coincide in the same places, and restoring a result renames them
+    consistently.
+    """
+
+    def __init__(self, classloader, obfuscated):
+        self.classloader = classloader
+        self.obfuscated = obfuscated
+        self.placeholders = {}
+        self.names = []
+        self.frozen = False
+
+    def copy(self):
+        other = copy.copy(self)
+        other.placeholders = dict(self.placeholders)
+        other.names = list(self.names)
+        return other
+
+    def _replace(self, match):
+        token = match.group()
+        if token in self.obfuscated:
+            return self.placeholder(token)
+        if token[0] == "L" and token[1:] in self.obfuscated and match.string.startswith(";", match.end()):
+            return "L" + self.placeholder(token[1:])
+        return token
+
+    def placeholder(self, name):
+        try:
+            return _PLACEHOLDER % self.placeholders[name]
+        except KeyError:
+            if self.frozen:
+                raise _Unreplayable(name)
+            self.placeholders[name] = len(self.names)
+            self.names.append(name)
+            return _PLACEHOLDER % self.placeholders[name]
+
+    def text(self, text):
+        return _TOKEN_RE.sub(self._replace, text)
+
+    def value(self, value):
+        """Returns a copy of value with every string in it normalized."""
+        return _map_strings(value, self.text)
+
+    def resolve(self, text):
+        """The reverse of text(), for a jar whose names have already been seen."""
+        def replace(match):
+            index = int(match.group(1))
+            if index >= len(self.names):
+                raise _Unreplayable(text)
+            return self.names[index]
+        return _PLACEHOLDER_RE.sub(replace, text)
+
+    def restore(self, value):
+        return _map_strings(value, self.resolve)
+
+    def class_hash(self, name):
+        """
+        Returns a hash of the given class's bytes with obfuscated names
+        normalized, or None if it isn't in the jar.
+        """
+        path = name + ".class"
+        if path not in self.classloader.path_map:
+            return None
+        try:
+            with self.classloader.open(path) as fin:
+                data = fin.read()
+        except NotImplementedError:
+            # Already-loaded ClassFiles added directly as a source
+            raise _Unreplayable(name)
+
+        sha1 = hashlib.sha1()
+        count = unpack_from(">H", data, 8)[0]
+        sha1.update(data[:10])
+        offset = 10
+        index = 1
+        while index < count:
+            tag = data[offset]
+            if tag == _CONSTANT_UTF8:
+                length = unpack_from(">H", data, offset + 1)[0]
+                raw = data[offset + 3:offset + 3 + length]
+                try:
+                    value = raw.decode("utf8")
+                except UnicodeDecodeError:
+                    value = decode_modified_utf8(raw)
+                normalized = self.text(value).encode("utf8", "surrogatepass")
+                sha1.update(b"\x01%d:" % len(normalized))
+                sha1.update(normalized)
+                offset += 3 + length
+            else:
+                size = 1 + _CONSTANT_SIZES[tag]
+                sha1.update(data[offset:offset + size])
+                offset += size
+            index += 2 if tag in _WIDE_CONSTANTS else 1
+        sha1.update(data[offset:])
+        return sha1.hexdigest()
+
+def _map_strings(value, function):
+    """Returns a copy of value with function applied to every string in it."""
+    if isinstance(value, str):
+        return function(value)
+    elif isinstance(value, list):
+        return [_map_strings(v, function) for v in value]
+    elif isinstance(value, tuple):
+        return tuple(_map_strings(v, function) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return type(value)(_map_strings(v, function) for v in value)
+    elif isinstance(value, dict):
+        return {_map_strings(k, function): _map_strings(v, function) for k, v in value.items()}
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        other = copy.copy(value)
+        other.__dict__ = _map_strings(value.__dict__, function)
+        return other
+    return value
+
+class _RecordingMapping(object):
+    """
+    Wraps a mapping (such as aggregate["classes"]) to record which keys are
+    looked up, and what was found, alongside the classes being read.  Keys
+    that are set are written through to the mapping and recorded too, so
+    that reusing the result sets them again.
+    """
+
+    def __init__(self, mapping, classloader):
+        self.mapping = mapping
+        self.classloader = classloader
+
+    def get(self, key, default=None):
+        value = self.mapping.get(key)
+        for events in self.classloader.recorders:
+            events.append(("key", key, value))
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, value):
+        self.mapping[key] = value
+        for events in self.classloader.recorders:
+            events.append(("set", key, value))
+
+def replay_reads(classloader, events, lookups=None):
+    """
+    Repeats the reads recorded by classloader.record_reads() (and the
+    lookups made through a ClassAnalysisCache), for code that reuses
+    something it computed earlier, so that any analyses currently being
+    recorded depend on them too.  Keys that were set in lookups are set
+    again.
+    """
+    for event in events:
+        if event[0] == "class":
+            classloader.note_read(event[1])
+        elif lookups is None:
+            continue
+        elif event[0] == "set":
+            lookups[event[1]] = event[2]
+        else:
+            lookups.get(event[1])
+
+class ClassAnalysisCache(object):
+    """
+    Remembers the result of analysing individual classes, both for the rest
+    of the run and, if the classloader has a cache_dir, on disk for later
+    runs on other jars.
+
+    Results on disk are keyed by a hash of the analysed class's bytes (with
+    obfuscated class names normalized), the code doing the analysis, and the
+    context it is given.  Along with each result, the other classes it read
+    (e.g. superclasses or called methods) and the entries it looked up in
+    lookups are stored, and a result is only reused if all of those are also
+    unchanged, apart from their names.  Class names in the result are then
+    renamed to match the new jar.  Between adjacent versions most classes are
+    only renamed, so only the ones whose code actually changed need to be
+    analysed again.
+
+    name: the name of the analysis
+    fingerprint: a hash of the code doing the analysis (see source_fingerprint)
+    context: strings (or lists, dicts, etc. of them) that the analysis depends on
+    """
+
+    def __init__(self, classloader, name, fingerprint, context=()):
+        self.classloader = classloader
+        self.name = name
+        self.memory = {}
+
+        cache_dir = getattr(classloader, "cache_dir", None)
+        if cache_dir is None or not hasattr(classloader, "record_reads"):
+            self.disk = None
+            return
+        self.disk = ResultCache(cache_dir)
+
+        memo = classloader.memo("classcache.obfuscated", 1)
+        obfuscated = memo.get("obfuscated")
+        if obfuscated is None:
+            obfuscated = frozenset(path[:-len(".class")] for path in classloader.path_map
+                                   if path.endswith(".class") and "/" not in path)
+            memo["obfuscated"] = obfuscated
+        self.obfuscated = obfuscated
+        self.fingerprint = fingerprint
+        self.context = context
+
+    def _normalizer(self):
+        normalizer = _Normalizer(self.classloader, self.obfuscated)
+        context = normalizer.value(self.context)
+        return normalizer, context
+
+    def _root_key(self, normalizer, context, class_name):
+        root = normalizer.text(class_name)
+        sha1 = hashlib.sha1(self.fingerprint.encode("utf-8"))
+        sha1.update(repr((context, root, normalizer.class_hash(class_name))).encode("utf-8"))
+        return sha1.hexdigest()
+
+    def get(self, class_name, compute, lookups=None):
+        """
+        Returns the result of analysing the given class, calling
+        compute(lookups) if it isn't known yet.  The analysis should only
+        read classes through the classloader, and only use lookups (which is
+        wrapped to record what is looked up, and what is set in it) for
+        anything else that depends on the jar.
+        """
+        if class_name in self.memory:
+            result, events = self.memory[class_name]
+            replay_reads(self.classloader, events, lookups)
+            return result
+
+        if self.disk is None:
+            result = compute(lookups)
+            self.memory[class_name] = (result, ())
+            return result
+
+        try:
+            normalizer, context = self._normalizer()
+            root_key = self._root_key(normalizer, context, class_name)
+        except _Unreplayable:
+            result = compute(lookups)
+            self.memory[class_name] = (result, ())
+            return result
+
+        candidates = self.disk.load("classes", self.name, root_key) or []
+        for trace, stored in candidates:
+            found = self._check(normalizer.copy(), trace, stored, lookups)
+            if found is not None:
+                result, events = found
+                replay_reads(self.classloader, [event for event in events if event[0] != "key"], lookups)
+                self.memory[class_name] = (result, events)
+                return result
+
+        if lookups is not None and not isinstance(lookups, _RecordingMapping):
+            lookups = _RecordingMapping(lookups, self.classloader)
+        events = []
+        with self.classloader.record_reads(events):
+            result = compute(lookups)
+        self.memory[class_name] = (result, events)
+
+        try:
+            trace, stored = self._trace(normalizer, class_name, events, result)
+        except _Unreplayable:
+            return result
+        candidates = [candidate for candidate in candidates if candidate[0] != trace]
+        candidates.insert(0, (trace, stored))
+        self.disk.store("classes", self.name, root_key, candidates[:MAX_CANDIDATES])
+        return result
+
+    def _trace(self, normalizer, class_name, events, result):
+        """
+        Converts the events recorded while analysing a class into a form
+        that can be checked against another jar.
+        """
+        trace = []
+        seen = set([class_name])
+        for event in events:
+            if event[0] == "class":
+                name = event[1]
+                if name in seen:
+                    continue
+                seen.add(name)
+                # The class must have been found through something already
+                # seen, or another jar won't be able to find it again
+                normalizer.frozen = True
+                normalized = normalizer.text(name)
+                normalizer.frozen = False
+                trace.append(("class", normalized, normalizer.class_hash(name)))
+            else:
+                kind, key, value = event
+                trace.append((kind, key, normalizer.value(value)))
+        normalizer.frozen = True
+        return tuple(trace), normalizer.value(result)
+
+    def _check(self, normalizer, trace, stored, lookups):
+        """
+        Checks whether a stored result applies to this jar, returning it
+        (renamed for this jar) along with the events it stands for if so.
+        """
+        events = []
+        # Keys the analysis set, which it would see when looking them up again
+        written = {}
+        try:
+            for event in trace:
+                if event[0] == "class":
+                    _, normalized, class_hash = event
+                    name = normalizer.resolve(normalized)
+                    if normalizer.class_hash(name) != class_hash:
+                        return None
+                    events.append(("class", name))
+                elif event[0] == "set":
+                    _, key, value = event
+                    written[key] = normalizer.restore(value)
+                    events.append(("set", key, written[key]))
+                else:
+                    _, key, value = event
+                    if key in written:
+                        actual = written[key]
+                    else:
+                        actual = lookups.get(key) if lookups is not None else None
+                    if normalizer.value(actual) != value:
+                        return None
+                    events.append(("key", key, actual))
+            normalizer.frozen = True
+            return normalizer.restore(stored), events
+        except _Unreplayable:
+            return None
+
+def class_analysis_cache(classloader, name, fingerprint, context=()):
+    """
+    Returns the ClassAnalysisCache with the given name for the jar the
+    classloader reads from, creating it the first time.  The context must be
+    the same for every use within a jar.
+    """
+    if not hasattr(classloader, "memo"):
+        return ClassAnalysisCache(classloader, name, fingerprint, context)
+    memo = classloader.memo("classcache", 0)
+    cache = memo.get(name)
+    if cache is None:
+        cache = ClassAnalysisCache(classloader, name, fingerprint, context)
+        memo[name] = cache
+    return cache
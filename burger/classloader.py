@@ -0,0 +1,263 @@
+import io
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from itertools import repeat
+
+from jawa.classloader import ClassLoader
+
+from burger.jarfile import MappedJar, UnsupportedJar, open_jar
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "currsize", "maxsize"])
+
+# Default amount of class file data (in bytes) that is kept parsed in memory.
+# Parsed ClassFiles are considerably larger than the raw class file, but the
+# raw size is a cheap and stable proxy for the relative cost of each entry.
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+class LRUCache(object):
+    """
+    A mapping that holds at most maxsize entries, discarding the least
+    recently used ones first.  A maxsize of 0 means no limit.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if self.maxsize > 0:
+            while len(self.entries) > self.maxsize:
+                key, _ = self.entries.popitem(last=False)
+                self.evictions += 1
+                self._evicted(key)
+
+    def _evicted(self, key):
+        pass
+
+    def clear(self):
+        self.entries.clear()
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self.entries), self.maxsize)
+
+class ClassMemo(LRUCache):
+    """
+    An LRUCache for results that refer to a class's ClassFile (such as
+    instructions, whose constants hold the class's whole constant pool).  Keys
+    are tuples starting with the class name; discard_class() drops every
+    entry for a class, which the classloader does when it evicts that class,
+    so that these don't keep it alive outside of the memory budget.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.keys_by_class = {}
+
+    def __setitem__(self, key, value):
+        self.keys_by_class.setdefault(key[0], set()).add(key)
+        super().__setitem__(key, value)
+
+    def _evicted(self, key):
+        keys = self.keys_by_class[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self.keys_by_class[key[0]]
+
+    def discard_class(self, name):
+        for key in self.keys_by_class.pop(name, ()):
+            del self.entries[key]
+
+    def clear(self):
+        super().clear()
+        self.keys_by_class.clear()
+
+class BurgerClassLoader(ClassLoader):
+    """
+    A ClassLoader whose parsed ClassFile cache is bounded by an approximate
+    memory budget instead of a number of entries, evicting the least recently
+    used classes first.
+
+    Jawa's ClassLoader treats max_cache=0 as an unlimited cache, which means
+    every class that is ever touched stays alive for the rest of the run.  Jawa's
+    own bounded mode counts entries, which is a poor fit when a handful of
+    huge registration classes sit next to thousands of tiny ones.
+
+    Jars are memory-mapped (see burger.jarfile) instead of being read through
+    a ZipFile, falling back to jawa's ZipFile handling for any that can't be.
+
+    max_cache_bytes: the budget, measured in raw class file bytes.  0 disables
+                     eviction entirely.
+    cache_dir: directory that per-jar indexes may be stored in, or None
+    """
+
+    def __init__(self, *sources, max_cache_bytes=DEFAULT_CACHE_SIZE, cache_dir=None, **kwargs):
+        self.sources = sources
+        self.max_cache_bytes = max_cache_bytes
+        self.cache_dir = cache_dir
+        self.cache_sizes = {}
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # CPU time used by worker processes on this classloader's behalf
+        # (e.g. identify with --jobs), for --profile
+        self.worker_cpu_time = 0.0
+        self.memos = {}
+        self.recorders = []
+        # max_cache is unused since eviction is handled here
+        super().__init__(*sources, max_cache=0, **kwargs)
+
+    def __reduce__(self):
+        # Pickling a classloader (e.g. to send it to a worker process) re-opens
+        # the same sources on the other side, with an empty cache.
+        assert all(isinstance(source, str) for source in self.sources)
+        return (_reopen, (self.sources, self.max_cache_bytes, self.cache_dir, self.klass, self.bytecode_transforms))
+
+    def reopen(self):
+        """
+        Returns a new classloader for the same sources, with its own file
+        handles and an empty cache.  A forked process must use this instead of
+        the classloader it inherited, as the underlying zip file handle (and
+        its file position) would otherwise be shared between processes.
+        Memory-mapped jars have no such state, so the new classloader reuses
+        their mapping and index instead of opening them again.
+        """
+        return _reopen(*self.__reduce__()[1])
+
+    def update(self, *sources, **kwargs):
+        for source in sources:
+            if isinstance(source, str) and source.lower().endswith((".zip", ".jar")):
+                try:
+                    jar = open_jar(source)
+                except UnsupportedJar:
+                    pass
+                else:
+                    self.path_map.update(zip(jar.names, repeat(jar)))
+                    continue
+            super().update(source, **kwargs)
+
+    @contextmanager
+    def open(self, path, mode="r"):
+        entry = self.path_map.get(path)
+        if isinstance(entry, MappedJar):
+            yield io.BytesIO(entry.read(path))
+        else:
+            with super().open(path, mode) as source:
+                yield source
+
+    def read(self, path):
+        """Returns the contents of the given file."""
+        entry = self.path_map.get(path)
+        if isinstance(entry, MappedJar):
+            return entry.read(path)
+        with self.open(path) as fin:
+            return fin.read()
+
+    def load(self, path):
+        if self.recorders:
+            self.note_read(path)
+        try:
+            r = self.class_cache.pop(path)
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            with self.open(path + ".class") as source:
+                r = self.klass(source)
+                size = source.tell()
+            self.cache_sizes[path] = size
+            self.cache_bytes += size
+
+        r.classloader = self
+        # Re-insert to mark this class as the most recently used one
+        self.class_cache[path] = r
+
+        if self.max_cache_bytes > 0:
+            # Never evict the class that was just requested
+            while self.cache_bytes > self.max_cache_bytes and len(self.class_cache) > 1:
+                evicted, _ = self.class_cache.popitem(last=False)
+                self.cache_bytes -= self.cache_sizes.pop(evicted, 0)
+                self.evictions += 1
+                for memo in self.memos.values():
+                    if isinstance(memo, ClassMemo):
+                        memo.discard_class(evicted)
+
+        return r
+
+    def clear(self):
+        super().clear()
+        self.cache_sizes.clear()
+        self.cache_bytes = 0
+        for memo in self.memos.values():
+            memo.clear()
+
+    def memo(self, name, maxsize):
+        """
+        Returns the LRUCache with the given name, creating it if needed.
+        These are used by toppings to remember results that are specific to
+        this jar; they are discarded along with the classloader, so nothing
+        computed for one jar can leak into the results for another.
+        """
+        if name not in self.memos:
+            self.memos[name] = LRUCache(maxsize)
+        return self.memos[name]
+
+    def class_memo(self, name, maxsize):
+        """
+        Returns the ClassMemo with the given name, creating it if needed.  Its
+        entries for a class are discarded when that class is evicted.
+        """
+        if name not in self.memos:
+            self.memos[name] = ClassMemo(maxsize)
+        return self.memos[name]
+
+    @contextmanager
+    def record_reads(self, events):
+        """
+        Appends a ("class", name) event to events for each class read (or
+        noted with note_read) until the block exits.  Recordings can be nested.
+        """
+        self.recorders.append(events)
+        try:
+            yield events
+        finally:
+            self.recorders.remove(events)
+
+    def note_read(self, name):
+        """
+        Records that the given class was read, for code that reads classes
+        other than through load(), or that reuses something computed from
+        them earlier.
+        """
+        for events in self.recorders:
+            events.append(("class", name))
+
+    def cache_info(self):
+        """
+        Returns statistics about the parsed class cache, in the style of
+        functools.lru_cache.
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self.cache_bytes, self.max_cache_bytes)
+
+def _reopen(sources, max_cache_bytes, cache_dir, klass, bytecode_transforms):
+    return BurgerClassLoader(*sources, max_cache_bytes=max_cache_bytes, cache_dir=cache_dir, klass=klass, bytecode_transforms=bytecode_transforms)
@@ -0,0 +1,352 @@
+from collections import defaultdict
+from struct import unpack_from
+
+from jawa.constants import ConstantClass, String
+from jawa.util.utf import decode_modified_utf8
+
+# Number of bytes taken up by each kind of constant pool entry, after the
+# tag, other than UTF8 (which is variable length).  Longs and doubles also
+# take up two slots in the pool.
+_CONSTANT_SIZES = {
+    3: 4, 4: 4, 5: 8, 6: 8, 7: 2, 8: 2, 9: 4, 10: 4, 11: 4, 12: 4,
+    15: 3, 16: 2, 17: 4, 18: 4, 19: 2, 20: 2
+}
+CONSTANT_CLASS = 7
+CONSTANT_STRING = 8
+_CONSTANT_UTF8 = 1
+_WIDE_CONSTANTS = (5, 6)
+
+ACC_INTERFACE = 0x0200
+
+class ClassInfo(object):
+    """
+    The parts of a class file that describe its place in the hierarchy.
+
+    name: the internal name of the class
+    access_flags: the class's access flags, as an int
+    super_: the internal name of the superclass, or None for java/lang/Object
+    interfaces: the internal names of the directly implemented interfaces
+    fields: dict of field name -> (descriptor, access flags)
+    methods: dict of method name -> dict of descriptor -> access flags
+    """
+
+    __slots__ = ("name", "access_flags", "super_", "interfaces", "fields", "methods")
+
+    def __init__(self, name, access_flags, super_, interfaces, fields, methods):
+        self.name = name
+        self.access_flags = access_flags
+        self.super_ = super_
+        self.interfaces = interfaces
+        self.fields = fields
+        self.methods = methods
+
+    @property
+    def is_interface(self):
+        return bool(self.access_flags & ACC_INTERFACE)
+
+    def __repr__(self):
+        return "<ClassInfo %s extends %s>" % (self.name, self.super_)
+
+def read_constant_pool(data):
+    """
+    Reads the constant pool from the raw bytes of a class file, without
+    creating Constant objects for it.
+
+    Returns a tuple of (utf8, classes, strings, offset), where utf8 maps
+    indexes of UTF8 constants to their values, classes and strings map
+    indexes of Class and String constants to the index of the UTF8 constant
+    they refer to (in pool order), and offset is where the pool ends.
+    """
+    count = unpack_from(">H", data, 8)[0]
+    utf8 = {}
+    classes = {}
+    strings = {}
+    offset = 10
+    index = 1
+    while index < count:
+        tag = data[offset]
+        if tag == _CONSTANT_UTF8:
+            length = unpack_from(">H", data, offset + 1)[0]
+            raw = data[offset + 3:offset + 3 + length]
+            try:
+                utf8[index] = raw.decode("utf8")
+            except UnicodeDecodeError:
+                utf8[index] = decode_modified_utf8(raw)
+            offset += 3 + length
+        else:
+            if tag == CONSTANT_CLASS:
+                classes[index] = unpack_from(">H", data, offset + 1)[0]
+            elif tag == CONSTANT_STRING:
+                strings[index] = unpack_from(">H", data, offset + 1)[0]
+            offset += 1 + _CONSTANT_SIZES[tag]
+        index += 2 if tag in _WIDE_CONSTANTS else 1
+    return utf8, classes, strings, offset
+
+class ConstantPoolView(object):
+    """
+    The String and Class constants of a class file, for code that only needs
+    to look at those (e.g. to decide whether a class is worth loading fully).
+
+    name: the internal name of the class
+    constants: tuple of (tag, value) pairs in pool order, where tag is
+               CONSTANT_STRING or CONSTANT_CLASS and value is the string or
+               the internal name of the class
+    """
+
+    __slots__ = ("name", "constants")
+
+    def __init__(self, name, constants):
+        self.name = name
+        self.constants = constants
+
+    @property
+    def strings(self):
+        return [value for tag, value in self.constants if tag == CONSTANT_STRING]
+
+    @property
+    def classes(self):
+        return [value for tag, value in self.constants if tag == CONSTANT_CLASS]
+
+    def __repr__(self):
+        return "<ConstantPoolView %s>" % self.name
+
+def read_constant_pool_view(data):
+    """Reads a ConstantPoolView from the raw bytes of a class file."""
+    utf8, classes, strings, offset = read_constant_pool(data)
+    this = unpack_from(">H", data, offset + 2)[0]
+    constants = [(index, CONSTANT_CLASS, utf8[name]) for index, name in classes.items()]
+    constants += [(index, CONSTANT_STRING, utf8[value]) for index, value in strings.items()]
+    constants.sort()
+    return ConstantPoolView(utf8[classes[this]], tuple((tag, value) for _, tag, value in constants))
+
+def constant_pool(classloader, name):
+    """
+    Returns the ConstantPoolView for the given class, without parsing (or
+    caching) the whole class.
+    """
+    try:
+        with classloader.open(name + ".class") as fin:
+            return read_constant_pool_view(fin.read())
+    except NotImplementedError:
+        # Already-loaded ClassFiles added directly as a source
+        cf = classloader[name]
+        constants = [(CONSTANT_CLASS if isinstance(c, ConstantClass) else CONSTANT_STRING,
+                      c.name.value if isinstance(c, ConstantClass) else c.string.value)
+                     for c in cf.constants.find(type_=(String, ConstantClass))]
+        return ConstantPoolView(cf.this.name.value, tuple(constants))
+
+def read_class_info(data):
+    """
+    Reads a ClassInfo from the raw bytes of a class file.  Only the constant
+    pool, the class header and the field and method tables are read; code and
+    other attributes are skipped over without being parsed.
+    """
+    utf8, classes, _, offset = read_constant_pool(data)
+
+    def class_name(index):
+        return utf8[classes[index]] if index else None
+
+    access_flags, this, super_, interface_count = unpack_from(">HHHH", data, offset)
+    offset += 8
+    interfaces = [class_name(i) for i in unpack_from(">%dH" % interface_count, data, offset)]
+    offset += 2 * interface_count
+
+    def read_members():
+        nonlocal offset
+        members = []
+        member_count = unpack_from(">H", data, offset)[0]
+        offset += 2
+        for _ in range(member_count):
+            flags, name, descriptor, attribute_count = unpack_from(">HHHH", data, offset)
+            offset += 8
+            for _ in range(attribute_count):
+                offset += 6 + unpack_from(">I", data, offset + 2)[0]
+            members.append((utf8[name], utf8[descriptor], flags))
+        return members
+
+    fields = {name: (descriptor, flags) for name, descriptor, flags in read_members()}
+    methods = defaultdict(dict)
+    for name, descriptor, flags in read_members():
+        methods[name][descriptor] = flags
+
+    return ClassInfo(class_name(this), access_flags, class_name(super_), interfaces, fields, dict(methods))
+
+class ClassHierarchy(object):
+    """
+    An index of the classes in a jar and how they relate to each other.
+
+    Classes are read (header only) the first time they are asked about, and
+    are never loaded into the classloader; asking for subclasses reads every
+    class in the jar once, in a single pass.  Answers are remembered, so
+    repeated queries about the same classes are constant time.
+
+    Classes that are not in the jar (e.g. java/lang/Object) are treated as
+    the roots of the hierarchy; nothing is known about them other than their
+    name.
+    """
+
+    def __init__(self, classloader):
+        self.classloader = classloader
+        self.infos = {}
+        self.ancestor_sets = {}
+        self.subclass_index = None
+
+    def __contains__(self, name):
+        return self.info(name) is not None
+
+    def info(self, name):
+        """Returns the ClassInfo for the given class, or None if it isn't in the jar."""
+        if getattr(self.classloader, "recorders", None):
+            self.classloader.note_read(name)
+        try:
+            return self.infos[name]
+        except KeyError:
+            pass
+
+        path = name + ".class"
+        if path not in self.classloader.path_map:
+            info = None
+        else:
+            try:
+                with self.classloader.open(path) as fin:
+                    info = read_class_info(fin.read())
+            except NotImplementedError:
+                # Already-loaded ClassFiles added directly as a source
+                info = _info_from_classfile(self.classloader[name])
+        self.infos[name] = info
+        return info
+
+    def super_of(self, name):
+        """Returns the superclass of the given class, or None if it isn't known."""
+        info = self.info(name)
+        return info.super_ if info else None
+
+    def super_chain(self, name):
+        """
+        Returns the superclasses of the given class, nearest first, ending
+        with the first one that isn't in the jar (usually java/lang/Object).
+        """
+        chain = []
+        info = self.info(name)
+        while info is not None and info.super_ is not None:
+            chain.append(info.super_)
+            info = self.info(info.super_)
+        return chain
+
+    def ancestors(self, name):
+        """
+        Returns a frozenset of every superclass and interface that the given
+        class extends or implements, directly or indirectly.
+        """
+        try:
+            result = self.ancestor_sets[name]
+        except KeyError:
+            pass
+        else:
+            if getattr(self.classloader, "recorders", None):
+                # Everything this was worked out from
+                self.classloader.note_read(name)
+                for ancestor in result:
+                    self.classloader.note_read(ancestor)
+            return result
+
+        result = set()
+        info = self.info(name)
+        if info is not None:
+            for parent in ([info.super_] if info.super_ else []) + info.interfaces:
+                result.add(parent)
+                result.update(self.ancestors(parent))
+        result = frozenset(result)
+        self.ancestor_sets[name] = result
+        return result
+
+    def is_subclass(self, name, parent):
+        """
+        Checks whether the given class is, extends or implements parent
+        (directly or indirectly).
+        """
+        return name == parent or parent in self.ancestors(name)
+
+    def subclasses(self, name):
+        """Returns the names of the classes in the jar that directly extend or implement the given one."""
+        if self.subclass_index is None:
+            index = defaultdict(list)
+            for path in self.classloader.path_map:
+                if not path.endswith(".class"):
+                    continue
+                info = self.info(path[:-len(".class")])
+                if info is None:
+                    continue
+                if info.super_ is not None:
+                    index[info.super_].append(info.name)
+                for iface in info.interfaces:
+                    index[iface].append(info.name)
+            self.subclass_index = index
+        return list(self.subclass_index.get(name, ()))
+
+    def resolve_method(self, name, method_name, descriptor=None, args=None):
+        """
+        Finds the class that declares the method a call to name.method_name
+        refers to, following the JVM's resolution rules: the class and its
+        superclasses first, then its interfaces.  Either the full descriptor
+        or just the argument descriptor (args) may be given.
+
+        Returns the name of the declaring class, or None.
+        """
+        search = [name] + self.super_chain(name)
+        search += sorted(self.ancestors(name).difference(search))
+        for cls in search:
+            info = self.info(cls)
+            if info is None or method_name not in info.methods:
+                continue
+            descriptors = info.methods[method_name]
+            if descriptor is not None:
+                if descriptor in descriptors:
+                    return cls
+            elif args is not None:
+                prefix = "(" + args + ")"
+                if any(desc.startswith(prefix) for desc in descriptors):
+                    return cls
+            else:
+                return cls
+        return None
+
+    def resolve_field(self, name, field_name):
+        """
+        Finds the class that declares the field that name.field_name refers
+        to, checking interfaces before superclasses as the JVM does.
+
+        Returns the name of the declaring class, or None.
+        """
+        info = self.info(name)
+        if info is None:
+            return None
+        if field_name in info.fields:
+            return name
+        for iface in info.interfaces:
+            found = self.resolve_field(iface, field_name)
+            if found is not None:
+                return found
+        if info.super_ is not None:
+            return self.resolve_field(info.super_, field_name)
+        return None
+
+def _info_from_classfile(cf):
+    methods = defaultdict(dict)
+    for method in cf.methods:
+        methods[method.name.value][method.descriptor.value] = method.access_flags.value
+    fields = {field.name.value: (field.descriptor.value, field.access_flags.value) for field in cf.fields}
+    super_ = cf.super_.name.value if cf.super_ else None
+    return ClassInfo(cf.this.name.value, cf.access_flags.value, super_,
+                     [iface.name.value for iface in cf.interfaces], fields, dict(methods))
+
+def class_hierarchy(classloader):
+    """Returns the ClassHierarchy for the jar the given classloader reads from."""
+    if not hasattr(classloader, "memo"):
+        return ClassHierarchy(classloader)
+    cache = classloader.memo("hierarchy", 1)
+    hierarchy = cache.get("hierarchy")
+    if hierarchy is None:
+        hierarchy = ClassHierarchy(classloader)
+        cache["hierarchy"] = hierarchy
+    return hierarchy
@@ -0,0 +1,140 @@
+import mmap
+import os
+import weakref
+import zlib
+from array import array
+from struct import unpack_from
+
+_END_OF_CENTRAL_DIRECTORY = b"PK\x05\x06"
+_CENTRAL_DIRECTORY_ENTRY = b"PK\x01\x02"
+_LOCAL_HEADER = b"PK\x03\x04"
+# The end of central directory record is 22 bytes, followed by a comment of
+# up to 65535 bytes
+_MAX_END_SIZE = 22 + 0xFFFF
+
+_STORED = 0
+_DEFLATED = 8
+_FLAG_ENCRYPTED = 0x1
+_FLAG_UTF8 = 0x800
+
+class UnsupportedJar(Exception):
+    """Raised for archives that MappedJar can't read (e.g. zip64 or encrypted ones)."""
+    pass
+
+class MappedJar(object):
+    """
+    A read-only view of a jar (or zip) file, memory-mapped rather than read
+    through a file handle.  The central directory is read once, into an
+    index of names and arrays of offsets and sizes, and entries are
+    decompressed straight from the mapping when they are read.
+
+    Since there is no file position to share, a MappedJar inherited by a
+    forked process can be used there as is; see open_jar().  This only
+    applies with the fork start method: workers started with spawn or
+    forkserver inherit nothing, and open and index the jar again.
+
+    Only stored and deflated entries in archives without zip64 records are
+    supported; UnsupportedJar is raised for anything else.  CRCs are not
+    checked.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fin:
+            if os.fstat(fin.fileno()).st_size == 0:
+                raise UnsupportedJar("%s is empty" % path)
+            self.map = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_index()
+        except:
+            self.map.close()
+            raise
+
+    def _read_index(self):
+        mm = self.map
+        end = mm.rfind(_END_OF_CENTRAL_DIRECTORY, max(0, len(mm) - _MAX_END_SIZE))
+        if end < 0:
+            raise UnsupportedJar("%s is not a zip file" % self.path)
+        count, directory_size, directory_offset = unpack_from("<HLL", mm, end + 10)
+        if count == 0xFFFF or directory_offset == 0xFFFFFFFF:
+            raise UnsupportedJar("%s uses zip64" % self.path)
+        # Anything prepended to the archive moves every offset along
+        start = end - directory_size
+        prefix = start - directory_offset
+
+        self.names = []
+        self.index = {}
+        self.offsets = array("Q")
+        self.compressed_sizes = array("L")
+        self.sizes = array("L")
+        self.methods = array("B")
+
+        position = start
+        for i in range(count):
+            if mm[position:position + 4] != _CENTRAL_DIRECTORY_ENTRY:
+                raise UnsupportedJar("%s has a bad central directory" % self.path)
+            flags, method = unpack_from("<HH", mm, position + 8)
+            compressed_size, size, name_length, extra_length, comment_length = unpack_from("<LLHHH", mm, position + 20)
+            offset = unpack_from("<L", mm, position + 42)[0]
+            if flags & _FLAG_ENCRYPTED or method not in (_STORED, _DEFLATED):
+                raise UnsupportedJar("%s has entries that can't be read" % self.path)
+            if offset == 0xFFFFFFFF or size == 0xFFFFFFFF or compressed_size == 0xFFFFFFFF:
+                raise UnsupportedJar("%s uses zip64" % self.path)
+
+            raw_name = mm[position + 46:position + 46 + name_length]
+            name = raw_name.decode("utf-8" if flags & _FLAG_UTF8 else "cp437")
+            self.names.append(name)
+            # As with ZipFile, the last entry with a given name wins
+            self.index[name] = i
+            self.offsets.append(offset + prefix)
+            self.compressed_sizes.append(compressed_size)
+            self.sizes.append(size)
+            self.methods.append(method)
+            position += 46 + name_length + extra_length + comment_length
+
+    def namelist(self):
+        return list(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def read(self, name):
+        """Returns the (decompressed) contents of the given entry."""
+        i = self.index[name]
+        offset = self.offsets[i]
+        if self.map[offset:offset + 4] != _LOCAL_HEADER:
+            raise UnsupportedJar("%s has a bad local header for %s" % (self.path, name))
+        name_length, extra_length = unpack_from("<HH", self.map, offset + 26)
+        start = offset + 30 + name_length + extra_length
+        data = memoryview(self.map)[start:start + self.compressed_sizes[i]]
+        try:
+            if self.methods[i] == _STORED:
+                return bytes(data)
+            return zlib.decompress(data, -15, self.sizes[i])
+        finally:
+            data.release()
+
+    def close(self):
+        self.map.close()
+
+    def __repr__(self):
+        return "<MappedJar %s (%d entries)>" % (self.path, len(self.names))
+
+# Jars that are currently open, so that classloaders for the same jar (in
+# particular, ones reopened in workers created by fork) share a single mapping
+# and index
+_open_jars = weakref.WeakValueDictionary()
+
+def open_jar(path):
+    """
+    Returns a MappedJar for the given path, reusing one that is already open
+    (in this process or, if it was created by fork, in its parent) if the
+    file hasn't changed since.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    jar = _open_jars.get(key)
+    if jar is None:
+        jar = MappedJar(path)
+        _open_jars[key] = jar
+    return jar
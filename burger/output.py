@@ -0,0 +1,190 @@
+import gc
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+from burger.roundedfloats import RoundedFloatEncoder
+
+class JsonWriter(object):
+    """
+    Writes the aggregates for a list of jars as a JSON list, one jar at a
+    time, so that only the aggregate currently being written needs to be
+    kept in memory.  The result is the same as dumping the whole list at once.
+
+    ndjson: write each jar's aggregate on its own line instead of as a list
+    """
+
+    def __init__(self, output, compact=False, ndjson=False):
+        self.output = output
+        self.compact = compact
+        self.ndjson = ndjson
+        self.count = 0
+        self.compact_encoder = RoundedFloatEncoder()
+        self.pretty_encoder = RoundedFloatEncoder(sort_keys=True, indent=4)
+
+    def write(self, aggregate):
+        if self.ndjson:
+            self._write_encoded(aggregate, self.compact_encoder)
+            self.output.write("\n")
+        elif self.compact:
+            self.output.write(", " if self.count else "[")
+            self._write_encoded(aggregate, self.compact_encoder)
+        else:
+            self.output.write(",\n    " if self.count else "[\n    ")
+            # Nested one level deep, inside the list
+            self._write_encoded(aggregate, self.pretty_encoder, 1)
+        self.output.flush()
+        self.count += 1
+
+    def _write_encoded(self, aggregate, encoder, indent_level=0):
+        # Floats are rounded as they are written, rather than by copying the
+        # whole aggregate first
+        for chunk in encoder.iterencode(aggregate, indent_level=indent_level):
+            self.output.write(chunk)
+
+    def close(self):
+        if self.ndjson:
+            return
+        if self.count == 0:
+            self.output.write("[]")
+        elif self.compact:
+            self.output.write("]")
+        else:
+            self.output.write("\n]")
+        self.output.flush()
+
+def _key(key):
+    """Converts a dictionary key to a string, in the same way as json does."""
+    if isinstance(key, str):
+        return key
+    elif key is True:
+        return "true"
+    elif key is False:
+        return "false"
+    elif key is None:
+        return "null"
+    elif isinstance(key, float):
+        return repr(round(key, 5))
+    return str(key)
+
+def _prepare(o):
+    """
+    Returns a copy of o with floats rounded and keys converted to strings,
+    as they would be in the JSON output.
+    """
+    if isinstance(o, float):
+        return round(o, 5)
+    elif isinstance(o, dict):
+        return {_key(k): _prepare(v) for k, v in o.items()}
+    elif isinstance(o, (list, tuple)):
+        return [_prepare(v) for v in o]
+    return o
+
+class MsgpackWriter(object):
+    """
+    Writes the aggregates for a list of jars as a sequence of msgpack
+    objects, one per jar.  Only standard msgpack types are used, so that
+    any msgpack decoder reads it without needing an extension hook (which
+    in Python costs a call per value, making decoding slower than JSON);
+    read_msgpack() reads it back.
+
+    As with the JSON output, floats are rounded to 5 places and keys are
+    converted to strings.
+    """
+
+    def __init__(self, output):
+        if msgpack is None:
+            raise Exception("msgpack output requires the msgpack package")
+        self.output = output
+        self.packer = msgpack.Packer(use_bin_type=True)
+
+    def write(self, aggregate):
+        self._pack(aggregate)
+        self.output.flush()
+
+    def _pack(self, o):
+        # Containers are written piece by piece, so the aggregate is never copied
+        write = self.output.write
+        if isinstance(o, dict):
+            write(self.packer.pack_map_header(len(o)))
+            for k, v in o.items():
+                write(self.packer.pack(_key(k)))
+                self._pack(v)
+        elif isinstance(o, (list, tuple)):
+            write(self.packer.pack_array_header(len(o)))
+            for v in o:
+                self._pack(v)
+        elif isinstance(o, float):
+            write(self.packer.pack(round(o, 5)))
+        else:
+            write(self.packer.pack(o))
+
+    def close(self):
+        self.output.flush()
+
+def read_msgpack(input):
+    """
+    Reads the aggregates written by MsgpackWriter, yielding each in turn.
+
+    The garbage collector is paused while each aggregate is decoded: it
+    otherwise keeps being triggered by the many new dicts and lists, and
+    scanning them takes most of the decoding time.
+    """
+    if msgpack is None:
+        raise Exception("Reading msgpack output requires the msgpack package")
+
+    unpacker = msgpack.Unpacker(input, raw=False, strict_map_key=False)
+    while True:
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            aggregate = next(unpacker)
+        except StopIteration:
+            return
+        finally:
+            if enabled:
+                gc.enable()
+        yield aggregate
+
+class CborWriter(object):
+    """
+    Writes the aggregates for a list of jars as a CBOR sequence, one item
+    per jar.  Repeated strings are shared using the standard stringref
+    extension (tags 256 and 25), which decoders such as cbor2 resolve
+    transparently.
+
+    As with the JSON output, floats are rounded to 5 places and keys are
+    converted to strings.
+    """
+
+    def __init__(self, output):
+        if cbor2 is None:
+            raise Exception("CBOR output requires the cbor2 package")
+        self.output = output
+
+    def write(self, aggregate):
+        cbor2.dump(_prepare(aggregate), self.output, string_referencing=True)
+        self.output.flush()
+
+    def close(self):
+        self.output.flush()
+
+# Formats that can be passed to --format, and whether they are binary
+FORMATS = {"json": False, "msgpack": True, "cbor": True}
+
+def create_writer(format, output, compact=False, ndjson=False):
+    """Returns a writer for the given output format."""
+    if format == "json":
+        return JsonWriter(output, compact, ndjson)
+    elif format == "msgpack":
+        return MsgpackWriter(output)
+    elif format == "cbor":
+        return CborWriter(output)
+    raise Exception("Unknown output format '%s' (expected one of %s)" % (format, ", ".join(FORMATS)))
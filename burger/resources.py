@@ -0,0 +1,115 @@
+import os
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+# Number of threads used to read JSON files.  Inflating entries releases the
+# GIL, so this helps even though parsing doesn't.
+THREADS = min(8, os.cpu_count() or 1)
+
+# Prefixes with fewer files than this are read on the calling thread
+_MIN_PARALLEL = 64
+
+class JsonResources(object):
+    """
+    The JSON files in a jar (tags, recipes, language files and so on),
+    indexed by path so that the files under a directory can be found without
+    another pass over the whole jar.  Files are read and parsed in bulk, in a
+    pool of threads, the first time anything under their directory is asked
+    for, and are remembered until forget() is called for them.  Since this
+    lives as long as the classloader (which --serve keeps between
+    requests), toppings forget the files they read once they are done.
+
+    The parsed data is shared between everything that asks for it, so it
+    must be copied before being modified or kept.
+    """
+
+    def __init__(self, classloader):
+        self.classloader = classloader
+        # Position of each file in the jar, to keep the jar's order in results
+        self.order = {}
+        for position, path in enumerate(classloader.path_map):
+            if path.endswith(".json"):
+                self.order[path] = position
+        # Sorted, so that everything under a prefix is a contiguous range
+        self.paths = sorted(self.order)
+        self.loaded = {}
+
+    def paths_under(self, prefix):
+        """Returns the paths of the JSON files under the given prefix, in jar order."""
+        start = bisect_left(self.paths, prefix)
+        end = start
+        while end < len(self.paths) and self.paths[end].startswith(prefix):
+            end += 1
+        return sorted(self.paths[start:end], key=self.order.__getitem__)
+
+    def under(self, prefix):
+        """
+        Yields (path, data) for each JSON file under the given prefix, in
+        jar order.  If a file couldn't be read or parsed, the
+        exception is raised when it is reached.
+        """
+        paths = self.paths_under(prefix)
+        self.preload(paths)
+        for path in paths:
+            yield path, self.load(path)
+
+    def load(self, path):
+        """Returns the parsed contents of the given JSON file."""
+        if path not in self.loaded:
+            self.loaded[path] = self._read(path)
+        ok, value = self.loaded[path]
+        if not ok:
+            raise value
+        return value
+
+    def forget(self, prefix):
+        """
+        Discards the parsed contents of the JSON files under the given
+        prefix (or the single file with that path).  They are read again if
+        asked for later.
+        """
+        for path in self.paths_under(prefix):
+            self.loaded.pop(path, None)
+
+    def _read(self, path):
+        try:
+            if hasattr(self.classloader, "read"):
+                data = self.classloader.read(path)
+            else:
+                with self.classloader.open(path) as fin:
+                    data = fin.read()
+            return True, json.loads(data)
+        except Exception as e:
+            return False, e
+
+    def _read_all(self, paths):
+        return [(path, self._read(path)) for path in paths]
+
+    def preload(self, paths):
+        """Reads the given JSON files (that haven't been read yet) in bulk."""
+        paths = [path for path in paths if path not in self.loaded]
+        if len(paths) < _MIN_PARALLEL or THREADS <= 1:
+            self.loaded.update(self._read_all(paths))
+            return
+
+        # A few large batches rather than one task per (usually tiny) file
+        batches = [paths[i::THREADS * 4] for i in range(THREADS * 4)]
+        with ThreadPoolExecutor(THREADS) as pool:
+            for results in pool.map(self._read_all, batches):
+                self.loaded.update(results)
+
+def json_resources(classloader):
+    """Returns the JsonResources for the jar the given classloader reads from."""
+    if not hasattr(classloader, "memo"):
+        return JsonResources(classloader)
+    memo = classloader.memo("json_resources", 1)
+    resources = memo.get("json_resources")
+    if resources is None:
+        resources = JsonResources(classloader)
+        memo["json_resources"] = resources
+    return resources
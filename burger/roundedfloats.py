@@ -22,8 +22,27 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import inspect
+
 import six
 
+from json import JSONEncoder
+from json.encoder import encode_basestring, encode_basestring_ascii, INFINITY
+
+# json's pure-Python encoder takes the float formatter as an argument, but
+# only through this private function.  It has had the same signature since
+# Python 2.7; if that ever changes, RoundedFloatEncoder falls back to
+# encoding a rounded copy instead.
+try:
+    from json.encoder import _make_iterencode
+    if list(inspect.signature(_make_iterencode).parameters)[:10] != [
+            "markers", "_default", "_encoder", "_indent", "_floatstr",
+            "_key_separator", "_item_separator", "_sort_keys", "_skipkeys",
+            "_one_shot"]:
+        _make_iterencode = None
+except (ImportError, TypeError, ValueError):
+    _make_iterencode = None
+
 def transform_floats(o):
     if isinstance(o, float):
         return round(o, 5)
@@ -33,3 +52,65 @@ def transform_floats(o):
         return [transform_floats(v) for v in o]
     return o
 
+class RoundedFloatEncoder(JSONEncoder):
+    """
+    A JSONEncoder that rounds floats to 5 places as it writes them out.  The
+    output is the same as encoding transform_floats(o), but nothing is
+    copied; the cost is that the pure-Python encoder is always used (which
+    is what json.dump and indented output use anyways).  Where the private
+    json function this needs is unavailable, a rounded copy is encoded.
+    """
+
+    def iterencode(self, o, _one_shot=False, indent_level=0):
+        """
+        Encodes o, yielding the output in chunks.  indent_level is the level
+        of indentation o is nested at, for writing it as part of a larger
+        document.
+        """
+        if _make_iterencode is None:
+            return self._iterencode_copy(o, indent_level)
+
+        if self.check_circular:
+            markers = {}
+        else:
+            markers = None
+        if self.ensure_ascii:
+            _encoder = encode_basestring_ascii
+        else:
+            _encoder = encode_basestring
+
+        def floatstr(o, allow_nan=self.allow_nan, _repr=float.__repr__,
+                     _inf=INFINITY, _neginf=-INFINITY):
+            if o != o:
+                text = 'NaN'
+            elif o == _inf:
+                text = 'Infinity'
+            elif o == _neginf:
+                text = '-Infinity'
+            else:
+                return _repr(round(o, 5))
+
+            if not allow_nan:
+                raise ValueError(
+                    "Out of range float values are not JSON compliant: " +
+                    repr(o))
+
+            return text
+
+        _iterencode = _make_iterencode(
+            markers, self.default, _encoder, self.indent, floatstr,
+            self.key_separator, self.item_separator, self.sort_keys,
+            self.skipkeys, _one_shot)
+        return _iterencode(o, indent_level)
+
+    def _iterencode_copy(self, o, indent_level):
+        """iterencode using only the public JSONEncoder interface."""
+        indent = self.indent
+        if indent is not None and not isinstance(indent, str):
+            indent = " " * indent
+        for chunk in JSONEncoder.iterencode(self, transform_floats(o)):
+            # Strings never contain a raw newline, so any newline is one
+            # written before indentation
+            if indent and indent_level:
+                chunk = chunk.replace("\n", "\n" + indent * indent_level)
+            yield chunk
@@ -0,0 +1,113 @@
+import os
+
+from burger.cache import ResultCache, jar_hash, source_fingerprint
+from burger.hierarchy import read_constant_pool
+
+class StringIndex(object):
+    """
+    An inverted index of the String constants (and Class references) in
+    each class of a jar, so that finding the classes that use a constant is a
+    dictionary lookup rather than another pass over every constant pool.
+
+    strings_by_class: class name -> tuple of its String constants, in pool order
+    classes_by_string: String constant -> tuple of the classes using it, in jar order
+    classes_by_reference: class name -> tuple of the classes referring to it
+    """
+
+    def __init__(self, strings_by_class, references_by_class):
+        self.strings_by_class = strings_by_class
+
+        classes_by_string = {}
+        for name, strings in strings_by_class.items():
+            for value in set(strings):
+                classes_by_string.setdefault(value, []).append(name)
+        self.classes_by_string = {value: tuple(names) for value, names in classes_by_string.items()}
+
+        classes_by_reference = {}
+        for name, references in references_by_class.items():
+            for reference in references:
+                classes_by_reference.setdefault(reference, []).append(name)
+        self.classes_by_reference = {reference: tuple(names) for reference, names in classes_by_reference.items()}
+
+        self.references_by_class = references_by_class
+
+    @staticmethod
+    def build(classloader):
+        """Reads the constant pool of every class in the jar, in a single pass."""
+        strings_by_class = {}
+        references_by_class = {}
+        for path in classloader.path_map:
+            if not path.endswith(".class"):
+                continue
+            name = path[:-len(".class")]
+            try:
+                with classloader.open(path) as fin:
+                    utf8, classes, strings, _ = read_constant_pool(fin.read())
+            except NotImplementedError:
+                # Already-loaded ClassFiles added directly as a source
+                continue
+            strings_by_class[name] = tuple(utf8[index] for index in strings.values())
+            references_by_class[name] = tuple(utf8[index] for index in classes.values())
+        return StringIndex(strings_by_class, references_by_class)
+
+    def __getstate__(self):
+        # The inverted tables are cheap to rebuild, so only store the forward ones
+        return (self.strings_by_class, self.references_by_class)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def strings(self, name):
+        """Returns the String constants in the given class, in pool order."""
+        return self.strings_by_class.get(name, ())
+
+    def references(self, name):
+        """Returns the classes that the given class's constant pool refers to."""
+        return self.references_by_class.get(name, ())
+
+    def classes_with(self, value):
+        """Returns the classes that have the given String constant."""
+        return self.classes_by_string.get(value, ())
+
+    def classes_containing(self, substring):
+        """Returns the classes that have a String constant containing the given text."""
+        found = set()
+        for value, names in self.classes_by_string.items():
+            if substring in value:
+                found.update(names)
+        return tuple(name for name in self.strings_by_class if name in found)
+
+    def classes_referencing(self, name):
+        """Returns the classes whose constant pools refer to the given class."""
+        return self.classes_by_reference.get(name, ())
+
+def string_index(classloader):
+    """
+    Returns the StringIndex for the jar the given classloader reads from,
+    building it the first time.  If the classloader has a cache_dir, the
+    index is also stored there and reused by later runs on the same jar
+    (only when reading from a single jar file; other sources are indexed
+    in memory).
+    """
+    if not hasattr(classloader, "memo"):
+        return StringIndex.build(classloader)
+    memo = classloader.memo("string_index", 1)
+    index = memo.get("string_index")
+    if index is not None:
+        return index
+
+    cache_dir = getattr(classloader, "cache_dir", None)
+    sources = getattr(classloader, "sources", ())
+    if cache_dir is not None and len(sources) == 1 and isinstance(sources[0], str) and os.path.isfile(sources[0]):
+        cache = ResultCache(cache_dir)
+        jar = jar_hash(sources[0])
+        fingerprint = source_fingerprint("burger.hierarchy", __name__)
+        index = cache.load(jar, "string_index", fingerprint)
+        if index is None:
+            index = StringIndex.build(classloader)
+            cache.store(jar, "string_index", fingerprint, index)
+    else:
+        index = StringIndex.build(classloader)
+
+    memo["string_index"] = index
+    return index
@@ -24,6 +24,7 @@ THE SOFTWARE.
 
 import six
 from .topping import Topping
+from burger.util import disassemble
 
 from jawa.util.descriptor import method_descriptor
 
@@ -73,7 +74,7 @@ class BiomeTopping(Topping):
         mutate_method_name = None
         void_methods = cf.methods.find(returns="L" + superclass + ";", args="", f=lambda m: m.access_flags.acc_protected and not m.access_flags.acc_static)
         for method in void_methods:
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "sipush" and ins.operands[0].value == 128:
                     mutate_method_desc = method.descriptor.value
                     mutate_method_name = method.name.value
@@ -82,7 +83,7 @@ class BiomeTopping(Topping):
         make_mutated_method_name = None
         int_methods = cf.methods.find(returns="L" + superclass + ";", args="I", f=lambda m: m.access_flags.acc_protected and not m.access_flags.acc_static)
         for method in int_methods:
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "new":
                     make_mutated_method_desc = method.descriptor.value
                     make_mutated_method_name = method.name.value
@@ -100,7 +101,7 @@ class BiomeTopping(Topping):
                     biome_fields[biome["field"]] = biome["name"]
 
         # OK, start running through the initializer for biomes.
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins == "new":
                 store_biome_if_valid(tmp)
 
@@ -208,7 +209,7 @@ class BiomeTopping(Topping):
         stack = []
 
         # OK, start running through the initializer for biomes.
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins == "anewarray":
                 # End of biome initialization; now creating the list of biomes
                 # for the explore all biomes achievement but we don't need
@@ -290,7 +291,7 @@ class BiomeTopping(Topping):
         # Find the static block, and load the fields for each.
         method = lcf.methods.find_one(name="<clinit>")
         biome_name = ""
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ("ldc", "ldc_w"):
                 const = ins.operands[0]
                 if isinstance(const, String):
@@ -318,7 +319,7 @@ class BiomeTopping(Topping):
 
         # First pass: identify all the biomes.
         stack = []
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ("bipush", "sipush"):
                 stack.append(ins.operands[0].value)
             elif ins in ("ldc", "ldc_w"):
@@ -360,7 +361,7 @@ class BiomeTopping(Topping):
 
         method = lcf.methods.find_one(name="<clinit>")
         biome_name = ""
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ("ldc", "ldc_w"):
                 const = ins.operands[0]
                 if isinstance(const, String):
@@ -386,7 +387,7 @@ class BiomeTopping(Topping):
             str_count = 0
             float_count = 0
             last = None
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins in ("ldc", "ldc_w"):
                     const = ins.operands[0]
                     if isinstance(const, String):
@@ -424,7 +425,7 @@ class BiomeTopping(Topping):
             cf = classloader[biome["class"]]
             method = cf.methods.find_one(name="<init>")
             stack = []
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "invokespecial":
                     const = ins.operands[0]
                     name = const.name_and_type.name.value
@@ -485,7 +486,7 @@ class BiomeTopping(Topping):
 
         # First pass: identify all the biomes.
         stack = []
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins.mnemonic in ("bipush", "sipush"):
                 stack.append(ins.operands[0].value)
             elif ins.mnemonic in ("ldc", "ldc_w"):
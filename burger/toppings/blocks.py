@@ -26,7 +26,8 @@ from .topping import Topping
 from jawa.constants import *
 from jawa.util.descriptor import method_descriptor
 
-from burger.util import WalkerCallback, walk_method, try_eval_lambda
+from burger.util import WalkerCallback, walk_method, walk_method_summarized, try_eval_lambda, disassemble
+from burger.hierarchy import class_hierarchy
 
 import six.moves
 
@@ -50,13 +51,12 @@ class BlocksTopping(Topping):
     @staticmethod
     def list_super_classes(class_name, superclass, classloader):
         super_classes = []
-        this_super_class = class_name
-        while this_super_class != superclass:
-            try:
-                this_super_class = classloader[this_super_class].super_.name.value
-            except FileNotFoundError:
-                break
+        if class_name == superclass:
+            return super_classes
+        for this_super_class in class_hierarchy(classloader).super_chain(class_name):
             super_classes.append(this_super_class)
+            if this_super_class == superclass:
+                break
         return super_classes
 
     @staticmethod
@@ -81,7 +81,7 @@ class BlocksTopping(Topping):
         # Find the static block, and load the fields for each.
         method = lcf.methods.find_one(name="<clinit>")
         blk_name = ""
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ("ldc", "ldc_w"):
                 const = ins.operands[0]
                 if isinstance(const, String):
@@ -122,7 +122,7 @@ class BlocksTopping(Topping):
             references_cf = classloader[references_class]
             for method in references_cf.methods.find(name='<clinit>'):
                 block_id = None
-                for ins in method.code.disassemble():
+                for ins in disassemble(method):
                     if ins.mnemonic == 'ldc':
                         block_id = ins.operands[0].string.value
                     if ins.mnemonic == 'putstatic':
@@ -139,7 +139,7 @@ class BlocksTopping(Topping):
         # There's also one that sets both to the same value
         hardness_setter_2 = None
         for method in builder_cf.methods.find(args='F'):
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins.mnemonic == "invokevirtual":
                     const = ins.operands[0]
                     if (const.name_and_type.name.value == hardness_setter.name.value and
@@ -150,7 +150,7 @@ class BlocksTopping(Topping):
         # ... and one that sets them both to 0
         hardness_setter_3 = None
         for method in builder_cf.methods.find(args=''):
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins.mnemonic == "invokevirtual":
                     const = ins.operands[0]
                     if (const.name_and_type.name.value == hardness_setter_2.name.value and
@@ -228,7 +228,7 @@ class BlocksTopping(Topping):
                             # In 20w12a+ (1.16), some blocks (e.g. logs) use a separate method
                             # for initialization.  Call them.
                             sub_method = lcf.methods.find_one(name=method_name, args=desc.args_descriptor, returns=desc.returns_descriptor)
-                            return walk_method(lcf, sub_method, self, verbose, args)
+                            return walk_method_summarized(lcf, sub_method, self, verbose, args)
                     elif const.class_.name.value == builder_class:
                         if len(desc.args) == 1 and desc.args[0].name == superclass: # Copy constructor
                             copy = dict(args[0])
@@ -357,7 +357,7 @@ class BlocksTopping(Topping):
         # There's also one that sets both to the same value
         hardness_setter_2 = None
         for method in builder_cf.methods.find(args='F'):
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "invokevirtual":
                     const = ins.operands[0]
                     if (const.name_and_type.name.value == hardness_setter.name.value and
@@ -368,7 +368,7 @@ class BlocksTopping(Topping):
         # ... and one that sets them both to 0
         hardness_setter_3 = None
         for method in builder_cf.methods.find(args=''):
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "invokevirtual":
                     const = ins.operands[0]
                     if (const.name_and_type.name.value == hardness_setter_2.name.value and
@@ -497,7 +497,7 @@ class BlocksTopping(Topping):
 
         stack = []
         locals = {}
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins == "new":
                 # The beginning of a new block definition
                 const = ins.operands[0]
@@ -630,7 +630,7 @@ class BlocksTopping(Topping):
 
         for method in float_setters:
             fld = None
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "putfield":
                     const = ins.operands[0]
                     fld = const.name_and_type.name.value
@@ -642,7 +642,7 @@ class BlocksTopping(Topping):
         for method in float_setters:
             # Look for the resistance setter, which multiplies by 3.
             is_resistance = False
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins in ("ldc", "ldc_w"):
                     is_resistance = (ins.operands[0].value == 3.0)
                 elif ins == "fmul" and is_resistance:
@@ -657,7 +657,7 @@ class BlocksTopping(Topping):
         for method in float_setters:
             # Look for the light setter, which multiplies by 15, but 15 is the first value (15 * val)
             is_light = False
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins in ("ldc", "ldc_w"):
                     is_light = (ins.operands[0].value == 15.0)
                 elif ins.mnemonic.startswith("fload"):
@@ -2,7 +2,11 @@
 # -*- coding: utf8 -*-
 
 from .topping import Topping
-from burger.util import InvokeDynamicInfo, REF_invokeStatic, get_enum_constants
+from burger.util import InvokeDynamicInfo, REF_invokeStatic, get_enum_constants, disassemble
+from burger.util import WalkerCallback, walk_method_cfg, method_has_loop
+from burger.hierarchy import class_hierarchy
+from burger.classcache import class_analysis_cache
+from burger.cache import topping_fingerprint
 
 from jawa.constants import *
 from jawa.util.descriptor import method_descriptor, field_descriptor
@@ -23,6 +27,47 @@ PLANES = { "HORIZONTAL": HORIZONTAL, "VERTICAL": VERTICAL }
 # Classes that represent predicates in various versions
 PREDICATE_CLASSES = ("com/google/common/base/Predicate", "java/util/function/Predicate")
 
+class _CallRecorder(WalkerCallback):
+    """Records the methods called by a method, along with their arguments."""
+
+    def __init__(self):
+        self.calls = []
+
+    def on_new(self, ins, const):
+        return object()
+
+    def on_invoke(self, ins, const, obj, args):
+        self.calls.append((ins, const, args))
+        return object()
+
+    def on_get_field(self, ins, const, obj):
+        return object()
+
+    def on_put_field(self, ins, const, obj, value):
+        pass
+
+def _direction_calls(cf, method, verbose):
+    """
+    For a block state registration method that loops over each direction
+    (see process_superclass_invokespecial), finds the calls that check
+    whether a direction is used and that get the property for a direction,
+    which are the two calls made with the direction from the loop.  Returns
+    the constants for those methods, or None if the method doesn't loop.
+    """
+    if not method_has_loop(method):
+        return None
+
+    recorder = _CallRecorder()
+    walk_method_cfg(cf, method, recorder, verbose)
+    for ins, const, args in recorder.calls:
+        if ins.mnemonic != "invokevirtual" or len(args) != 1 or not const.name_and_type.descriptor.value.endswith(")Z"):
+            continue
+        direction = args[0]
+        for ins2, const2, args2 in recorder.calls:
+            if ins2 == "invokestatic" and len(args2) == 1 and args2[0] is direction:
+                return const, const2
+    raise Exception("Failed to find the calls made for each direction")
+
 class BlockStateTopping(Topping):
     """Gets tile entity (block entity) types."""
 
@@ -89,13 +134,10 @@ class BlockStateTopping(Topping):
             method = cf.methods.find_one(f=matches)
             assert method is not None
 
-            for ins in method.code.disassemble():
-                if ins == "astore" and ins.operands[0].value == 2:
-                    # This instruction (astore_2) only appears in glow_lichen
-                    # and sculk_vein (and not in cave_vines).
-                    break
-            else:
-                # This is cave_vines, so we can just use the normal logic.
+            calls = _direction_calls(cf, method, verbose)
+            if calls is None:
+                # Only glow_lichen and sculk_vein loop (cave_vines doesn't),
+                # so we can just use the normal logic.
                 return (list(process_class(name)), None)
 
             # The code in question looks like this:
@@ -122,31 +164,18 @@ class BlockStateTopping(Topping):
             # (glow_lichen/sculk_vein) but is a parent of chorus plant.
             # useDirection fortunately is unused in all actual implementations.
 
-            for ins in method.code.disassemble():
-                if ins == "invokestatic":
-                    const = ins.operands[0]
-                    desc = method_descriptor(const.name_and_type.descriptor.value)
-                    method2 = cf.methods.find_one(name=const.name_and_type.name, args=desc.args_descriptor)
-                    enumfacing = method2.args[0].name
-                    break
-            else:
-                raise Exception("Failed to find invokestatic instruction")
+            use_direction_const, get_property_const = calls
+            desc = method_descriptor(get_property_const.name_and_type.descriptor.value)
+            method2 = cf.methods.find_one(name=get_property_const.name_and_type.name, args=desc.args_descriptor)
+            enumfacing = method2.args[0].name
 
-            # Note: the invokevirtual comes before the invokestatic, but we want to know
-            # what enumfacing is to verify that method_that_should_not_exist is correct.
-            for ins in method.code.disassemble():
-                if ins == "invokevirtual":
-                    const = ins.operands[0]
-                    method_that_should_not_exist_desc = method_descriptor(const.name_and_type.descriptor.value)
-                    method_that_should_not_exist_name = const.name_and_type.name.value
-                    assert method_that_should_not_exist_desc.returns.name == 'boolean'
-                    assert len(method_that_should_not_exist_desc.args) == 1
-                    assert method_that_should_not_exist_desc.args[0].name == enumfacing
-                    break
-            else:
-                raise Exception("Failed to find invokevirtual instruction")
+            method_that_should_not_exist_desc = method_descriptor(use_direction_const.name_and_type.descriptor.value)
+            method_that_should_not_exist_name = use_direction_const.name_and_type.name.value
+            assert method_that_should_not_exist_desc.returns.name == 'boolean'
+            assert len(method_that_should_not_exist_desc.args) == 1
+            assert method_that_should_not_exist_desc.args[0].name == enumfacing
 
-            for ins2 in method2.code.disassemble():
+            for ins2 in disassemble(method2):
                 if ins2 == "getstatic":
                     const2 = ins2.operands[0]
                     assert const2.class_.name == name
@@ -158,7 +187,7 @@ class BlockStateTopping(Topping):
 
             method3 = cf.methods.find_one(name='<clinit>')
             source_ins = None
-            for ins3 in method3.code.disassemble():
+            for ins3 in disassemble(method3):
                 if ins3 == "getstatic":
                     source_ins = ins3
                 elif ins3 == "putstatic":
@@ -187,7 +216,7 @@ class BlockStateTopping(Topping):
             """
             method4 = multidirectional_cf.methods.find_one(name='<clinit>')
             next_is_lambda = False
-            for ins4 in method4.code.disassemble():
+            for ins4 in disassemble(method4):
                 if ins4 == "invokestatic":
                     if ins4.operands[0].name_and_type.name == "newEnumMap":
                         next_is_lambda = True
@@ -203,7 +232,7 @@ class BlockStateTopping(Topping):
 
             property_by_facing = {}
             stack5 = []
-            for ins5 in lambda_method.code.disassemble():
+            for ins5 in disassemble(lambda_method):
                 if ins5 == "getstatic":
                     const5 = ins5.operands[0]
                     prop = {
@@ -223,6 +252,13 @@ class BlockStateTopping(Topping):
                 properties.append(property_by_facing[facing["field"]])
             return properties, (method_that_should_not_exist_desc, method_that_should_not_exist_name)
 
+        # Properties (and the property types they use) for each class, kept
+        # between versions for classes that haven't changed
+        properties_cache = class_analysis_cache(classloader, "blockstates.properties",
+                                                topping_fingerprint(BlockStateTopping),
+                                                (blockstatecontainer, base_method.name.value,
+                                                 base_method.descriptor.value, is_18w19a))
+
         def process_class(name):
             """
             Gets the properties for the given block class, checking the parent
@@ -233,6 +269,22 @@ class BlockStateTopping(Topping):
                 # Caching - avoid reading the same class multiple times
                 return properties_by_class[name]
 
+            nonlocal _property_types
+            # The types used by this class (and its parents) are collected
+            # separately, so that they can be cached along with its properties
+            outer_property_types = _property_types
+            class_property_types = _property_types = set()
+            try:
+                properties, types = properties_cache.get(name, lambda lookups: (_process_class(name), _property_types))
+            finally:
+                # Types found before a failure are still kept
+                _property_types = outer_property_types
+                _property_types.update(class_property_types)
+            _property_types.update(types)
+            properties_by_class[name] = properties
+            return properties
+
+        def _process_class(name):
             cf = classloader[name]
             method = cf.methods.find_one(f=matches)
 
@@ -244,7 +296,7 @@ class BlockStateTopping(Topping):
             properties = None
             if_pos = None
             stack = []
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 # This could _almost_ just be checking for getstatic, but
                 # brewing stands use an array of properties as the field,
                 # so we need some stupid extra logic.
@@ -272,7 +324,7 @@ class BlockStateTopping(Topping):
                         # This code is very brittle and hacky.
                         init = cf.methods.find_one(name="<clinit>")
                         stack2 = []
-                        for ins2 in init.code.disassemble():
+                        for ins2 in disassemble(init):
                             # return appears too, but we break before it
                             assert ins2 in ("getstatic", "invokestatic", "putstatic")
                             if ins2 == "getstatic":
@@ -489,28 +541,13 @@ class BlockStateTopping(Topping):
                     print("Unknown property type %s with signature %s" % (type, signature))
 
         # Part 2: figure out what each field is.
-        is_enum_cache = {}
+        hierarchy = class_hierarchy(classloader)
         def is_enum(cls):
             """
             Checks if the given class is an enum.
-            This needs to be recursive due to inner classes for enums.
+            This needs to check all superclasses due to inner classes for enums.
             """
-            if cls in is_enum_cache:
-                return is_enum_cache[cls]
-            if cls not in classloader:
-                is_enum_cache[cls] = False
-                return False
-
-            cf = classloader[cls]
-            super = cf.super_.name.value
-            if super == "java/lang/Enum":
-                is_enum_cache[cls] = True
-            elif super == "java/lang/Object":
-                is_enum_cache[cls] = False
-            else:
-                is_enum_cache[cls] = is_enum(super)
-
-            return is_enum_cache[cls]
+            return cls != "java/lang/Enum" and hierarchy.is_subclass(cls, "java/lang/Enum")
 
         fields_by_class = {}
 
@@ -605,7 +642,7 @@ class BlockStateTopping(Topping):
             stack = []
             locals = {}
 
-            for ins in init.code.disassemble():
+            for ins in disassemble(init):
                 if ins == "putstatic":
                     const = ins.operands[0]
                     name = const.name_and_type.name.value
@@ -25,7 +25,10 @@ THE SOFTWARE.
 import six
 
 from .topping import Topping
-from burger.util import WalkerCallback, class_from_invokedynamic, walk_method
+from burger.util import WalkerCallback, class_from_invokedynamic, walk_method, disassemble
+from burger.hierarchy import class_hierarchy
+from burger.classcache import class_analysis_cache
+from burger.cache import topping_fingerprint
 
 from jawa.constants import *
 from jawa.util.descriptor import method_descriptor
@@ -290,7 +293,7 @@ class EntityTopping(Topping):
         tmp = {}
         minecart_info = {}
 
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if mode == "starting":
                 # We don't care about the logger setup stuff at the beginning;
                 # wait until an entity definition starts.
@@ -359,7 +362,7 @@ class EntityTopping(Topping):
         init_method = minecart_cf.methods.find_one(name="<clinit>")
 
         already_has_minecart_name = False
-        for ins in init_method.code.disassemble():
+        for ins in disassemble(init_method):
             if ins == "new":
                 const = ins.operands[0]
                 minecart_class = const.name.value
@@ -391,9 +394,6 @@ class EntityTopping(Topping):
 
     @staticmethod
     def compute_sizes(classloader, aggregate, entities):
-        # Class -> size
-        size_cache = {}
-
         # NOTE: Use aggregate["entities"] instead of the given entities list because
         # this method is re-used in the objects topping
         base_entity_cf = classloader[aggregate["entities"]["entity"]["~abstract_entity"]["class"]]
@@ -404,18 +404,21 @@ class EntityTopping(Topping):
         set_size_name = set_size.name.value
         set_size_desc = set_size.descriptor.value
 
+        # Class -> size, kept between versions for classes that haven't changed
+        size_cache = class_analysis_cache(classloader, "entities.size", topping_fingerprint(EntityTopping),
+                                          (set_size_name, set_size_desc))
+
         def compute_size(class_name):
             if class_name == "java/lang/Object":
                 return None
+            return size_cache.get(class_name, lambda lookups: _compute_size(class_name))
 
-            if class_name in size_cache:
-                return size_cache[class_name]
-
+        def _compute_size(class_name):
             cf = classloader[class_name]
             constructor = cf.methods.find_one(name="<init>")
 
             tmp = []
-            for ins in constructor.code.disassemble():
+            for ins in disassemble(constructor):
                 if ins in ("ldc", "ldc_w"):
                     const = ins.operands[0]
                     if isinstance(const, Float):
@@ -437,7 +440,6 @@ class EntityTopping(Topping):
                 # No result, so use the superclass
                 result = compute_size(cf.super_.name.value)
 
-            size_cache[class_name] = result
             return result
 
         for entity in six.itervalues(entities):
@@ -450,14 +452,14 @@ class EntityTopping(Topping):
     @staticmethod
     def abstract_entities(classloader, entities, verbose):
         entity_classes = {e["class"]: e["name"] for e in six.itervalues(entities)}
+        hierarchy = class_hierarchy(classloader)
 
         # Add some abstract classes, to help with metadata, and for reference only;
         # these are not spawnable
         def abstract_entity(abstract_name, *subclass_names):
             for name in subclass_names:
                 if name in entities:
-                    cf = classloader[entities[name]["class"]]
-                    parent = cf.super_.name.value
+                    parent = hierarchy.super_of(entities[name]["class"])
                     if parent not in entity_classes:
                         entities["~abstract_" + abstract_name] = { "class": parent, "name": "~abstract_" + abstract_name }
                     elif verbose:
@@ -1,7 +1,7 @@
 import six
 
 from .topping import Topping
-from burger.util import WalkerCallback, walk_method, string_from_invokedymanic, InvokeDynamicInfo
+from burger.util import WalkerCallback, walk_method, walk_method_summarized, string_from_invokedymanic, InvokeDynamicInfo, disassemble
 
 from jawa.constants import *
 from jawa.util.descriptor import method_descriptor
@@ -40,7 +40,7 @@ class EntityMetadataTopping(Topping):
         register_method = datamanager_cf.methods.find_one(f=lambda m: len(m.args) == 2 and m.args[0].name == dataparameter_class)
 
         dataserializers_class = None
-        for ins in register_method.code.disassemble():
+        for ins in disassemble(register_method):
             # The code loops up an ID and throws an exception if it's not registered
             # We want the class that it looks the ID up in
             if ins == "invokestatic":
@@ -62,7 +62,7 @@ class EntityMetadataTopping(Topping):
         register_data_method_name = None
         register_data_method_desc = "()V"
         # The last call in the base entity constructor is to registerData() (formerly entityInit())
-        for ins in base_entity_cf.methods.find_one(name="<init>").code.disassemble():
+        for ins in disassemble(base_entity_cf.methods.find_one(name="<init>")):
             if ins.mnemonic == "invokevirtual":
                 const = ins.operands[0]
                 if const.name_and_type.descriptor == register_data_method_desc:
@@ -257,7 +257,7 @@ class EntityMetadataTopping(Topping):
             # find if the class has a `boolean getFlag(int)` method
             for method in cf.methods.find(args="I", returns="Z"):
                 previous_operators = []
-                for ins in method.code.disassemble():
+                for ins in disassemble(method):
                     if ins.mnemonic == "bipush":
                         # check for a series of operators that looks something like this
                         # `return ((Byte)this.R.a(bo) & var1) != 0;`
@@ -277,7 +277,7 @@ class EntityMetadataTopping(Topping):
                 if method.code:
                     bitmask_value = None
                     stack = []
-                    for ins in method.code.disassemble():
+                    for ins in disassemble(method):
                         # the method calls getField() or getSharedField()
                         if ins.mnemonic in ("invokevirtual", "invokespecial", "invokeinterface", "invokestatic"):
                             calling_method = ins.operands[0].name_and_type.name.value
@@ -370,7 +370,7 @@ class EntityMetadataTopping(Topping):
             # that take lambdas (as well as ones that take a class for an enum, or a registry)
             # We are only interested in the lambda ones here.  The arguments are the functions
             # to call for writing and for reading.
-            for ins in func.code.disassemble():
+            for ins in disassemble(func):
                 if ins.mnemonic == "new":
                     static_funcs_to_classes[func.name.value + func.descriptor.value] = ins.operands[0].name.value
                     break
@@ -394,7 +394,7 @@ class EntityMetadataTopping(Topping):
                 if name == "asOptional":
                     biconsumer_cf = classloader[const.class_.name.value]
                     method = biconsumer_cf.methods.find_one(name=name, f=lambda f: f.descriptor.value == desc)
-                    for ins2 in method.code.disassemble():
+                    for ins2 in disassemble(method):
                         if ins2.mnemonic == "invokedynamic":
                             fake_stack = [obj, *args]
                             info = InvokeDynamicInfo.create(ins2, biconsumer_cf)
@@ -415,7 +415,7 @@ class EntityMetadataTopping(Topping):
                     return {"class": static_funcs_to_classes[key], "special_fields": special_fields}
                 else:
                     # Assume that this calls the 2-args method
-                    return walk_method(dataserializer_cf, dataserializer_cf.methods.find_one(name=name, f=lambda f: f.descriptor.value == desc), SubCallback(), verbose, input_args=args)
+                    return walk_method_summarized(dataserializer_cf, dataserializer_cf.methods.find_one(name=name, f=lambda f: f.descriptor.value == desc), SubCallback(), verbose, input_args=args)
             def on_get_field(self, ins, const, obj):
                 raise Exception("Illegal getfield")
             def on_put_field(self, ins, const, obj, value):
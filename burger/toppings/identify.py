@@ -23,9 +23,13 @@ THE SOFTWARE.
 """
 
 from .topping import Topping
-from burger.util import string_from_invokedymanic
+from burger.util import string_from_invokedymanic, disassemble
+from burger.hierarchy import class_hierarchy, constant_pool, CONSTANT_CLASS, CONSTANT_STRING
+from burger.stringindex import string_index
 
-from jawa.constants import String, ConstantClass
+import multiprocessing
+import re
+import time
 
 # We can identify almost every class we need just by
 # looking for consistent strings.
@@ -95,6 +99,58 @@ MAYBE_MATCHES = (
 # TODO: Including it here seems to fix things, though further testing is needed as the entities topping was broken in an earlier snapshot.
 IGNORE_DUPLICATES = [ "biome.register", "particletypes", "blockstate", "nethandler.client", "packet.packetbuffer", "metadata" ]
 
+# String constants that are checked individually in identify(), in addition to
+# MATCHES and MAYBE_MATCHES.  These need to be kept in sync with identify(), as
+# any constant that isn't listed here is skipped without being examined.
+SPECIAL_VALUES = [
+    'ambient.cave',
+    'piston_head',
+    'diamond_pickaxe',
+    'attached_pumpkin_stem',
+    'pumpkin_seeds',
+    'Ice Plains',
+    'mutated_ice_flats',
+    'ice_spikes',
+    'minecraft',
+    'PooledMutableBlockPosition modified after it was released.',
+    'Getting block state',
+    'particle.notFound',
+    'HORIZONTAL',
+]
+SPECIAL_SUBSTRINGS = [
+    'as a Component',
+    "Couldn't get field 'lineStart' for JsonReader",
+    'Outdated server!',
+    'multiplayer.disconnect.outdated_client',
+]
+
+def _build_prefilter():
+    """
+    Compiles every pattern that identify() looks for into a set of exact values
+    and a single regex of substrings, so that the vast majority of constants
+    (which match nothing) can be rejected with one lookup and one scan instead
+    of being compared against each pattern in turn.
+    """
+    exact = set(SPECIAL_VALUES)
+    substrings = list(SPECIAL_SUBSTRINGS)
+    for match_list, _ in MATCHES + MAYBE_MATCHES:
+        if isinstance(match_list, tuple):
+            exact.update(match_list[0])
+        else:
+            substrings.extend(match_list)
+
+    return frozenset(exact), re.compile("|".join(re.escape(sub) for sub in substrings))
+
+_PREFILTER_EXACT, _PREFILTER_RE = _build_prefilter()
+
+def might_match(value):
+    """
+    Returns False if the given string constant can't possibly be of interest
+    to identify().  A return value of True only means that the full checks
+    need to be run.
+    """
+    return value in _PREFILTER_EXACT or _PREFILTER_RE.search(value) is not None
+
 def check_match(value, match_list):
     exact = False
     if isinstance(match_list, tuple):
@@ -122,18 +178,21 @@ def identify(classloader, path, verbose):
     """
     possible_match = None
 
-    for c in classloader.search_constant_pool(path=path, type_=(String, ConstantClass)):
-        if isinstance(c, String):
-            value = c.string.value
+    # Only the String and Class constants are read at first; the class is
+    # only parsed fully if it needs a closer look
+    pool = constant_pool(classloader, path)
+    for tag, value in pool.constants:
+        if tag == CONSTANT_STRING:
+            if not might_match(value):
+                continue
+
             for match_list, match_name in MATCHES:
                 if check_match(value, match_list):
-                    class_file = classloader[path]
-                    return match_name, class_file.this.name.value
+                    return match_name, pool.name
 
             for match_list, match_name in MAYBE_MATCHES:
                 if check_match(value, match_list):
-                    class_file = classloader[path]
-                    possible_match = (match_name, class_file.this.name.value)
+                    possible_match = (match_name, pool.name)
                     # Continue searching through the other constants in the class
 
             if "as a Component" in value or "Couldn't get field 'lineStart' for JsonReader" in value:
@@ -141,7 +200,7 @@ def identify(classloader, path, verbose):
                 # (The "as a Component" String exists starting in 13w36a (1.7.2), but
                 # was removed in 23w40a. The "Couldn't get field 'lineStart' for JsonReader"
                 # string exists since at least 1.20.2 and was removed in 1.20.3. We have another
-                # check in the `if isinstance(c, ConstantClass):` to handle 1.20.3+.)
+                # check in the `elif tag == CONSTANT_CLASS:` branch to handle 1.20.3+.)
 
                 # Look for a method that returns a String, and assume that it takes a component as its
                 # sole parameter.
@@ -159,44 +218,38 @@ def identify(classloader, path, verbose):
                 # This is found in both the sounds list class and sounds event class.
                 # However, the sounds list class also has a constant specific to it.
                 # Note that this method will not work in 1.8, but the list class doesn't exist then either.
-                class_file = classloader[path]
-
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     if c2 == 'Accessed Sounds before Bootstrap!':
-                        return 'sounds.list', class_file.this.name.value
+                        return 'sounds.list', pool.name
                 else:
-                    return 'sounds.event', class_file.this.name.value
+                    return 'sounds.event', pool.name
 
             if value == 'piston_head':
                 # piston_head is a technical block, which is important as that means it has no item form.
                 # This constant is found in both the block list class and the class containing block registrations.
-                class_file = classloader[path]
-
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     if c2 == 'doTileDrops':
                         # not in the list, only in registry
-                        return 'block.register', class_file.this.name.value
-                for c2 in class_file.constants.find(type_=String):
+                        return 'block.register', pool.name
+                for c2 in pool.strings:
                     if c2 == 'Tesselating block in world':
                         # Rendering code, which we don't care about
                         return
-                for c2 in class_file.constants.find(type_=ConstantClass):
-                    if c2.name == 'com/mojang/serialization/MapCodec':
+                for c2 in pool.classes:
+                    if c2 == 'com/mojang/serialization/MapCodec':
                         # In 23w40a (1.20.3), a BlockTypes class was added that handles the codec for blocks,
                         # which duplicates all of the block identifier strings. As a pretty awful
                         # heuristic, ignore classes that reference the codec. Note that the codec
                         # system isn't obfuscated.
                         return
-                return 'block.list', class_file.this.name.value
+                return 'block.list', pool.name
 
             if value == 'diamond_pickaxe':
                 # Similarly, diamond_pickaxe is only an item.  This exists in 3 classes, though:
                 # - The actual item registration code
                 # - The item list class
                 # - The item renderer class (until 1.13), which we don't care about
-                class_file = classloader[path]
-
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     if c2 == 'textures/misc/enchanted_item_glint.png':
                         # Item renderer, which we don't care about
                         return
@@ -204,28 +257,24 @@ def identify(classloader, path, verbose):
                     if c2 == 'CB3F55D3-645C-4F38-A497-9C13A33DB5CF':
                         # Item registry always contains this uuid for
                         # "BASE_ATTACK_DAMAGE_UUID"
-                        return 'item.register', class_file.this.name.value
+                        return 'item.register', pool.name
                 else:
-                    return 'item.list', class_file.this.name.value
+                    return 'item.list', pool.name
 
             if value == 'attached_pumpkin_stem':
                 # 23w40a (1.20.3) adds a references/Blocks class with entries that look like:
                 # public static final ResourceKey<Block> ATTACHED_PUMPKIN_STEM = createKey("attached_pumpkin_stem");
-                class_file = classloader[path]
-
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     # make sure it's not the normal block list class
                     if c2 == 'air':
                         return
 
-                return 'block.references', class_file.this.name.value
+                return 'block.references', pool.name
 
             if value == 'pumpkin_seeds':
                 # the items list is similar, but with items instead of blocks:
                 # public static final ResourceKey<Item> PUMPKIN_SEEDS = createKey("pumpkin_seeds");
-                class_file = classloader[path]
-
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     # again, this is to make sure it's not the normal item list class
 
                     # note that this might break in the future if the "diamond_pickaxe" string is moved
@@ -233,18 +282,16 @@ def identify(classloader, path, verbose):
                     if c2 == 'diamond_pickaxe':
                         return
 
-                return 'item.references', class_file.this.name.value
+                return 'item.references', pool.name
 
             if value in ('Ice Plains', 'mutated_ice_flats', 'ice_spikes'):
                 # Finally, biomes.  There's several different names that were used for this one biome
                 # Only classes are the list class and the one with registration.  Note that the list didn't exist in 1.8.
-                class_file = classloader[path]
-
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     if c2 == 'Accessed Biomes before Bootstrap!':
-                        return 'biome.list', class_file.this.name.value
+                        return 'biome.list', pool.name
                 else:
-                    return 'biome.register', class_file.this.name.value
+                    return 'biome.register', pool.name
 
             if value == 'minecraft':
                 class_file = classloader[path]
@@ -272,15 +319,14 @@ def identify(classloader, path, verbose):
                 # Also, this is the _only_ string constant available to us.
                 # Finally, note that PooledMutableBlockPos was introduced in 1.9.
                 # This technique will not work in 1.8.
-                cf = classloader[path]
+                hierarchy = class_hierarchy(classloader)
                 logger_type = "Lorg/apache/logging/log4j/Logger;"
-                while not cf.fields.find_one(type_=logger_type):
-                    if cf.super_.name == "java/lang/Object":
-                        cf = None
+                for cls in [path] + hierarchy.super_chain(path):
+                    info = hierarchy.info(cls)
+                    if info is None:
                         break
-                    cf = classloader[cf.super_.name.value]
-                if cf:
-                    return 'position', cf.this.name.value
+                    if any(descriptor == logger_type for descriptor, _ in info.fields.values()):
+                        return 'position', cls
 
             if value == 'Getting block state':
                 # This message is found in Chunk, in the method getBlockState.
@@ -289,7 +335,7 @@ def identify(classloader, path, verbose):
                 class_file = classloader[path]
 
                 for method in class_file.methods:
-                    for ins in method.code.disassemble():
+                    for ins in disassemble(method):
                         if ins.mnemonic in ("ldc", "ldc_w"):
                             if ins.operands[0] == 'Getting block state':
                                 return 'blockstate', method.returns.name
@@ -328,7 +374,7 @@ def identify(classloader, path, verbose):
 
                 if len(list(class_file.methods.find(name="<init>", f=is_enumfacing_plane_constructor))) != 0:
                     return "enumfacing.plane", class_file.this.name.value
-                for c2 in class_file.constants.find(type_=String):
+                for c2 in pool.strings:
                     if c2 == "Someone's been tampering with the universe!":
                         return "enumfacing.plane", class_file.this.name.value
 
@@ -337,11 +383,9 @@ def identify(classloader, path, verbose):
                 if "to be 1.7." in value:
                     continue
 
-                class_file = classloader[path]
-
-                return "nethandler.handshake", class_file.this.name.value
-        elif isinstance(c, ConstantClass):
-            if c.name == 'com/google/gson/Gson':
+                return "nethandler.handshake", pool.name
+        elif tag == CONSTANT_CLASS:
+            if value == 'com/google/gson/Gson':
                 class_file = classloader[path]
                 # the class should have one `private static final Gson GSON`
                 def is_gson_field(f):
@@ -356,7 +400,7 @@ def identify(classloader, path, verbose):
                     serialize_methods = list(class_file.methods.find(f=is_serialize_method))
                     if len(serialize_methods) == 1:
                         # final check to avoid false positives, abort if it has any string constants
-                        for c2 in class_file.constants.find(type_=String):
+                        for c2 in pool.strings:
                             return
                         return "chatcomponent", serialize_methods[0].args[0].name
 
@@ -364,6 +408,47 @@ def identify(classloader, path, verbose):
     return possible_match
 
 
+# Number of shards each worker gets when identifying in parallel.  Using
+# several small shards per worker balances the load between them and lets
+# us stop early once everything has been found.
+SHARDS_PER_JOB = 8
+
+_worker_classloader = None
+
+def _init_worker(classloader):
+    global _worker_classloader
+    _worker_classloader = classloader.reopen()
+
+def _identify_shard(args):
+    paths, verbose = args
+    start = time.process_time()
+    results = []
+    for path in paths:
+        try:
+            results.append(identify(_worker_classloader, path, verbose))
+        except Exception as e:
+            # Re-raised in the parent process, but only if the serial scan
+            # would have reached this class
+            results.append(e)
+    return results, time.process_time() - start
+
+def identify_parallel(classloader, paths, jobs, verbose):
+    """
+    Runs identify() over the given paths using a pool of worker processes,
+    yielding the results in the same order as the paths.
+    """
+    shard_size = max(1, len(paths) // (jobs * SHARDS_PER_JOB))
+    shards = [(paths[i:i + shard_size], verbose) for i in range(0, len(paths), shard_size)]
+
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(classloader,)) as pool:
+        for results, cpu_time in pool.imap(_identify_shard, shards):
+            if hasattr(classloader, "worker_cpu_time"):
+                classloader.worker_cpu_time += cpu_time
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+
 class IdentifyTopping(Topping):
     """Finds important superclasses needed by other toppings."""
 
@@ -402,14 +487,30 @@ class IdentifyTopping(Topping):
 
     DEPENDS = []
 
+    # Number of worker processes used to scan the jar (set by munch.py's --jobs)
+    JOBS = 1
+
     @staticmethod
     def act(aggregate, classloader, verbose=False):
         classes = aggregate.setdefault("classes", {})
-        for path in classloader.path_map.keys():
-            if not path.endswith(".class"):
-                continue
 
-            result = identify(classloader, path[:-len(".class")], verbose)
+        # Only classes with a constant that identify() could match need to be
+        # looked at; the string index finds them without a pass over the jar
+        # (once it has been built, which the other toppings share)
+        index = string_index(classloader)
+        candidates = set(index.classes_referencing("com/google/gson/Gson"))
+        for value, names in index.classes_by_string.items():
+            if might_match(value):
+                candidates.update(names)
+        paths = [path[:-len(".class")] for path in classloader.path_map.keys() if path.endswith(".class")]
+        paths = [path for path in paths if path in candidates]
+
+        if IdentifyTopping.JOBS > 1:
+            results = identify_parallel(classloader, paths, IdentifyTopping.JOBS, verbose)
+        else:
+            results = (identify(classloader, path, verbose) for path in paths)
+
+        for result in results:
             if result:
                 if result[0] in classes:
                     if result[0] in IGNORE_DUPLICATES:
@@ -427,6 +528,9 @@ class IdentifyTopping(Topping):
                     # searching, so stop early for performance
                     break
 
+        # Shuts down the worker pool if the scan stopped early
+        results.close()
+
         # Add classes that might not be recognized in some versions
         # since the registration class is also the list class
         if "sounds.list" not in classes and "sounds.event" in classes:
@@ -26,7 +26,7 @@ from .topping import Topping
 from jawa.constants import *
 from jawa.util.descriptor import method_descriptor
 
-from burger.util import WalkerCallback, walk_method
+from burger.util import WalkerCallback, walk_method, walk_method_summarized, disassemble
 
 import six
 
@@ -69,7 +69,7 @@ class ItemsTopping(Topping):
         # Find the static block, and load the fields for each.
         method = lcf.methods.find_one(name="<clinit>")
         item_name = ""
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ("ldc", "ldc_w"):
                 const = ins.operands[0]
                 if isinstance(const, String):
@@ -110,7 +110,7 @@ class ItemsTopping(Topping):
             references_cf = classloader[references_class]
             for method in references_cf.methods.find(name='<clinit>'):
                 item_id = None
-                for ins in method.code.disassemble():
+                for ins in disassemble(method):
                     if ins.mnemonic == 'ldc':
                         item_id = ins.operands[0].string.value
                     if ins.mnemonic == 'putstatic':
@@ -125,7 +125,7 @@ class ItemsTopping(Topping):
         # Find the max stack size method
         max_stack_method = None
         for method in builder_cf.methods.find(args='I'):
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins.mnemonic in ("ldc", "ldc_w"):
                     const = ins.operands[0]
                     if isinstance(const, String) and const.string.value == "Unable to have damage AND stack.":
@@ -139,7 +139,7 @@ class ItemsTopping(Topping):
         register_item_block_method = lcf.methods.find_one(args='L' + blockclass + ';', returns='L' + superclass + ';')
         item_block_class = None
         # Find the class used that represents an item that is a block
-        for ins in register_item_block_method.code.disassemble():
+        for ins in disassemble(register_item_block_method):
             if ins.mnemonic == "new":
                 const = ins.operands[0]
                 item_block_class = const.name.value
@@ -259,7 +259,7 @@ class ItemsTopping(Topping):
                                 # method in its own class. So, we need to recurse into that...
                                 new_cf = classloader[const.class_.name.value]
                                 new_method = new_cf.methods.find_one(name=method_name, args=desc.args_descriptor, returns=desc.returns_descriptor)
-                                return walk_method(new_cf, new_method, self, verbose)
+                                return walk_method_summarized(new_cf, new_method, self, verbose)
                         else:
                             # Probably returning itself
                             return obj
@@ -321,7 +321,7 @@ class ItemsTopping(Topping):
         # Find the max stack size method
         max_stack_method = None
         for method in builder_cf.methods.find(args='I'):
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins in ("ldc", "ldc_w"):
                     const = ins.operands[0]
                     if isinstance(const, String) and const == "Unable to have damage AND stack.":
@@ -333,7 +333,7 @@ class ItemsTopping(Topping):
         register_item_block_method = cf.methods.find_one(args='L' + blockclass + ';', returns="V")
         item_block_class = None
         # Find the class used that represents an item that is a block
-        for ins in register_item_block_method.code.disassemble():
+        for ins in disassemble(register_item_block_method):
             if ins == "new":
                 const = ins.operands[0]
                 item_block_class = const.name.value
@@ -532,7 +532,7 @@ class ItemsTopping(Topping):
 
         item_block_class = None
         # Find the class used that represents an item that is a block
-        for ins in register_item_block_method.code.disassemble():
+        for ins in disassemble(register_item_block_method):
             if ins == "new":
                 const = ins.operands[0]
                 item_block_class = const.name.value
@@ -545,7 +545,7 @@ class ItemsTopping(Topping):
         }
         tmp = []
 
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins == "new":
                 # The beginning of a new block definition
                 const = ins.operands[0]
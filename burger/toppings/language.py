@@ -22,6 +22,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 from .topping import Topping
+from burger.resources import json_resources
 import six
 
 try:
@@ -76,8 +77,13 @@ class LanguageTopping(Topping):
     @staticmethod
     def load_language(aggregate, classloader, path, verbose=False, is_json=False):
         try:
-            with classloader.open(path) as fin:
-                contents = fin.read().decode("utf-8")
+            if is_json:
+                resources = json_resources(classloader)
+                contents = resources.load(path)
+                resources.forget(path)
+            else:
+                with classloader.open(path) as fin:
+                    contents = fin.read().decode("utf-8")
         except:
             if verbose:
                 print("Can't find file %s in jar" % path)
@@ -90,7 +96,8 @@ class LanguageTopping(Topping):
     @staticmethod
     def parse_lang(contents, verbose, is_json):
         if is_json:
-            contents = json.loads(contents)
+            if isinstance(contents, str):
+                contents = json.loads(contents)
             for tag, value in six.iteritems(contents):
                 category, name = tag.split(".", 1)
 
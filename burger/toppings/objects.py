@@ -26,6 +26,7 @@ import six
 from copy import copy
 
 from .topping import Topping
+from burger.util import disassemble
 
 from jawa.constants import *
 
@@ -68,7 +69,7 @@ class ObjectTopping(Topping):
         item_entity_class = entities["entity"]["item"]["class"] if "item" in entities["entity"] else entities["entity"]["Item"]["class"]
 
         will_be_spawn_object_packet = False
-        for ins in createspawnpacket_method.code.disassemble():
+        for ins in disassemble(createspawnpacket_method):
             if ins == "instanceof":
                 # Check to make sure that it's a spawn packet for item entities
                 const = ins.operands[0]
@@ -101,7 +102,7 @@ class ObjectTopping(Topping):
         potential_id = 0
         current_id = 0
 
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins == "if_icmpne":
                 current_id = potential_id
             elif ins in ("bipush", "sipush"):
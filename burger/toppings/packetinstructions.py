@@ -35,7 +35,10 @@ from jawa.constants import *
 from jawa.transforms import simple_swap
 
 from .topping import Topping
-from burger.util import InvokeDynamicInfo, REF_invokeStatic, get_enum_constants
+from burger.util import InvokeDynamicInfo, REF_invokeStatic, get_enum_constants, disassemble
+from burger.hierarchy import class_hierarchy
+from burger.classcache import class_analysis_cache, replay_reads
+from burger.cache import topping_fingerprint
 
 SUB_INS_EPSILON = .01
 PACKETBUF_NAME = "packetbuffer" # Used to specially identify the PacketBuffer we care about
@@ -47,6 +50,9 @@ class PacketInstructionsTopping(Topping):
         "packets.instructions"
     ]
 
+    # The position class is identified while reading packets
+    MODIFIES = ["classes"]
+
     DEPENDS = [
         "packets.classes",
         "identify.packet.packetbuffer",
@@ -70,7 +76,8 @@ class PacketInstructionsTopping(Topping):
         "writeShort": "short"
     }
 
-    CACHE = {}
+    # Maximum number of method decompilations remembered for each jar
+    CACHE_SIZE = 4096
 
     # Simple instructions are registered below
     OPCODES = {}
@@ -120,11 +127,17 @@ class PacketInstructionsTopping(Topping):
     def act(aggregate, classloader, verbose=False):
         """Finds all packets and decompiles them"""
         thunks = _PIT.list_thunks(classloader, aggregate["classes"]["packet.packetbuffer"])
+        # Packets whose code hasn't changed since an earlier version don't
+        # need to be decompiled again
+        cache = class_analysis_cache(classloader, "packetinstructions.operations",
+                                     topping_fingerprint(PacketInstructionsTopping), thunks)
         for key, packet in six.iteritems(aggregate["packets"]["packet"]):
             operations = None
             try:
                 classname = packet["class"][:-len(".class")]
-                operations = _PIT.class_operations(classloader, classname, aggregate["classes"], verbose, thunks)
+                operations = cache.get(classname,
+                                       lambda classes: _PIT.class_operations(classloader, classname, classes, verbose, thunks),
+                                       aggregate["classes"])
                 packet.update(_PIT.format(operations))
             except Exception as e:
                 if verbose:
@@ -177,7 +190,7 @@ class PacketInstructionsTopping(Topping):
         cf = classloader[packetbuffer_class]
         thunks = {}
         for method in cf.methods.find(returns="L" + packetbuffer_class + ";"):
-            insts = list(method.code.disassemble())
+            insts = list(disassemble(method))
             if len(insts) < 6:
                 continue
             # NOTE: simple_swap transform (from classloader configuration in munch.py) changes aload_0 to aload
@@ -272,7 +285,7 @@ class PacketInstructionsTopping(Topping):
         # NOTE: we only use the simple_swap transform here due to the
         # expand_constants transform making it hard to use InstructionField
         # InstructionField should probably be cleaned up first
-        for instruction in method.code.disassemble(transforms=[simple_swap]):
+        for instruction in disassemble(method, transforms=[simple_swap]):
             if skip_until != -1:
                 if instruction.pos == skip_until:
                     skip_until = -1
@@ -1030,40 +1043,42 @@ class PacketInstructionsTopping(Topping):
         Note that for instance methods, `this` is included in args.
         """
         cache_key = "%s/%s/%s/%s/%s" % (invoked_class, name, desc, _PIT.join(args, ","), special_fields)
-
-        if cache_key in _PIT.CACHE:
-            cache = _PIT.CACHE[cache_key]
-            operations = [op.clone() for op in cache]
+        cache = classloader.memo("packetinstructions.sub_operations", _PIT.CACHE_SIZE)
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached, reads = cached
+            # Anything caching the operations of the calling class depends on
+            # the classes these were found from too
+            replay_reads(classloader, reads, classes)
+            operations = [op.clone() for op in cached]
         else:
-            # invokestatic instructions (and presumably invokevirtual etc) can be linked to the
-            # current class, even if the invoked function is for a parent class. This is relevant
-            # in 13w41a.
-            cf = classloader[invoked_class]
-            method = None
-
-            while True:
-                method = cf.methods.find_one(name=name, args=desc.args_descriptor)
-                if method != None:
-                    break
-                if cf.super_.name.value == "java/util/Object":
-                    break
-                cf = classloader[cf.super_.name.value]
-
-            if method == None:
-                if verbose:
-                    print("Failed to find method corresponding to %s(%s) in %s or its parent classes" % (name, desc.args_descriptor, invoked_class))
-                assert method != None
-
-            if method.access_flags.acc_abstract:
-                assert not method.access_flags.acc_static
-                call_type = "interface" if cf.access_flags.acc_interface else "abstract"
-                operations = [Operation(0, "interfacecall", type=call_type,
-                                        target=invoked_class, name=name,
-                                        method=name + desc.descriptor, field=args[0],
-                                        args=_PIT.join(args[1:]))]
-            else:
-                operations = _PIT.operations(classloader, cf, classes, verbose,
-                                             method, args, thunks, special_fields)
+            reads = []
+            with classloader.record_reads(reads):
+                # invokestatic instructions (and presumably invokevirtual etc) can be linked to the
+                # current class, even if the invoked function is for a parent class. This is relevant
+                # in 13w41a.
+                owner = class_hierarchy(classloader).resolve_method(invoked_class, name, args=desc.args_descriptor)
+                method = None
+                if owner is not None:
+                    cf = classloader[owner]
+                    method = cf.methods.find_one(name=name, args=desc.args_descriptor)
+
+                if method == None:
+                    if verbose:
+                        print("Failed to find method corresponding to %s(%s) in %s or its parent classes" % (name, desc.args_descriptor, invoked_class))
+                    assert method != None
+
+                if method.access_flags.acc_abstract:
+                    assert not method.access_flags.acc_static
+                    call_type = "interface" if cf.access_flags.acc_interface else "abstract"
+                    operations = [Operation(0, "interfacecall", type=call_type,
+                                            target=invoked_class, name=name,
+                                            method=name + desc.descriptor, field=args[0],
+                                            args=_PIT.join(args[1:]))]
+                else:
+                    operations = _PIT.operations(classloader, cf, classes, verbose,
+                                                 method, args, thunks, special_fields)
 
         # Sort operations by position, and try to ensure all of them fit between
         # two normal instructions.  Note that since operations are renumbered
@@ -1079,7 +1094,7 @@ class PacketInstructionsTopping(Topping):
             assert(position < 1)
             operation.position = instruction.pos + (position)
 
-        _PIT.CACHE[cache_key] = operations
+        cache[cache_key] = (operations, reads)
 
         return operations
 
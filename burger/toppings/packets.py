@@ -155,7 +155,7 @@ class PacketsTopping(Topping):
         # First, figure out registerServerbound and registerClientbound by looking for the string constants:
         directions_by_method = {}
         for method in register_methods:
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins == "ldc":
                     const = ins.operands[0]
                     if isinstance(const, String):
@@ -388,7 +388,7 @@ class PacketsTopping(Topping):
                states.keys() == set(("HANDSHAKING", "PLAY", "STATUS", "LOGIN", "CONFIGURATION"))
 
         # Identify the direction class, by first locating builder() as the first call...
-        for ins in clinit.code.disassemble():
+        for ins in disassemble(clinit):
             if ins.mnemonic == "invokestatic":
                 const = ins.operands[0]
                 assert const.class_.name == connectionstate
@@ -564,7 +564,7 @@ class PacketsTopping(Topping):
                    insts[8].mnemonic == 'areturn'
 
         handshake_register_method = handshake_list_cf.methods.find_one(args='Ljava/lang/String;')
-        handshake_register_insts = list(handshake_register_method.code.disassemble())
+        handshake_register_insts = list(disassemble(handshake_register_method))
         check_register_method_insts(handshake_register_insts)
 
         direction_class = handshake_register_insts[2].operands[0].class_.name.value
@@ -578,13 +578,13 @@ class PacketsTopping(Topping):
         assert get_register_method_direction(handshake_register_insts) == "SERVERBOUND"
 
         handshake_clinit_method = handshake_list_cf.methods.find_one(name='<clinit>')
-        handshake_clinit_insts = list(handshake_clinit_method.code.disassemble())
+        handshake_clinit_insts = list(disassemble(handshake_clinit_method))
         assert len(handshake_clinit_insts) == 4
         assert handshake_clinit_insts[0].mnemonic == 'ldc' and handshake_clinit_insts[1].mnemonic == 'invokestatic' and \
                handshake_clinit_insts[2].mnemonic == 'putstatic' and handshake_clinit_insts[3].mnemonic == 'return'
 
         def process_packet_list_method(method):
-            insts = list(method.code.disassemble())
+            insts = list(disassemble(method))
             check_register_method_insts(insts)
             direction = get_register_method_direction(insts)
 
@@ -597,7 +597,7 @@ class PacketsTopping(Topping):
 
             register_method_dirs_by_method_name = {}
             for m in list_cf.methods.find(args='Ljava/lang/String;'):
-                insts = list(m.code.disassemble())
+                insts = list(disassemble(m))
                 check_register_method_insts(insts)
                 register_method_dirs_by_method_name[m.name.value] = get_register_method_direction(insts)
 
@@ -609,7 +609,7 @@ class PacketsTopping(Topping):
                 inner_type = signature[signature.index('<')+2 : signature.rindex('>') - 1]
                 field_to_class[f.name.value] = inner_type + '.class'
 
-            clinit_insts = list(list_cf.methods.find_one(name='<clinit>').code.disassemble())
+            clinit_insts = list(disassemble(list_cf.methods.find_one(name='<clinit>')))
             assert clinit_insts[-1].mnemonic == 'return'
             # Groups of 3 instructions: ldc, invokestatic, then putstatic
             assert (len(clinit_insts) - 1) % 3 == 0
@@ -1,4 +1,5 @@
 from .topping import Topping
+from burger.util import disassemble
 
 
 class ParticleTypesTopping(Topping):
@@ -14,7 +15,7 @@ class ParticleTypesTopping(Topping):
         # Method is either <clinit> or a void with no parameters, check both
         # until we find one that loads constants
         for meth in cf.methods.find(args='', returns='V'):
-            ops = tuple(meth.code.disassemble())
+            ops = tuple(disassemble(meth))
             if next(filter(lambda op: 'ldc' in op.name, ops), False):
                 break
 
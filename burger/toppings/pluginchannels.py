@@ -24,7 +24,7 @@ THE SOFTWARE.
 
 from .topping import Topping
 
-from jawa.constants import String
+from burger.stringindex import string_index
 
 import re
 
@@ -123,20 +123,19 @@ def _get_custom_payload_packets(classloader, ignore_clientbound=False, ignore_se
     clientbound_packet = None
     serverbound_packet = None
 
-    for class_name in classloader.classes:
-
-        if (ignore_clientbound or clientbound_packet is not None) and (ignore_serverbound or serverbound_packet is not None):
-            break
-
-        constants = _get_class_constants(classloader, class_name)
+    index = string_index(classloader)
 
+    def find_packet(message):
         # Make sure we have the right message, and at least one identifier declared in the class (to avoid login custom payload packet)
-        if not ignore_clientbound and clientbound_packet is None and "Payload may not be larger than 1048576 bytes" in constants:
-            if any([const for const in constants if _is_channel_identifier(const)]):
-                clientbound_packet = class_name
-        elif not ignore_serverbound and serverbound_packet is None and "Payload may not be larger than 32767 bytes" in constants:
-            if any([const for const in constants if _is_channel_identifier(const)]):
-                serverbound_packet = class_name
+        for class_name in index.classes_with(message):
+            if any(_is_channel_identifier(const) for const in index.strings(class_name)):
+                return class_name
+        return None
+
+    if not ignore_clientbound:
+        clientbound_packet = find_packet("Payload may not be larger than 1048576 bytes")
+    if not ignore_serverbound:
+        serverbound_packet = find_packet("Payload may not be larger than 32767 bytes")
 
     assert (ignore_clientbound or clientbound_packet is not None) and (ignore_serverbound or serverbound_packet is not None),\
         f"Unable to find required custom payload packets (client: {clientbound_packet}, server: {serverbound_packet})"
@@ -144,5 +143,4 @@ def _get_custom_payload_packets(classloader, ignore_clientbound=False, ignore_se
     return [clientbound_packet, serverbound_packet]
 
 def _get_class_constants(classloader, class_name, filter_function = lambda c: True):
-    constants = [constant.string.value for constant in classloader.search_constant_pool(path=class_name, type_=String)]
-    return list(filter(filter_function, constants))
+    return list(filter(filter_function, string_index(classloader).strings(class_name)))
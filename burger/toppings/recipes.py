@@ -23,17 +23,15 @@ THE SOFTWARE.
 """
 
 from .topping import Topping
+from burger.util import disassemble
+from burger.resources import json_resources
 
 from jawa.util.descriptor import method_descriptor
 from jawa.constants import *
 
-try:
-    import json
-except ImportError:
-    import simplejson as json
-
 import six
 import copy
+import itertools
 
 class RecipesTopping(Topping):
     """Provides a list of most possible crafting recipes."""
@@ -51,6 +49,14 @@ class RecipesTopping(Topping):
         "tags"
     ]
 
+    # If set, a JSON recipe whose ingredients have alternatives (lists or
+    # tags) is output once, with a list of choices in place of each such
+    # ingredient, rather than once for every combination of choices; see
+    # expand_recipe().  This keeps the output linear in the number of recipe
+    # files, which otherwise grows quickly with the size of tags.
+    COMPACT = False
+    OPTIONS = ("COMPACT",)
+
     @staticmethod
     def act(aggregate, classloader, verbose=False):
         if "assets/minecraft/recipes/stick.json" in classloader.path_map:
@@ -120,99 +126,129 @@ class RecipesTopping(Topping):
 
             return result
 
-        for name in classloader.path_map.keys():
-            if name.startswith(prefix) and name.endswith(".json"):
-                recipe_id = "minecraft:" + name[len(prefix):-len(".json")]
-                try:
-                    with classloader.open(name) as fin:
-                        data = json.load(fin)
-
-                    assert "type" in data
-                    recipe_type = data["type"]
-                    if recipe_type.startswith("minecraft:"):
-                        recipe_type = recipe_type[len("minecraft:"):]
-
-                    if recipe_type not in ("crafting_shaped", "crafting_shapeless"):
-                        # We only care about regular recipes, not furnace/loom/whatever ones.
-                        continue
-
-                    recipe = {}
-                    recipe["id"] = recipe_id # new for 1.12, but used ingame
-
-                    if "group" in data:
-                        recipe["group"] = data["group"]
-
-
-                    assert "result" in data
-                    recipe["makes"] = parse_item(data["result"], False)
-                    if "count" not in recipe["makes"]:
-                        recipe["makes"]["count"] = 1 # default, TODO should we keep specifying this?
-
-                    matching_recipes = [recipe]
-
-                    if recipe_type == "crafting_shapeless":
-                        recipe["type"] = 'shapeless'
-
-                        assert "ingredients" in data
+        resources = json_resources(classloader)
+        names = resources.paths_under(prefix)
+        resources.preload(names)
+        for name in names:
+            recipe_id = "minecraft:" + name[len(prefix):-len(".json")]
+            try:
+                # The parsed file is shared, and parts of it are kept
+                data = copy.deepcopy(resources.load(name))
+
+                assert "type" in data
+                recipe_type = data["type"]
+                if recipe_type.startswith("minecraft:"):
+                    recipe_type = recipe_type[len("minecraft:"):]
+
+                if recipe_type not in ("crafting_shaped", "crafting_shapeless"):
+                    # We only care about regular recipes, not furnace/loom/whatever ones.
+                    continue
+
+                recipe = {}
+                recipe["id"] = recipe_id # new for 1.12, but used ingame
+
+                if "group" in data:
+                    recipe["group"] = data["group"]
+
+
+                assert "result" in data
+                recipe["makes"] = parse_item(data["result"], False)
+                if "count" not in recipe["makes"]:
+                    recipe["makes"]["count"] = 1 # default, TODO should we keep specifying this?
+
+                matching_recipes = [recipe]
+
+                if recipe_type == "crafting_shapeless":
+                    recipe["type"] = 'shapeless'
+
+                    assert "ingredients" in data
+
+                    recipe["ingredients"] = []
+                    for ingredient in data["ingredients"]:
+                        item = parse_item(ingredient)
+                        if isinstance(item, list) and not RecipesTopping.COMPACT:
+                            tmp = []
+                            for recipe_choice in matching_recipes:
+                                for real_item in item:
+                                    recipe_choice_work = copy.deepcopy(recipe_choice)
+                                    recipe_choice_work["ingredients"].append(real_item)
+                                    tmp.append(recipe_choice_work)
+                            matching_recipes = tmp
+                        else:
+                            for recipe_choice in matching_recipes:
+                                recipe_choice["ingredients"].append(item)
+                elif recipe_type == "crafting_shaped":
+                    recipe["type"] = 'shape'
+
+                    assert "pattern" in data
+                    assert "key" in data
+
+                    pattern = data["pattern"]
+                    recipe["raw"] = {
+                        "rows": pattern,
+                        "subs": {}
+                    }
+                    for (id, value) in six.iteritems(data["key"]):
+                        item = parse_item(value)
+                        if isinstance(item, list) and not RecipesTopping.COMPACT:
+                            tmp = []
+                            for recipe_choice in matching_recipes:
+                                for real_item in item:
+                                    recipe_choice_work = copy.deepcopy(recipe_choice)
+                                    recipe_choice_work["raw"]["subs"][id] = real_item
+                                    tmp.append(recipe_choice_work)
+                            matching_recipes = tmp
+                        else:
+                            for recipe_choice in matching_recipes:
+                                recipe_choice["raw"]["subs"][id] = item
+
+                    for recipe_choice in matching_recipes:
+                        shape = []
+                        for row in recipe_choice["raw"]["rows"]:
+                            shape_row = []
+                            for char in row:
+                                if not char.isspace():
+                                    shape_row.append(recipe_choice["raw"]["subs"][char])
+                                else:
+                                    shape_row.append(None)
+                            shape.append(shape_row)
+                        recipe_choice["shape"] = shape
 
-                        recipe["ingredients"] = []
-                        for ingredient in data["ingredients"]:
-                            item = parse_item(ingredient)
-                            if isinstance(item, list):
-                                tmp = []
-                                for recipe_choice in matching_recipes:
-                                    for real_item in item:
-                                        recipe_choice_work = copy.deepcopy(recipe_choice)
-                                        recipe_choice_work["ingredients"].append(real_item)
-                                        tmp.append(recipe_choice_work)
-                                matching_recipes = tmp
-                            else:
-                                for recipe_choice in matching_recipes:
-                                    recipe_choice["ingredients"].append(item)
-                    elif recipe_type == "crafting_shaped":
-                        recipe["type"] = 'shape'
-
-                        assert "pattern" in data
-                        assert "key" in data
-
-                        pattern = data["pattern"]
-                        recipe["raw"] = {
-                            "rows": pattern,
-                            "subs": {}
-                        }
-                        for (id, value) in six.iteritems(data["key"]):
-                            item = parse_item(value)
-                            if isinstance(item, list):
-                                tmp = []
-                                for recipe_choice in matching_recipes:
-                                    for real_item in item:
-                                        recipe_choice_work = copy.deepcopy(recipe_choice)
-                                        recipe_choice_work["raw"]["subs"][id] = real_item
-                                        tmp.append(recipe_choice_work)
-                                matching_recipes = tmp
-                            else:
-                                for recipe_choice in matching_recipes:
-                                    recipe_choice["raw"]["subs"][id] = item
-
-                        for recipe_choice in matching_recipes:
-                            shape = []
-                            for row in recipe_choice["raw"]["rows"]:
-                                shape_row = []
-                                for char in row:
-                                    if not char.isspace():
-                                        shape_row.append(recipe_choice["raw"]["subs"][char])
-                                    else:
-                                        shape_row.append(None)
-                                shape.append(shape_row)
-                            recipe_choice["shape"] = shape
-
-                    recipes.extend(matching_recipes)
-                except Exception as e:
-                    print("Failed to parse %s: %s" % (recipe_id, e))
-                    raise
+                recipes.extend(matching_recipes)
+            except Exception as e:
+                print("Failed to parse %s: %s" % (recipe_id, e))
+                raise
+        resources.forget(prefix)
 
         return recipes
 
+    @staticmethod
+    def expand_recipe(recipe):
+        """
+        Yields each of the recipes that a compact recipe (see COMPACT)
+        stands for, in the same order and form as they are listed without
+        COMPACT.  Items are shared between the recipes, not copied.
+        """
+        if recipe["type"] == "shapeless":
+            choices = [item if isinstance(item, list) else [item] for item in recipe["ingredients"]]
+            for combination in itertools.product(*choices):
+                expanded = dict(recipe)
+                expanded["ingredients"] = list(combination)
+                yield expanded
+        elif recipe["type"] == "shape" and "raw" in recipe:
+            raw = recipe["raw"]
+            keys = list(raw["subs"])
+            choices = [raw["subs"][key] if isinstance(raw["subs"][key], list) else [raw["subs"][key]] for key in keys]
+            for combination in itertools.product(*choices):
+                subs = dict(zip(keys, combination))
+                expanded = dict(recipe)
+                expanded["raw"] = dict(raw, subs=subs)
+                expanded["shape"] = [[None if char.isspace() else subs[char] for char in row] for row in raw["rows"]]
+                yield expanded
+        else:
+            # Recipes read from the jar's code never have alternatives
+            yield recipe
+
     @staticmethod
     def find_from_jar(aggregate, classloader, verbose):
         superclass = aggregate["classes"]["recipe.superclass"]
@@ -309,7 +345,7 @@ class RecipesTopping(Topping):
 
         def find_recipes(classloader, cf, method, target_class, setter_names):
             # Go through all instructions.
-            itr = iter(method.code.disassemble())
+            itr = iter(disassemble(method))
             recipes = []
             try:
                 while True:
@@ -34,6 +34,7 @@ import six.moves.urllib.request
 
 from burger import website
 from .topping import Topping
+from burger.util import disassemble
 
 from jawa.constants import *
 
@@ -107,7 +108,7 @@ class SoundTopping(Topping):
 
         sound_name = None
         sound_id = 0
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ('ldc', 'ldc_w'):
                 const = ins.operands[0]
                 sound_name = const.string.value
@@ -151,7 +152,7 @@ class SoundTopping(Topping):
         lcf = classloader[soundlist]
 
         method = lcf.methods.find_one(name="<clinit>")
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ('ldc', 'ldc_w'):
                 const = ins.operands[0]
                 sound_name = const.string.value
@@ -32,6 +32,8 @@ class StatsTopping(Topping):
         "stats.achievements"
     ]
 
+    MODIFIES = ["achievements"]
+
     DEPENDS = [
         "language"
     ]
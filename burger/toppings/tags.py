@@ -1,9 +1,7 @@
-from .topping import Topping
+import copy
 
-try:
-    import json
-except ImportError:
-    import simplejson as json
+from .topping import Topping
+from burger.resources import json_resources
 
 class TagsTopping(Topping):
     """Provides a list of all block and item tags"""
@@ -18,17 +16,17 @@ class TagsTopping(Topping):
         tags = aggregate.setdefault("tags", {})
         prefix = "data/minecraft/tags/"
         suffix = ".json"
-        for path in classloader.path_map:
-            if not path.startswith(prefix) or not path.endswith(suffix):
-                continue
+        resources = json_resources(classloader)
+        for path, data in resources.under(prefix):
             key = path[len(prefix):-len(suffix)]
             idx = key.find("/")
             type, name = key[:idx], key[idx + 1:]
-            with classloader.open(path) as fin:
-                data = json.load(fin)
+            # The parsed file is shared, so don't keep or modify it
+            data = copy.deepcopy(data)
             data["type"] = type
             data["name"] = name
             tags[key] = data
+        resources.forget(prefix)
 
         # Tags can reference other tags -- flatten that out.
         flattening = set()
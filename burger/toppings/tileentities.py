@@ -6,7 +6,7 @@ import six
 from .topping import Topping
 
 from jawa.constants import ConstantClass, String
-from burger.util import class_from_invokedynamic
+from burger.util import class_from_invokedynamic, disassemble
 
 class TileEntityTopping(Topping):
     """Gets tile entity (block entity) types."""
@@ -18,6 +18,8 @@ class TileEntityTopping(Topping):
         "tileentities.networkids"
     ]
 
+    MODIFIES = ["tileentity"]
+
     DEPENDS = [
         "identify.tileentity.superclass",
         "identify.block.superclass",
@@ -61,7 +63,7 @@ class TileEntityTopping(Topping):
         tileentities = te.setdefault("tileentities", {})
         te_classes = te.setdefault("classes", {})
         tmp = {}
-        for ins in method.code.disassemble():
+        for ins in disassemble(method):
             if ins in ("ldc", "ldc_w"):
                 const = ins.operands[0]
                 if isinstance(const, ConstantClass):
@@ -142,7 +144,7 @@ class TileEntityTopping(Topping):
                 cls = cf.super_.name.value
                 create_te = cf.methods.find_one(f=lambda m: m.name == create_te_name and m.descriptor == create_te_desc)
 
-            for ins in create_te.code.disassemble():
+            for ins in disassemble(create_te):
                 if ins.mnemonic == "new":
                     const = ins.operands[0]
                     te_name = te_classes[const.name.value]
@@ -191,7 +193,7 @@ class TileEntityTopping(Topping):
                     args="L" + updatepacket_name + ";")
 
             value = None
-            for ins in method.code.disassemble():
+            for ins in disassemble(method):
                 if ins in ("bipush", "sipush"):
                     value = ins.operands[0].value
                 elif ins == "instanceof":
@@ -26,6 +26,11 @@ THE SOFTWARE.
 class Topping(object):
     PROVIDES = None
     DEPENDS = None
+    # Top-level aggregate keys that the topping changes, other than those
+    # named by PROVIDES (see burger.cache.modified_keys)
+    MODIFIES = ()
+    # Names of class attributes that change what the topping outputs
+    OPTIONS = ()
 
     @staticmethod
     def act(aggregate, classloader, verbose=False):
@@ -21,14 +21,12 @@ THE SOFTWARE.
 """
 
 from .topping import Topping
+from burger.util import disassemble
+from burger.stringindex import string_index
+from burger.resources import json_resources
 
 from jawa.constants import *
 
-try:
-    import json
-except ImportError:
-    import simplejson as json
-
 class VersionTopping(Topping):
     """Provides the protocol version."""
 
@@ -56,24 +54,25 @@ class VersionTopping(Topping):
 
         try:
             # 18w47b+ has a file that just directly includes this info
-            with classloader.open("version.json") as fin:
-                version_json = json.load(fin)
-                aggregate["version"]["data"] = version_json["world_version"]
-                aggregate["version"]["protocol"] = version_json["protocol_version"]
-                aggregate["version"]["name"] = version_json["name"]
-                # Starting with 1.14.3-pre1, the "id" field began being used
-                # for the id used on the downloads site.  Prior to that, (1.14.2)
-                # "name" was used, and "id" looked like
-                # "1.14.2 / f647ba8dc371474797bee24b2b312ff4".
-                # Our heuristic for this is whether the ID is shorter than the name.
-                if len(version_json["id"]) <= len(version_json["name"]):
-                    if verbose:
-                        print("Using id '%s' over name '%s' for id as it is shorter" % (version_json["id"], version_json["name"]))
-                    aggregate["version"]["id"] = version_json["id"]
-                else:
-                    if verbose:
-                        print("Using name '%s' over id '%s' for id as it is shorter" % (version_json["name"], version_json["id"]))
-                    aggregate["version"]["id"] = version_json["name"]
+            resources = json_resources(classloader)
+            version_json = resources.load("version.json")
+            resources.forget("version.json")
+            aggregate["version"]["data"] = version_json["world_version"]
+            aggregate["version"]["protocol"] = version_json["protocol_version"]
+            aggregate["version"]["name"] = version_json["name"]
+            # Starting with 1.14.3-pre1, the "id" field began being used
+            # for the id used on the downloads site.  Prior to that, (1.14.2)
+            # "name" was used, and "id" looked like
+            # "1.14.2 / f647ba8dc371474797bee24b2b312ff4".
+            # Our heuristic for this is whether the ID is shorter than the name.
+            if len(version_json["id"]) <= len(version_json["name"]):
+                if verbose:
+                    print("Using id '%s' over name '%s' for id as it is shorter" % (version_json["id"], version_json["name"]))
+                aggregate["version"]["id"] = version_json["id"]
+            else:
+                if verbose:
+                    print("Using name '%s' over id '%s' for id as it is shorter" % (version_json["name"], version_json["id"]))
+                aggregate["version"]["id"] = version_json["name"]
         except:
             # Find it manually
             VersionTopping.get_protocol_version(aggregate, classloader, verbose)
@@ -108,7 +107,7 @@ class VersionTopping(Topping):
         elif "nethandler.client" in aggregate["classes"]:
             # If it's anything else, it's likely to be the client, and have the client nethandler available
             # In this case, we can just check if it imports Unpooled
-            aggregate["version"]["netty_rewrite"] = "io/netty/buffer/Unpooled" in classloader.dependencies(aggregate["classes"]["nethandler.client"])
+            aggregate["version"]["netty_rewrite"] = "io/netty/buffer/Unpooled" in string_index(classloader).references(aggregate["classes"]["nethandler.client"])
         elif verbose:
             # This SHOULD never happen
             print("Unable to determine if this version is pre/post netty rewrite")
@@ -148,7 +147,7 @@ class VersionTopping(Topping):
             version = None
             looking_for_version_name = False
             for method in cf.methods:
-                for instr in method.code.disassemble():
+                for instr in disassemble(method):
                     if instr in ("bipush", "sipush"):
                         version = instr.operands[0].value
                     elif instr == "ldc":
@@ -177,9 +176,9 @@ class VersionTopping(Topping):
                                 else:
                                     # Older versions don't specify the name on the disconnect message
                                     # We can get it from the server startup messages
-                                    for class_name in classloader.classes:
-                                        for const in classloader.search_constant_pool(path=class_name, type_=String):
-                                            value = const.string.value
+                                    index = string_index(classloader)
+                                    for class_name in index.classes_containing("minecraft server version "):
+                                        for value in index.strings(class_name):
                                             if "Starting integrated minecraft server version " in value:
                                                 versions["name"] = value[len("Starting integrated minecraft server version "):]
                                                 versions["id"] = versions["name"]
@@ -195,9 +194,9 @@ class VersionTopping(Topping):
             # We need to look for the protocol name and version elsewhere
 
             # We can get the name from the startup class
-            for constant in classloader.search_constant_pool(path="net/minecraft/client/Minecraft", type_=String):
-                if "Minecraft Minecraft " in constant.string.value:
-                    versions["id"] = versions["name"] = constant.string.value[len("Minecraft Minecraft "):]
+            for value in string_index(classloader).strings("net/minecraft/client/Minecraft"):
+                if "Minecraft Minecraft " in value:
+                    versions["id"] = versions["name"] = value[len("Minecraft Minecraft "):]
                     break
 
             # This is the final version before the codebase merge, and it alters the logic of sending the protocol number compared to the previous ones
@@ -211,7 +210,7 @@ class VersionTopping(Topping):
             cf = classloader[nethandler]
             for method in cf.methods:
                 looking_for_version = False
-                for instr in method.code.disassemble():
+                for instr in disassemble(method):
                     if not looking_for_version and instr == "ldc":
                         constant = instr.operands[0]
                         if isinstance(constant, String) and constant.string.value == "The server responded with an invalid server key":
@@ -232,7 +231,7 @@ class VersionTopping(Topping):
 
             for method in cf.methods:
                 can_be_correct = True
-                for ins in method.code.disassemble():
+                for ins in disassemble(method):
                     if ins in ("ldc", "ldc_w"):
                         const = ins.operands[0]
                         if isinstance(const, String) and const == "hasLegacyStructureData":
@@ -249,7 +248,7 @@ class VersionTopping(Topping):
 
                 next_ins_is_version = False
                 found_version = None
-                for ins in method.code.disassemble():
+                for ins in disassemble(method):
                     if ins in ("ldc", "ldc_w"):
                         const = ins.operands[0]
                         if isinstance(const, String) and const == "DataVersion":
@@ -1,11 +1,14 @@
+import heapq
+
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 
 from jawa.assemble import assemble
 from jawa.cf import ClassFile
 from jawa.methods import Method
 from jawa.constants import *
 from jawa.util.descriptor import method_descriptor
-from jawa.util.bytecode import Operand
+from jawa.util.bytecode import Operand, opcode_table
 
 import six.moves
 
@@ -437,6 +440,37 @@ def string_from_invokedymanic(ins, cf):
     
     return info.recipe
 
+# Maximum number of methods whose instructions are remembered for each jar
+DISASSEMBLY_CACHE_SIZE = 8192
+
+def disassemble(method, transforms=None):
+    """
+    Returns the instructions of a method as a tuple.  If no transforms are
+    given, the classloader's bytecode transforms are used (as with
+    method.code.disassemble()).
+
+    Results are remembered for the jar the method comes from, keyed by class,
+    method name and descriptor, so each method is only decoded once even if
+    several toppings look at it.  The instructions refer to the class's
+    constants, so they are forgotten when the ClassFile is evicted.
+    """
+    code = method.code
+    classloader = code.cf.classloader
+    if transforms is None:
+        transforms = classloader.bytecode_transforms if classloader else []
+
+    if not hasattr(classloader, "class_memo"):
+        # Generated classes (e.g. for lambdas) don't belong to a jar
+        return tuple(code.disassemble(transforms=transforms))
+
+    cache = classloader.class_memo("disassemble", DISASSEMBLY_CACHE_SIZE)
+    key = (code.cf.this.name.value, method.name.value, method.descriptor.value, tuple(transforms))
+    instructions = cache.get(key)
+    if instructions is None:
+        instructions = tuple(code.disassemble(transforms=transforms))
+        cache[key] = instructions
+    return instructions
+
 class WalkerCallback(ABC):
     """
     Interface for use with walk_method.
@@ -508,17 +542,208 @@ class WalkerCallback(ABC):
         """
         raise Exception("Unexpected invokedynamic: %s" % str(ins))
 
-def walk_method(cf, method, callback, verbose, input_args=None):
+# Handlers used by walk_method, indexed by opcode.  Each is called with the
+# instruction, the stack, the locals, the callback, and verbose, and returns
+# True to stop walking the method.
+_WALK_HANDLERS = [None] * 256
+
+def _walk_handler(*mnemonics):
+    """Registers the decorated function as the walk_method handler for the given instructions."""
+    def register(handler):
+        for mnemonic in mnemonics:
+            _WALK_HANDLERS[opcode_table[mnemonic]["op"]] = handler
+        return handler
+    return register
+
+class _Symbol(object):
+    """
+    Stands in for a value that isn't known while a call summary is being
+    recorded: either an argument, or the result of a callback.
     """
-    Walks through a method, evaluating instructions and using the callback
-    for side-effects.
 
-    The method is assumed to not have any conditionals, and to only return
-    at the very end.
+    def __init__(self, kind, index):
+        self.kind = kind
+        self.index = index
+
+    def __repr__(self):
+        return "<%s %s>" % (self.kind, self.index)
+
+class _NotSummarizable(Exception):
+    pass
+
+def _concrete(value):
     """
-    assert isinstance(callback, WalkerCallback)
+    Used for values that change what walk_method does (array sizes, indices
+    and contents), which therefore can't be left unknown in a call summary.
+    """
+    if isinstance(value, _Symbol):
+        raise _NotSummarizable()
+    return value
+
+def _push_constant(value):
+    def push(ins, stack, locals, callback, verbose):
+        stack.append(value)
+    return push
+
+for _mnemonic, _value in (("fconst_0", 0.0), ("fconst_1", 1.0), ("fconst_2", 2.0),
+                          ("dconst_0", 0.0), ("dconst_1", 1.0),
+                          ("lconst_0", 0), ("lconst_1", 1),
+                          ("aconst_null", None)):
+    _walk_handler(_mnemonic)(_push_constant(_value))
+# These are normally replaced with bipush by jawa's simple_swap transform
+for _value in range(-1, 6):
+    _walk_handler("iconst_m1" if _value < 0 else "iconst_%d" % _value)(_push_constant(_value))
+
+@_walk_handler("bipush", "sipush")
+def _walk_push(ins, stack, locals, callback, verbose):
+    stack.append(ins.operands[0].value)
+
+@_walk_handler("ldc", "ldc_w", "ldc2_w")
+def _walk_ldc(ins, stack, locals, callback, verbose):
+    const = ins.operands[0]
+
+    if isinstance(const, ConstantClass):
+        stack.append("%s.class" % const.name.value)
+    elif isinstance(const, String):
+        stack.append(const.string.value)
+    else:
+        stack.append(const.value)
+
+@_walk_handler("new")
+def _walk_new(ins, stack, locals, callback, verbose):
+    try:
+        stack.append(callback.on_new(ins, ins.operands[0]))
+    except StopIteration:
+        return True
+
+@_walk_handler("getfield", "getstatic")
+def _walk_get_field(ins, stack, locals, callback, verbose):
+    if ins.mnemonic != "getstatic":
+        obj = stack.pop()
+    else:
+        obj = None
+
+    try:
+        stack.append(callback.on_get_field(ins, ins.operands[0], obj))
+    except StopIteration:
+        return True
+
+@_walk_handler("putfield", "putstatic")
+def _walk_put_field(ins, stack, locals, callback, verbose):
+    value = stack.pop()
+    if ins.mnemonic != "putstatic":
+        obj = stack.pop()
+    else:
+        obj = None
+
+    try:
+        callback.on_put_field(ins, ins.operands[0], obj, value)
+    except StopIteration:
+        return True
+
+def _pop_args(stack, num_args):
+    if num_args == 0:
+        return []
+    args = stack[-num_args:]
+    del stack[-num_args:]
+    return args
+
+@_walk_handler("invokevirtual", "invokespecial", "invokeinterface", "invokestatic")
+def _walk_invoke(ins, stack, locals, callback, verbose):
+    const = ins.operands[0]
+    desc = method_descriptor(const.name_and_type.descriptor.value)
+
+    args = _pop_args(stack, len(desc.args))
+    if ins.mnemonic != "invokestatic":
+        obj = stack.pop()
+    else:
+        obj = None
+
+    try:
+        ret = callback.on_invoke(ins, const, obj, args)
+    except StopIteration:
+        return True
+    if desc.returns.name != "void":
+        stack.append(ret)
+
+@_walk_handler("invokedynamic")
+def _walk_invokedynamic(ins, stack, locals, callback, verbose):
+    const = ins.operands[0]
+    desc = method_descriptor(const.name_and_type.descriptor.value)
+
+    args = _pop_args(stack, len(desc.args))
+    try:
+        stack.append(callback.on_invokedynamic(ins, const, args))
+    except StopIteration:
+        return True
+
+@_walk_handler("astore", "istore", "lstore", "fstore", "dstore")
+def _walk_store(ins, stack, locals, callback, verbose):
+    locals[ins.operands[0].value] = stack.pop()
+
+@_walk_handler("aload", "iload", "lload", "fload", "dload")
+def _walk_load(ins, stack, locals, callback, verbose):
+    stack.append(locals[ins.operands[0].value])
+
+# The short forms (e.g. astore_1), for code that hasn't gone through simple_swap
+def _store_local(index):
+    def store(ins, stack, locals, callback, verbose):
+        locals[index] = stack.pop()
+    return store
+
+def _load_local(index):
+    def load(ins, stack, locals, callback, verbose):
+        stack.append(locals[index])
+    return load
+
+for _index in range(4):
+    for _type in "ailfd":
+        _walk_handler("%sstore_%d" % (_type, _index))(_store_local(_index))
+        _walk_handler("%sload_%d" % (_type, _index))(_load_local(_index))
+
+@_walk_handler("dup")
+def _walk_dup(ins, stack, locals, callback, verbose):
+    stack.append(stack[-1])
+
+@_walk_handler("pop")
+def _walk_pop(ins, stack, locals, callback, verbose):
+    stack.pop()
+
+@_walk_handler("anewarray")
+def _walk_anewarray(ins, stack, locals, callback, verbose):
+    stack.append([None] * _concrete(stack.pop()))
+
+@_walk_handler("newarray")
+def _walk_newarray(ins, stack, locals, callback, verbose):
+    stack.append([0] * _concrete(stack.pop()))
+
+@_walk_handler("aastore", "bastore", "castore", "sastore", "iastore", "lastore", "fastore", "dastore")
+def _walk_array_store(ins, stack, locals, callback, verbose):
+    value = stack.pop()
+    index = _concrete(stack.pop())
+    array = _concrete(stack.pop())
+    if isinstance(array, list) and isinstance(index, int):
+        array[index] = value
+    elif verbose:
+        print("Failed to execute %s: array %s index %s value %s" % (ins, array, index, value))
+
+@_walk_handler("aaload", "baload", "caload", "saload", "iaload", "laload", "faload", "daload")
+def _walk_array_load(ins, stack, locals, callback, verbose):
+    index = _concrete(stack.pop())
+    array = _concrete(stack.pop())
+    if isinstance(array, list) and isinstance(index, int):
+        stack.append(array[index])
+    else:
+        if verbose:
+            print("Failed to execute %s: array %s index %s" % (ins, array, index))
+        # Keep the stack balanced, with an unknown value
+        stack.append(object())
+
+@_walk_handler("checkcast")
+def _walk_checkcast(ins, stack, locals, callback, verbose):
+    pass
 
-    stack = []
+def _initial_locals(method, input_args):
     locals = {}
     cur_index = 0
 
@@ -537,117 +762,30 @@ def walk_method(cf, method, callback, verbose, input_args=None):
             locals[cur_index] = object()
             cur_index += 1
 
-    ins_list = list(method.code.disassemble())
-    for ins in ins_list[:-1]:
-        if ins in ("bipush", "sipush"):
-            stack.append(ins.operands[0].value)
-        elif ins.mnemonic.startswith("fconst") or ins.mnemonic.startswith("dconst"):
-            stack.append(float(ins.mnemonic[-1]))
-        elif ins.mnemonic.startswith("lconst"):
-            stack.append(int(ins.mnemonic[-1]))
-        elif ins == "aconst_null":
-            stack.append(None)
-        elif ins in ("ldc", "ldc_w", "ldc2_w"):
-            const = ins.operands[0]
-
-            if isinstance(const, ConstantClass):
-                stack.append("%s.class" % const.name.value)
-            elif isinstance(const, String):
-                stack.append(const.string.value)
-            else:
-                stack.append(const.value)
-        elif ins == "new":
-            const = ins.operands[0]
+    return locals
 
-            try:
-                stack.append(callback.on_new(ins, const))
-            except StopIteration:
-                break
-        elif ins in ("getfield", "getstatic"):
-            const = ins.operands[0]
-            if ins.mnemonic != "getstatic":
-                obj = stack.pop()
-            else:
-                obj = None
-
-            try:
-                stack.append(callback.on_get_field(ins, const, obj))
-            except StopIteration:
-                break
-        elif ins in ("putfield", "putstatic"):
-            const = ins.operands[0]
-            value = stack.pop()
-            if ins.mnemonic != "putstatic":
-                obj = stack.pop()
-            else:
-                obj = None
-
-            try:
-                callback.on_put_field(ins, const, obj, value)
-            except StopIteration:
-                break
-        elif ins in ("invokevirtual", "invokespecial", "invokeinterface", "invokestatic"):
-            const = ins.operands[0]
-            method_desc = const.name_and_type.descriptor.value
-            desc = method_descriptor(method_desc)
-            num_args = len(desc.args)
+def walk_method(cf, method, callback, verbose, input_args=None):
+    """
+    Walks through a method, evaluating instructions and using the callback
+    for side-effects.
 
-            args = []
+    The method is assumed to not have any conditionals, and to only return
+    at the very end.
+    """
+    assert isinstance(callback, WalkerCallback)
+    return _walk_method(method, callback, verbose, input_args, [])
 
-            for i in six.moves.range(num_args):
-                args.insert(0, stack.pop())
-            if ins.mnemonic != "invokestatic":
-                obj = stack.pop()
-            else:
-                obj = None
+def _walk_method(method, callback, verbose, input_args, stack):
+    """walk_method, using the given (empty) list as the stack."""
+    locals = _initial_locals(method, input_args)
 
-            try:
-                ret = callback.on_invoke(ins, const, obj, args)
-            except StopIteration:
+    ins_list = disassemble(method)
+    handlers = _WALK_HANDLERS
+    for ins in ins_list[:-1]:
+        handler = handlers[ins.opcode]
+        if handler is not None:
+            if handler(ins, stack, locals, callback, verbose):
                 break
-            if desc.returns.name != "void":
-                stack.append(ret)
-        elif ins in ("astore", "istore", "lstore", "fstore", "dstore"):
-            locals[ins.operands[0].value] = stack.pop()
-        elif ins in ("aload", "iload", "lload", "fload", "dload"):
-            stack.append(locals[ins.operands[0].value])
-        elif ins == "dup":
-            stack.append(stack[-1])
-        elif ins == "pop":
-            stack.pop()
-        elif ins == "anewarray":
-            stack.append([None] * stack.pop())
-        elif ins == "newarray":
-            stack.append([0] * stack.pop())
-        elif ins in ("aastore", "bastore", "castore", "sastore", "iastore", "lastore", "fastore", "dastore"):
-            value = stack.pop()
-            index = stack.pop()
-            array = stack.pop()
-            if isinstance(array, list) and isinstance(index, int):
-                array[index] = value
-            elif verbose:
-                print("Failed to execute %s: array %s index %s value %s" % (ins, array, index, value))
-        elif ins in ("aaload", "baload", "caload", "saload", "iaload", "laload", "faload", "daload"):
-            index = stack.pop()
-            array = stack.pop()
-            if isinstance(array, list) and isinstance(index, int):
-                stack.push(array[index])
-            elif verbose:
-                print("Failed to execute %s: array %s index %s" % (ins, array, index))
-        elif ins == "invokedynamic":
-            const = ins.operands[0]
-            method_desc = const.name_and_type.descriptor.value
-            desc = method_descriptor(method_desc)
-            num_args = len(desc.args)
-
-            args = []
-
-            for i in six.moves.range(num_args):
-                args.insert(0, stack.pop())
-
-            stack.append(callback.on_invokedynamic(ins, ins.operands[0], args))
-        elif ins == "checkcast":
-            pass
         elif verbose:
             print("Unknown instruction %s: stack is %s" % (ins, stack))
 
@@ -661,6 +799,551 @@ def walk_method(cf, method, callback, verbose, input_args=None):
     elif verbose:
         print("Unexpected final instruction %s: stack is %s" % (ins, stack))
 
+# Conditional branches, and how many values each one pops from the stack
+_CONDITIONAL_BRANCHES = {
+    "ifeq": 1, "ifne": 1, "iflt": 1, "ifge": 1, "ifgt": 1, "ifle": 1,
+    "ifnull": 1, "ifnonnull": 1,
+    "if_icmpeq": 2, "if_icmpne": 2, "if_icmplt": 2, "if_icmpge": 2,
+    "if_icmpgt": 2, "if_icmple": 2, "if_acmpeq": 2, "if_acmpne": 2,
+}
+_GOTOS = ("goto", "goto_w")
+_SWITCHES = ("tableswitch", "lookupswitch")
+_RETURNS = ("ireturn", "lreturn", "freturn", "dreturn", "areturn", "return")
+
+# Stack effects (values popped, values pushed) of instructions that have no
+# walk_method handler.  walk_method can simply skip these, but code with
+# branches usually computes the conditions with them, so walk_method_cfg has
+# to keep the stack balanced; the values they push are unknown.  Longs and
+# doubles only take up one stack entry (see _CfgStack).
+_STACK_EFFECTS = {"nop": (0, 0),
+                  "monitorenter": (1, 0), "monitorexit": (1, 0)}
+for _mnemonic in ("iadd", "ladd", "fadd", "dadd", "isub", "lsub", "fsub", "dsub",
+                  "imul", "lmul", "fmul", "dmul", "idiv", "ldiv", "fdiv", "ddiv",
+                  "irem", "lrem", "frem", "drem", "ishl", "lshl", "ishr", "lshr",
+                  "iushr", "lushr", "iand", "land", "ior", "lor", "ixor", "lxor",
+                  "lcmp", "fcmpl", "fcmpg", "dcmpl", "dcmpg"):
+    _STACK_EFFECTS[_mnemonic] = (2, 1)
+for _mnemonic in ("ineg", "lneg", "fneg", "dneg", "i2l", "i2f", "i2d", "l2i",
+                  "l2f", "l2d", "f2i", "f2l", "f2d", "d2i", "d2l", "d2f",
+                  "i2b", "i2c", "i2s", "arraylength", "instanceof"):
+    _STACK_EFFECTS[_mnemonic] = (1, 1)
+
+# Instructions that rearrange the stack without looking at the values, as
+# the number of words (a long or double being two) taken from the top of the
+# stack, and the order to push those groups back in, bottom first (0 being
+# the topmost group).  E.g. dup_x1 turns "b a" (with a on top) into "a b a".
+_STACK_SHUFFLES = {
+    "pop2": ((2,), ()),
+    "swap": ((1, 1), (0, 1)),
+    "dup_x1": ((1, 1), (0, 1, 0)),
+    "dup_x2": ((1, 2), (0, 1, 0)),
+    "dup2": ((2,), (0, 0)),
+    "dup2_x1": ((2, 1), (0, 1, 0)),
+    "dup2_x2": ((2, 2), (0, 1, 0)),
+}
+
+def _is_wide_descriptor(descriptor):
+    return descriptor in ("J", "D")
+
+def _pushes_wide(ins, stack):
+    """Returns whether the value an instruction with a walk_method handler pushes is a long or double."""
+    mnemonic = ins.mnemonic
+    if mnemonic in ("ldc2_w", "lload", "dload", "laload", "daload") or mnemonic[:6] in ("lconst", "dconst") \
+            or mnemonic[:6] in ("lload_", "dload_"):
+        return True
+    elif mnemonic in ("getfield", "getstatic"):
+        return _is_wide_descriptor(ins.operands[0].name_and_type.descriptor.value)
+    elif mnemonic.startswith("invoke"):
+        return _is_wide_descriptor(method_descriptor(ins.operands[0].name_and_type.descriptor.value).returns_descriptor)
+    elif mnemonic == "dup":
+        return bool(stack.wide) and stack.wide[-1]
+    return False
+
+def _result_is_wide(mnemonic):
+    """Returns whether the result of an instruction in _STACK_EFFECTS is a long or double."""
+    if mnemonic[1:2] == "2":
+        # Conversions, e.g. i2l
+        return mnemonic[2] in "ld"
+    elif "cmp" in mnemonic or mnemonic in ("arraylength", "instanceof"):
+        return False
+    return mnemonic[0] in "ld"
+
+class _CfgStack(list):
+    """
+    The stack used by walk_method_cfg.  As with walk_method, longs and
+    doubles take up a single entry, but whether each entry is one is tracked
+    alongside it in wide, so that instructions such as pop2 and dup2 can tell
+    how many entries they act on.  push_wide is used for values appended by
+    walk_method's handlers.
+    """
+
+    def __init__(self, values=(), wide=()):
+        list.__init__(self, values)
+        self.wide = list(wide)
+        self.push_wide = False
+
+    def append(self, value):
+        list.append(self, value)
+        self.wide.append(self.push_wide)
+
+    def pop(self, index=-1):
+        self.wide.pop(index)
+        return list.pop(self, index)
+
+    def __delitem__(self, key):
+        list.__delitem__(self, key)
+        del self.wide[key]
+
+    def copy(self):
+        return _CfgStack(self, self.wide)
+
+    def take_words(self, words):
+        """
+        Removes entries adding up to the given number of words from the top
+        of the stack, returning them (bottom first) as (value, wide) pairs.
+        """
+        taken = []
+        while words > 0:
+            wide = self.wide[-1]
+            taken.insert(0, (self.pop(), wide))
+            words -= 2 if wide else 1
+        if words < 0:
+            raise Exception("A long or double would be split")
+        return taken
+
+    def push_all(self, entries):
+        for value, wide in entries:
+            self.push_wide = wide
+            self.append(value)
+
+class _Unknown(object):
+    """
+    The value of anything that differs between the paths that reach a block
+    in walk_method_cfg.
+    """
+
+    def __repr__(self):
+        return "<unknown>"
+
+_UNKNOWN = _Unknown()
+
+class _MemoizingCallback(WalkerCallback):
+    """
+    Passes callbacks on to another callback, except when an instruction that
+    has already been evaluated (in a loop) is given exactly the same values
+    again, in which case the earlier result is reused.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.seen = {}
+
+    def _call(self, function, ins, const, *values):
+        previous = self.seen.get(ins.pos)
+        if previous is not None and len(previous[0]) == len(values) and \
+                all(a is b for a, b in zip(previous[0], values)):
+            return previous[1]
+        result = function(ins, const, *values)
+        self.seen[ins.pos] = (values, result)
+        return result
+
+    def on_new(self, ins, const):
+        return self._call(self.callback.on_new, ins, const)
+
+    def on_invoke(self, ins, const, obj, args):
+        previous = self.seen.get(ins.pos)
+        if previous is not None and previous[0][0] is obj and len(previous[0][1]) == len(args) and \
+                all(a is b for a, b in zip(previous[0][1], args)):
+            return previous[1]
+        result = self.callback.on_invoke(ins, const, obj, args)
+        self.seen[ins.pos] = ((obj, args), result)
+        return result
+
+    def on_get_field(self, ins, const, obj):
+        return self._call(self.callback.on_get_field, ins, const, obj)
+
+    def on_put_field(self, ins, const, obj, value):
+        self._call(self.callback.on_put_field, ins, const, obj, value)
+
+    def on_invokedynamic(self, ins, const, args):
+        previous = self.seen.get(ins.pos)
+        if previous is not None and len(previous[0]) == len(args) and \
+                all(a is b for a, b in zip(previous[0], args)):
+            return previous[1]
+        result = self.callback.on_invokedynamic(ins, const, args)
+        self.seen[ins.pos] = (args, result)
+        return result
+
+class BasicBlock(object):
+    """
+    A run of instructions that is always executed from start to end.
+
+    start: position of the first instruction
+    instructions: the instructions in the block, in order
+    successors: start positions of the blocks that control can continue to,
+                fall-through first.  Exception handlers are not included.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.instructions = []
+        self.successors = []
+
+    def __repr__(self):
+        return "<BasicBlock at %s, %s instructions, successors %s>" % (self.start, len(self.instructions), self.successors)
+
+def _branch_targets(ins):
+    """Returns the positions an instruction may jump to, or None if it doesn't jump."""
+    if ins.mnemonic in _CONDITIONAL_BRANCHES or ins.mnemonic in _GOTOS:
+        return [ins.pos + ins.operands[0].value]
+    elif ins.mnemonic == "tableswitch":
+        # default, low, high, then one offset per value
+        return [ins.pos + operand.value for operand in ins.operands[:1] + ins.operands[3:]]
+    elif ins.mnemonic == "lookupswitch":
+        # match -> offset pairs, then default
+        return [ins.pos + offset for offset in ins.operands[0].values()] + \
+               [ins.pos + ins.operands[1].value]
+    return None
+
+def basic_blocks(method):
+    """
+    Splits a method into basic blocks, returned as an OrderedDict of
+    BasicBlocks keyed by their start position, in bytecode order.
+
+    Results are remembered for the jar the method comes from, in the same way
+    as with disassemble().
+    """
+    classloader = method.code.cf.classloader
+    if hasattr(classloader, "class_memo"):
+        cache = classloader.class_memo("basic_blocks", DISASSEMBLY_CACHE_SIZE)
+        key = (method.code.cf.this.name.value, method.name.value, method.descriptor.value)
+        blocks = cache.get(key)
+        if blocks is not None:
+            return blocks
+
+    instructions = disassemble(method)
+
+    # A block starts at the start of the method, at anything that is jumped to
+    # (including exception handlers), and after anything that jumps or exits
+    leaders = set([instructions[0].pos])
+    for handler in method.code.exception_table:
+        leaders.add(handler.handler_pc)
+    for i, ins in enumerate(instructions):
+        targets = _branch_targets(ins)
+        if targets is not None:
+            leaders.update(targets)
+        if (targets is not None or ins.mnemonic in _RETURNS or ins == "athrow") \
+                and i + 1 < len(instructions):
+            leaders.add(instructions[i + 1].pos)
+
+    blocks = OrderedDict()
+    block = None
+    for i, ins in enumerate(instructions):
+        if ins.pos in leaders:
+            if block is not None and ins.pos not in block.successors:
+                # Previous block falls through into this one
+                last = block.instructions[-1]
+                if last.mnemonic not in _GOTOS and last.mnemonic not in _SWITCHES \
+                        and last.mnemonic not in _RETURNS and last != "athrow":
+                    block.successors.insert(0, ins.pos)
+            block = BasicBlock(ins.pos)
+            blocks[ins.pos] = block
+        block.instructions.append(ins)
+
+        targets = _branch_targets(ins)
+        if targets is not None:
+            for target in targets:
+                if target not in block.successors:
+                    block.successors.append(target)
+
+    if hasattr(classloader, "memo"):
+        cache[key] = blocks
+    return blocks
+
+def _merge_states(first, second, verbose):
+    """
+    Merges the states (stack, locals) from two paths that join.  Values that
+    agree on both paths are kept (as the ones in first); anything else
+    becomes unknown.
+    """
+    stack1, locals1 = first
+    stack2, locals2 = second
+    if len(stack1) != len(stack2):
+        if verbose:
+            print("Mismatched stacks when merging: %s and %s" % (stack1, stack2))
+        return first
+
+    def merge(a, b):
+        if a is b:
+            return a
+        # Only compare simple constants by value; comparing arbitrary callback
+        # results could run into odd __eq__ implementations
+        if type(a) is type(b) and isinstance(a, (int, float, str)) and a == b:
+            return a
+        return _UNKNOWN
+
+    stack = _CfgStack((merge(a, b) for a, b in zip(stack1, stack2)), stack1.wide)
+    locals = {index: merge(value, locals2[index]) for index, value in locals1.items() if index in locals2}
+    return (stack, locals)
+
+def _same_state(first, second):
+    stack1, locals1 = first
+    stack2, locals2 = second
+    return len(stack1) == len(stack2) and all(a is b for a, b in zip(stack1, stack2)) and \
+        locals1.keys() == locals2.keys() and all(value is locals2[index] for index, value in locals1.items())
+
+def method_has_loop(method):
+    """
+    Returns whether the given method contains a loop, i.e. a branch back to
+    an earlier point in the method.
+    """
+    return any(target <= block.start
+               for block in basic_blocks(method).values()
+               for target in block.successors)
+
+def walk_method_cfg(cf, method, callback, verbose, input_args=None):
+    """
+    Walks through a method like walk_method, but following its control flow:
+    the method is split into basic blocks, and each reachable block is
+    evaluated starting from the state (stack and locals) that control
+    reaches it with.  Where several paths join, the states are merged, with
+    values that differ between them becoming unknown.
+
+    Blocks are evaluated in bytecode order, so for code without loops each
+    callback is called once for each reachable instruction, in the order
+    walk_method would call it for straight-line code.  Blocks in loops are
+    evaluated again whenever the state reaching them changes, until it
+    stops changing; callbacks are only called again for an instruction if
+    the values given to them changed.  Exception handlers are not evaluated.
+
+    Returns the value returned by the first return instruction (in bytecode
+    order) that returns a value, or None.  If a callback raises
+    StopIteration, the walk stops there.
+    """
+    assert isinstance(callback, WalkerCallback)
+
+    blocks = basic_blocks(method)
+    callback = _MemoizingCallback(callback)
+    entry = next(iter(blocks))
+    # Entry state of each block that has been reached
+    states = {entry: (_CfgStack(), _initial_locals(method, input_args))}
+    pending = [entry]
+    queued = set(pending)
+    handlers = _WALK_HANDLERS
+    # Value returned by each return instruction that has been reached
+    returned = {}
+
+    def result():
+        return returned[min(returned)] if returned else None
+
+    def reach(target, stack, locals):
+        state = (stack.copy(), dict(locals))
+        if target in states:
+            merged = _merge_states(states[target], state, verbose)
+            if _same_state(merged, states[target]):
+                return
+            state = merged
+        states[target] = state
+        if target not in queued:
+            queued.add(target)
+            heapq.heappush(pending, target)
+
+    while pending:
+        start = heapq.heappop(pending)
+        queued.discard(start)
+        block = blocks[start]
+        stack, locals = states[start]
+        stack = stack.copy()
+        locals = dict(locals)
+
+        for ins in block.instructions:
+            mnemonic = ins.mnemonic
+            handler = handlers[ins.opcode]
+            if handler is not None:
+                stack.push_wide = _pushes_wide(ins, stack)
+                if handler(ins, stack, locals, callback, verbose):
+                    return result()
+            elif mnemonic in _CONDITIONAL_BRANCHES:
+                _pop_args(stack, _CONDITIONAL_BRANCHES[mnemonic])
+            elif mnemonic in _SWITCHES:
+                stack.pop()
+            elif mnemonic in _RETURNS:
+                if mnemonic != "return":
+                    returned[ins.pos] = stack.pop()
+            elif mnemonic in _STACK_EFFECTS:
+                pops, pushes = _STACK_EFFECTS[mnemonic]
+                _pop_args(stack, pops)
+                stack.push_wide = _result_is_wide(mnemonic)
+                for _ in range(pushes):
+                    stack.append(object())
+            elif mnemonic in _STACK_SHUFFLES:
+                sizes, order = _STACK_SHUFFLES[mnemonic]
+                groups = [stack.take_words(size) for size in sizes]
+                for index in order:
+                    stack.push_all(groups[index])
+            elif mnemonic == "multianewarray":
+                _pop_args(stack, ins.operands[1].value)
+                stack.push_wide = False
+                stack.append(object())
+            elif mnemonic == "iinc":
+                index = ins.operands[0].value
+                value = locals.get(index)
+                if type(value) is int:
+                    locals[index] = value + ins.operands[1].value
+                else:
+                    locals[index] = object()
+            elif mnemonic not in _GOTOS and mnemonic != "athrow" and verbose:
+                print("Unknown instruction %s: stack is %s" % (ins, stack))
+
+        for target in block.successors:
+            reach(target, stack, locals)
+
+    return result()
+
+# Maximum number of call summaries remembered for each jar
+CALL_SUMMARY_CACHE_SIZE = 4096
+
+# Marks methods whose behavior depends on the values of their arguments
+_UNSUMMARIZABLE = object()
+
+# Marks a point where walk_method's stack is empty
+_EMPTY_STACK = object()
+
+class _RecordingCallback(WalkerCallback):
+    """
+    Records the callbacks walk_method makes, in terms of _Symbols for the
+    arguments and for the results of earlier callbacks.
+
+    For each callback, the value on top of the stack is recorded too, as
+    that is what walk_method returns if the callback raises StopIteration.
+    """
+
+    def __init__(self, stack):
+        self.stack = stack
+        self.events = []
+        self.stop_values = []
+
+    def _record(self, *event):
+        self.events.append(event)
+        if not self.stack:
+            self.stop_values.append(_EMPTY_STACK)
+        elif isinstance(self.stack[-1], list):
+            # The array may still be changed by later instructions
+            self.stop_values.append(list(self.stack[-1]))
+        else:
+            self.stop_values.append(self.stack[-1])
+        return _Symbol("result", len(self.events) - 1)
+
+    def on_new(self, ins, const):
+        return self._record("new", ins, const)
+
+    def on_invoke(self, ins, const, obj, args):
+        return self._record("invoke", ins, const, obj, args)
+
+    def on_get_field(self, ins, const, obj):
+        return self._record("get_field", ins, const, obj)
+
+    def on_put_field(self, ins, const, obj, value):
+        self._record("put_field", ins, const, obj, value)
+
+    def on_invokedynamic(self, ins, const, args):
+        return self._record("invokedynamic", ins, const, args)
+
+def _substitute(value, args, results, arrays):
+    if isinstance(value, _Symbol):
+        if value.kind == "arg":
+            return args[value.index]
+        return results[value.index]
+    elif isinstance(value, list):
+        # Arrays created by the method; keep them shared between events
+        if id(value) not in arrays:
+            arrays[id(value)] = [_substitute(item, args, results, arrays) for item in value]
+        return arrays[id(value)]
+    return value
+
+def _arg_shape(arg):
+    if arg is None or isinstance(arg, (int, float, str, list, dict)):
+        return type(arg).__name__
+    return "object"
+
+def walk_method_summarized(cf, method, callback, verbose, input_args=None):
+    """
+    Equivalent to walk_method, for methods that are called from many places
+    (e.g. builder helpers called for each of the ~1000 block registrations).
+
+    The first call for a given method and argument shape walks it with
+    placeholder arguments, recording the callbacks that walk_method makes and
+    the value it returns; that summary is remembered for the jar.  Every call
+    then replays the summary against the given callback, with the actual
+    arguments and callback results substituted in.  Methods whose walk depends
+    on the values involved (through array operations) are walked normally.
+
+    If a callback raises StopIteration, no further callbacks are made, and
+    (as with walk_method) the value that was on top of the stack at that
+    point is returned if the method returns a value.
+    """
+    assert isinstance(callback, WalkerCallback)
+
+    classloader = method.code.cf.classloader
+    if not hasattr(classloader, "class_memo"):
+        return walk_method(cf, method, callback, verbose, input_args)
+
+    cache = classloader.class_memo("call_summaries", CALL_SUMMARY_CACHE_SIZE)
+    shape = None if input_args is None else tuple(_arg_shape(arg) for arg in input_args)
+    key = (method.code.cf.this.name.value, method.name.value, method.descriptor.value, shape)
+    summary = cache.get(key)
+    if summary is None:
+        stack = []
+        recorder = _RecordingCallback(stack)
+        symbols = None
+        if input_args is not None:
+            symbols = [_Symbol("arg", i) for i in range(len(input_args))]
+        try:
+            returned = _walk_method(method, recorder, verbose, symbols, stack)
+            returns_value = disassemble(method)[-1].mnemonic in ("ireturn", "lreturn", "freturn", "dreturn", "areturn")
+            summary = (recorder.events, recorder.stop_values, returns_value, returned)
+        except Exception:
+            # Either the walk depends on the values involved, or it fails
+            # anyways; in both cases, walk it normally so that the callbacks
+            # see exactly what they would have otherwise
+            summary = _UNSUMMARIZABLE
+        cache[key] = summary
+
+    if summary is _UNSUMMARIZABLE:
+        return walk_method(cf, method, callback, verbose, input_args)
+
+    events, stop_values, returns_value, returned = summary
+    args = input_args or []
+    results = []
+    arrays = {}
+    def sub(value):
+        return _substitute(value, args, results, arrays)
+
+    try:
+        for event in events:
+            kind, ins, const = event[:3]
+            if kind == "new":
+                result = callback.on_new(ins, const)
+            elif kind == "invoke":
+                result = callback.on_invoke(ins, const, sub(event[3]), [sub(arg) for arg in event[4]])
+            elif kind == "get_field":
+                result = callback.on_get_field(ins, const, sub(event[3]))
+            elif kind == "put_field":
+                result = callback.on_put_field(ins, const, sub(event[3]), sub(event[4]))
+            else:
+                result = callback.on_invokedynamic(ins, const, [sub(arg) for arg in event[3]])
+            results.append(result)
+    except StopIteration:
+        if not returns_value:
+            return None
+        stop_value = stop_values[len(results)]
+        if stop_value is _EMPTY_STACK:
+            # walk_method would pop from the empty stack
+            raise IndexError("pop from empty list")
+        return sub(stop_value)
+
+    return sub(returned)
+
 def get_enum_constants(cf, verbose):
     # Gets enum constants declared in the given class.
     # Consider the following code:
@@ -782,7 +1465,7 @@ def get_enum_constants(cf, verbose):
 
     result = {}
 
-    for ins in cf.methods.find_one(name="<clinit>").code.disassemble():
+    for ins in disassemble(cf.methods.find_one(name="<clinit>")):
         if ins == "new" and enum_class is None:
             const = ins.operands[0]
             enum_class = const.name.value
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# So that the tests can import munch and burger however pytest is run
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
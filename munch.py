@@ -24,21 +24,33 @@ THE SOFTWARE.
 import os
 import sys
 import getopt
+import json
+import copy
+import multiprocessing
+import pickle
+import time
 import urllib
 import traceback
+import socketserver
+import contextlib
 
 try:
-    import json
+    import resource
 except ImportError:
-    import simplejson as json
+    # Not available on Windows
+    resource = None
 
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 
-from jawa.classloader import ClassLoader
 from jawa.transforms import simple_swap, expand_constants
 
 from burger import website
-from burger.roundedfloats import transform_floats
+from burger.cache import ResultCache, jar_hash, run_key, modified_keys, diff, apply_patch
+from burger.classloader import BurgerClassLoader, DEFAULT_CACHE_SIZE
+from burger.output import create_writer, FORMATS
+from burger.roundedfloats import RoundedFloatEncoder
 
 
 def import_toppings():
@@ -80,11 +92,518 @@ def import_toppings():
 
     return toppings
 
+def _rss():
+    """Returns the current resident set size of this process in bytes, or None."""
+    try:
+        with open("/proc/self/statm") as fin:
+            return int(fin.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident set size that the kernel records for this
+    process, returning whether that is supported (only on Linux).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fout:
+            fout.write("5")
+        return True
+    except (IOError, OSError):
+        return False
+
+def _peak_rss():
+    """Returns the peak resident set size since _reset_peak_rss(), in bytes."""
+    with open("/proc/self/status") as fin:
+        for line in fin:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+def _max_rss():
+    """
+    Returns the highest resident set size this process has had since it
+    started, in bytes.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _cpu_time(classloader):
+    """
+    Returns the CPU time used by this process, plus that used by worker
+    processes on the classloader's behalf (e.g. by identify with --jobs).
+    """
+    return time.process_time() + getattr(classloader, "worker_cpu_time", 0.0)
+
+def _start_measurement(classloader):
+    return (time.perf_counter(), _cpu_time(classloader), _rss(), _reset_peak_rss(), classloader.misses)
+
+def _finish_measurement(start, classloader):
+    """
+    Returns the resources used since _start_measurement was called.  Where
+    the peak memory use of just this stretch can't be measured, the peak of
+    the whole process so far is given as max_rss instead.
+    """
+    wall_time, cpu_time, rss, peak_was_reset, classes_loaded = start
+    measurement = {
+        "wall_time": time.perf_counter() - wall_time,
+        "cpu_time": _cpu_time(classloader) - cpu_time,
+        "classes_loaded": classloader.misses - classes_loaded
+    }
+    if rss is not None:
+        measurement["rss_delta"] = _rss() - rss
+        if peak_was_reset:
+            measurement["peak_rss_delta"] = _peak_rss() - rss
+    if "peak_rss_delta" not in measurement:
+        max_rss = _max_rss()
+        if max_rss is not None:
+            measurement["max_rss"] = max_rss
+    return measurement
+
+_plans = {}
+
+def plan_toppings(all_toppings, selected):
+    """
+    Works out the order to run toppings in so that each one runs after the
+    toppings it depends on.  Toppings that provide dependencies of the
+    selected ones are included automatically.
+
+    Plans are remembered, so resolving the same selection again (e.g. for
+    each jar in a batch) is free.
+    """
+    plan_key = tuple(selected)
+    if plan_key in _plans:
+        return list(_plans[plan_key])
+
+    # Index everything that can be provided; the selected toppings take
+    # precedence over any other topping providing the same thing
+    providers = {}
+    for topping in all_toppings.values():
+        for provides in topping.PROVIDES:
+            providers.setdefault(provides, topping)
+    for topping in selected:
+        for provides in topping.PROVIDES:
+            providers[provides] = topping
+
+    # Include missing dependencies
+    included = []
+    dependencies = {}
+    pending = deque(selected)
+    while pending:
+        topping = pending.popleft()
+        if topping in dependencies:
+            continue
+        included.append(topping)
+        dependencies[topping] = set()
+        for dependency in topping.DEPENDS:
+            if dependency not in providers:
+                raise Exception("(%s) requires (%s)" % (topping, dependency))
+            dependencies[topping].add(providers[dependency])
+            pending.append(providers[dependency])
+
+    # Kahn's algorithm, keeping the original order where possible
+    dependents = dict((topping, []) for topping in included)
+    remaining = {}
+    for topping in included:
+        remaining[topping] = len(dependencies[topping])
+        for dependency in dependencies[topping]:
+            dependents[dependency].append(topping)
+
+    ready = deque(topping for topping in included if remaining[topping] == 0)
+    plan = []
+    while ready:
+        topping = ready.popleft()
+        plan.append(topping)
+        for dependent in dependents[topping]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+
+    if len(plan) != len(included):
+        # Everything left is either in a cycle or depends on one; follow
+        # unresolved dependencies until a topping repeats to find the cycle
+        stuck = [topping for topping in included if remaining[topping] > 0]
+        path = [stuck[0]]
+        while True:
+            topping = next(t for t in dependencies[path[-1]] if remaining[t] > 0)
+            if topping in path:
+                cycle = path[path.index(topping):] + [topping]
+                break
+            path.append(topping)
+        raise Exception("Can't resolve dependencies: cycle between %s" %
+                        " -> ".join(_topping_name(topping) for topping in cycle))
+
+    _plans[plan_key] = plan
+    return list(plan)
+
+def _topping_name(topping):
+    return topping.__module__.rsplit(".", 1)[-1]
+
+def topping_options(toppings):
+    """
+    Returns the current values of the OPTIONS of the given toppings.  These
+    are class attributes set from the command line, which worker processes
+    don't inherit unless they are forked, so they are passed along explicitly.
+    """
+    return [(topping, {name: getattr(topping, name) for name in topping.OPTIONS})
+            for topping in toppings if topping.OPTIONS]
+
+def _set_topping_options(options):
+    for topping, values in options:
+        for name, value in values.items():
+            setattr(topping, name, value)
+
+def munch_jar(path, to_be_run, verbose=False, cache_size=DEFAULT_CACHE_SIZE, cache_dir=None, topping_jobs=1, profile=False, classloader=None):
+    """
+    Runs the given (already ordered) toppings against a single jar, and
+    returns the resulting aggregate.
+
+    An existing classloader for the jar can be passed in to reuse the
+    classes and other data it has already loaded.
+
+    If topping_jobs is more than 1, toppings are run in a pool of that many
+    processes as soon as everything they depend on is available.
+
+    If profile is True, the time and memory used by each topping is added to
+    the aggregate under "profile".
+    """
+    if classloader is None:
+        classloader = BurgerClassLoader(path, max_cache_bytes=cache_size, cache_dir=cache_dir, bytecode_transforms=[simple_swap, expand_constants])
+    names = classloader.path_map.keys()
+    num_classes = sum(1 for name in names if name.endswith(".class"))
+
+    aggregate = {
+        "source": {
+            "file": path,
+            "classes": num_classes,
+            "other": len(names),
+            "size": os.path.getsize(path)
+        }
+    }
+
+    # Results of each topping are cached by the jar, the topping's code,
+    # and the runs that provided its dependencies
+    if cache_dir is not None and os.path.isfile(path):
+        cache = ResultCache(cache_dir)
+        jar = jar_hash(path)
+    else:
+        cache = None
+
+    # Maps each provided value to the key of the run that provided it
+    available = {}
+    measurements = {}
+
+    def ready(topping):
+        return all(dep in available for dep in topping.DEPENDS)
+
+    def load_cached(topping):
+        """
+        Applies the cached result of a topping if there is one.  Returns the
+        key its result is (or should be) stored under.
+        """
+        if cache is None:
+            return None, False
+        key = run_key(jar, topping, [available[dep] for dep in topping.DEPENDS])
+        patch = cache.load(jar, _topping_name(topping), key)
+        if patch is None:
+            return key, False
+        if verbose:
+            print("Using cached result for %s" % topping)
+        measurements[_topping_name(topping)] = {"cached": True}
+        apply_patch(aggregate, patch)
+        available.update((provides, key) for provides in topping.PROVIDES)
+        return key, True
+
+    def finished(topping, key, patch):
+        available.update((provides, key) for provides in topping.PROVIDES)
+        if cache is not None:
+            cache.store(jar, _topping_name(topping), key, patch)
+
+    def run(topping, key):
+        """Runs a topping in this process."""
+        nonlocal aggregate
+        orig_aggregate = aggregate.copy()
+        if cache is not None:
+            # Only the parts of the aggregate the topping may change need to
+            # be copied to find out what it changed
+            keys = modified_keys(topping)
+            snapshot = dict((k, copy.deepcopy(v)) for k, v in aggregate.items() if k in keys)
+        start = _start_measurement(classloader)
+        try:
+            topping.act(aggregate, classloader, verbose)
+            measurements[_topping_name(topping)] = _finish_measurement(start, classloader)
+            patch = None
+            if cache is not None:
+                # Anything added at the top level is included too, even if
+                # the topping didn't say it would change it
+                changed = dict((k, v) for k, v in aggregate.items() if k in keys or k not in orig_aggregate)
+                patch = diff(snapshot, changed)
+            finished(topping, key, patch)
+        except:
+            # If the topping failed, don't leave things in an incomplete state
+            if cache is not None:
+                orig_aggregate.update(snapshot)
+            aggregate = orig_aggregate
+            if verbose:
+                print("Failed to run %s" % topping)
+                traceback.print_exc()
+
+    if topping_jobs > 1:
+        pending = list(to_be_run)
+        # Maps the future for each topping running in a worker to its topping and key
+        running = {}
+        broken = False
+
+        with ProcessPoolExecutor(topping_jobs, initializer=_init_topping_worker,
+                                 initargs=(classloader, topping_options(to_be_run))) as pool:
+            while True:
+                # Start every topping whose dependencies are now available
+                started = True
+                while started:
+                    started = False
+                    ready_toppings = [t for t in pending if ready(t)]
+                    for topping in ready_toppings:
+                        pending.remove(topping)
+                        key, loaded = load_cached(topping)
+                        if loaded:
+                            # This may have made other toppings ready
+                            started = True
+                            continue
+                        if broken or (not running and len(ready_toppings) == 1):
+                            # Nothing else can run yet (e.g. identify), so
+                            # don't bother with copying everything to a worker
+                            run(topping, key)
+                            started = True
+                            continue
+                        # The aggregate is pickled now, as it'll keep changing
+                        # while the task is waiting to be sent to a worker
+                        future = pool.submit(_topping_worker, (topping, key, pickle.dumps(aggregate), verbose))
+                        running[future] = (topping, key)
+
+                if not running:
+                    break
+
+                # Merge results as they finish (in the order the toppings
+                # were started, if several finish at once)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in [f for f in running if f in done]:
+                    topping, key = running.pop(future)
+                    try:
+                        _, _, patch, measurement = future.result()
+                    except BrokenProcessPool:
+                        # A worker died (e.g. it was killed for running out of
+                        # memory), taking whatever was running with it; the
+                        # remaining toppings are run in this process instead
+                        broken = True
+                        if verbose:
+                            print("Worker process died while running %s" % topping)
+                        continue
+                    except Exception:
+                        if verbose:
+                            print("Failed to run %s" % topping)
+                            traceback.print_exc()
+                        continue
+                    if patch is not None:
+                        measurements[_topping_name(topping)] = measurement
+                        apply_patch(aggregate, patch)
+                        finished(topping, key, patch)
+
+        if verbose:
+            for topping in pending:
+                missing = [dep for dep in topping.DEPENDS if dep not in available]
+                print("Dependencies failed for %s: Missing %s" % (topping, missing))
+    else:
+        for topping in to_be_run:
+            if not ready(topping):
+                if verbose:
+                    missing = [dep for dep in topping.DEPENDS if dep not in available]
+                    print("Dependencies failed for %s: Missing %s" % (topping, missing))
+                continue
+
+            key, loaded = load_cached(topping)
+            if loaded:
+                continue
+
+            run(topping, key)
+
+    if profile:
+        aggregate["profile"] = measurements
+
+    if verbose:
+        print("Class cache for %s: %s" % (path, classloader.cache_info()))
+        for name, memo in sorted(classloader.memos.items()):
+            print("Cache %s for %s: %s" % (name, path, memo.cache_info()))
+
+    return aggregate
+
+_worker_classloader = None
+
+def _init_topping_worker(classloader, options):
+    global _worker_classloader
+    _worker_classloader = classloader.reopen()
+    _set_topping_options(options)
+    # Pool workers can't start pools of their own (whatever --jobs was)
+    from burger.toppings.identify import IdentifyTopping
+    IdentifyTopping.JOBS = 1
+
+def _topping_worker(args):
+    """
+    Runs a single topping on a private copy of the aggregate, and returns the
+    changes it made (or None if it failed).
+    """
+    topping, key, pickled_aggregate, verbose = args
+    aggregate = pickle.loads(pickled_aggregate)
+    orig_aggregate = pickle.loads(pickled_aggregate)
+    start = _start_measurement(_worker_classloader)
+    try:
+        topping.act(aggregate, _worker_classloader, verbose)
+    except:
+        if verbose:
+            print("Failed to run %s" % topping)
+            traceback.print_exc()
+        return topping, key, None, None
+    measurement = _finish_measurement(start, _worker_classloader)
+    return topping, key, diff(orig_aggregate, aggregate), measurement
+
+def _init_jar_worker(options):
+    _set_topping_options(options)
+    # Pool workers can't start pools of their own (whatever --jobs was)
+    from burger.toppings.identify import IdentifyTopping
+    IdentifyTopping.JOBS = 1
+
+def _munch_jar_worker(args):
+    index, path, to_be_run, verbose, cache_size, cache_dir, profile = args
+    return index, munch_jar(path, to_be_run, verbose, cache_size, cache_dir, profile=profile)
+
+# Number of jars that --serve keeps open (with their caches) between jobs
+SERVE_JARS = 4
+
+class WarmJars(object):
+    """
+    The classloaders of the jars most recently used by --serve, so that
+    later jobs on the same jar reuse the classes, hierarchy, string index and
+    other per-jar caches built by earlier ones.  A jar that has changed on
+    disk since it was opened is opened again.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, cache_dir=None, max_jars=SERVE_JARS):
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.max_jars = max_jars
+        self.jars = OrderedDict()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if path in self.jars:
+            old_signature, classloader = self.jars.pop(path)
+            if old_signature == signature:
+                self.jars[path] = (signature, classloader)
+                return classloader
+
+        classloader = BurgerClassLoader(path, max_cache_bytes=self.cache_size, cache_dir=self.cache_dir, bytecode_transforms=[simple_swap, expand_constants])
+        self.jars[path] = (signature, classloader)
+        while len(self.jars) > self.max_jars:
+            self.jars.popitem(last=False)
+        return classloader
+
+def run_job(job, all_toppings, jars, verbose=False, topping_jobs=1):
+    """
+    Runs a single --serve job, and returns the resulting aggregate.
+
+    A job is a dict with the path of the jar under "jar", and optionally a
+    list of topping names under "toppings" (all toppings are run otherwise)
+    and "profile".
+    """
+    if "jar" not in job:
+        raise Exception("Job has no jar")
+    names = job.get("toppings")
+    if names is None:
+        selected = list(all_toppings.values())
+    else:
+        missing = [name for name in names if name not in all_toppings]
+        if missing:
+            raise Exception("Topping '%s' doesn't exist" % "', '".join(missing))
+        selected = [all_toppings[name] for name in names]
+
+    to_be_run = plan_toppings(all_toppings, selected)
+    classloader = jars.get(job["jar"])
+    return munch_jar(job["jar"], to_be_run, verbose, jars.cache_size, jars.cache_dir,
+                     topping_jobs, job.get("profile", False), classloader)
+
+def serve_jobs(lines, write, all_toppings, jars, verbose=False, topping_jobs=1):
+    """
+    Runs the jobs read from lines (one JSON object per line), writing one
+    line of JSON for each in reply: either {"result": aggregate} or
+    {"error": message}, along with the job's "id" if it had one.
+    """
+    encoder = RoundedFloatEncoder()
+    for line in lines:
+        if not line.strip():
+            continue
+        response = {}
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise Exception("Expected a JSON object")
+            if "id" in job:
+                response["id"] = job["id"]
+            response["result"] = run_job(job, all_toppings, jars, verbose, topping_jobs)
+        except Exception as err:
+            if verbose:
+                traceback.print_exc()
+            response.pop("result", None)
+            response["error"] = str(err)
+        write("".join(encoder.iterencode(response)) + "\n")
+
+def serve(socket_path, all_toppings, verbose=False, cache_size=DEFAULT_CACHE_SIZE, cache_dir=None, topping_jobs=1):
+    """
+    Keeps the toppings loaded and recently used jars open, and runs jobs as
+    they arrive, either from stdin (replying on stdout) or, if socket_path is
+    given, from connections to a Unix socket there.  Jobs are run one at a
+    time, in the order they arrive.
+    """
+    jars = WarmJars(cache_size, cache_dir)
+
+    if socket_path is None:
+        out = sys.stdout
+        def write(response):
+            out.write(response)
+            out.flush()
+        # Anything else printed (e.g. with --verbose) would get mixed in with
+        # the replies, so it goes to stderr instead
+        with contextlib.redirect_stdout(sys.stderr):
+            serve_jobs(sys.stdin, write, all_toppings, jars, verbose, topping_jobs)
+        return
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def write(response):
+                self.wfile.write(response.encode("utf-8"))
+            serve_jobs(self.rfile, write, all_toppings, jars, verbose, topping_jobs)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # Not threaded: jobs share the open jars, so they can't run at once
+    server = socketserver.UnixStreamServer(socket_path, Handler)
+    try:
+        if verbose:
+            print("Listening on %s" % socket_path)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
 if __name__ == "__main__":
     try:
         opts, args = getopt.gnu_getopt(
             sys.argv[1:],
-            "t:o:vd:Dlc",
+            "t:o:vd:Dlcj:p",
             [
                 "toppings=",
                 "output=",
@@ -93,7 +612,19 @@ if __name__ == "__main__":
                 "download-latest",
                 "list",
                 "compact",
-                "url="
+                "url=",
+                "cache-size=",
+                "jobs=",
+                "cache-dir=",
+                "parallel-jars=",
+                "topping-jobs=",
+                "plan",
+                "profile",
+                "ndjson",
+                "format=",
+                "serve",
+                "socket=",
+                "compact-recipes"
             ]
         )
     except getopt.GetoptError as err:
@@ -102,19 +633,31 @@ if __name__ == "__main__":
 
     # Default options
     toppings = None
-    output = sys.stdout
+    output_path = None
     verbose = False
     download_jars = []
     download_latest = False
     list_toppings = False
     compact = False
     url = None
+    cache_size = DEFAULT_CACHE_SIZE
+    jobs = 1
+    cache_dir = None
+    parallel_jars = 1
+    topping_jobs = 1
+    show_plan = False
+    profile = False
+    ndjson = False
+    format = "json"
+    serve_mode = False
+    socket_path = None
+    compact_recipes = False
 
     for o, a in opts:
         if o in ("-t", "--toppings"):
             toppings = a.split(",")
         elif o in ("-o", "--output"):
-            output = open(a, "w")
+            output_path = a
         elif o in ("-v", "--verbose"):
             verbose = True
         elif o in ("-c", "--compact"):
@@ -127,10 +670,48 @@ if __name__ == "__main__":
             list_toppings = True
         elif o in ("-s", "--url"):
             url = a
+        elif o == "--cache-size":
+            # Given in megabytes; 0 disables eviction
+            cache_size = int(a) * 1024 * 1024
+        elif o in ("-j", "--jobs"):
+            jobs = int(a)
+        elif o == "--cache-dir":
+            cache_dir = a
+        elif o == "--parallel-jars":
+            parallel_jars = int(a)
+        elif o == "--topping-jobs":
+            topping_jobs = int(a)
+        elif o in ("-p", "--plan"):
+            show_plan = True
+        elif o == "--profile":
+            profile = True
+        elif o == "--ndjson":
+            ndjson = True
+        elif o == "--format":
+            format = a
+        elif o == "--serve":
+            serve_mode = True
+        elif o == "--socket":
+            serve_mode = True
+            socket_path = a
+        elif o == "--compact-recipes":
+            compact_recipes = True
+
+    if format not in FORMATS:
+        print("Unknown output format '%s' (expected one of %s)" % (format, ", ".join(FORMATS)))
+        sys.exit(1)
+    if FORMATS[format] and (compact or ndjson):
+        print("--compact and --ndjson only apply to JSON output, not --format %s" % format)
+        sys.exit(1)
 
     # Load all toppings
     all_toppings = import_toppings()
 
+    if "identify" in all_toppings:
+        all_toppings["identify"].JOBS = jobs
+    if "recipes" in all_toppings:
+        all_toppings["recipes"].COMPACT = compact_recipes
+
     # List all of the available toppings,
     # as well as their docstring if available.
     if list_toppings:
@@ -140,9 +721,14 @@ if __name__ == "__main__":
                 print(" -- %s\n" % all_toppings[topping].__doc__)
         sys.exit(0)
 
+    # Run jobs as they arrive, rather than the jars given on the command line
+    if serve_mode:
+        serve(socket_path, all_toppings, verbose, cache_size, cache_dir, topping_jobs)
+        sys.exit(0)
+
     # Get the toppings we want
     if toppings is None:
-        loaded_toppings = all_toppings.values()
+        loaded_toppings = list(all_toppings.values())
     else:
         loaded_toppings = []
         for topping in toppings:
@@ -151,60 +737,17 @@ if __name__ == "__main__":
             else:
                 loaded_toppings.append(all_toppings[topping])
 
-    class DependencyNode:
-        def  __init__(self, topping):
-            self.topping = topping
-            self.provides = topping.PROVIDES
-            self.depends = topping.DEPENDS
-            self.childs = []
-
-        def __repr__(self):
-            return str(self.topping)
-
-    # Order topping execution by building dependency tree
-    topping_nodes = []
-    topping_provides = {}
-    for topping in loaded_toppings:
-        topping_node = DependencyNode(topping)
-        topping_nodes.append(topping_node)
-        for provides in topping_node.provides:
-            topping_provides[provides] = topping_node
+    try:
+        to_be_run = plan_toppings(all_toppings, loaded_toppings)
+    except Exception as err:
+        print(str(err))
+        sys.exit(1)
 
-    # Include missing dependencies
-    for topping in topping_nodes:
-        for dependency in topping.depends:
-            if not dependency in topping_provides:
-                for other_topping in all_toppings.values():
-                    if dependency in other_topping.PROVIDES:
-                        topping_node = DependencyNode(other_topping)
-                        topping_nodes.append(topping_node)
-                        for provides in topping_node.provides:
-                            topping_provides[provides] = topping_node
-
-    # Find dependency childs
-    for topping in topping_nodes:
-        for dependency in topping.depends:
-            if not dependency in topping_provides:
-                print("(%s) requires (%s)" % (topping, dependency))
-                sys.exit(1)
-            if not topping_provides[dependency] in topping.childs:
-                topping.childs.append(topping_provides[dependency])
-
-    # Run leaves first
-    to_be_run = []
-    while len(topping_nodes) > 0:
-        stuck = True
-        for topping in topping_nodes:
-            if len(topping.childs) == 0:
-                stuck = False
-                for parent in topping_nodes:
-                    if topping in parent.childs:
-                        parent.childs.remove(topping)
-                to_be_run.append(topping.topping)
-                topping_nodes.remove(topping)
-        if stuck:
-            print("Can't resolve dependencies")
-            sys.exit(1)
+    # Show the order toppings would be run in, without running them
+    if show_plan:
+        for topping in to_be_run:
+            print("%s: %s" % (_topping_name(topping), ", ".join(topping.DEPENDS) or "(no dependencies)"))
+        sys.exit(0)
 
     jarlist = args
 
@@ -223,50 +766,38 @@ if __name__ == "__main__":
         url_path = urllib.urlretrieve(url)[0]
         jarlist.append(url_path)
 
-    summary = []
-
-    for path in jarlist:
-        classloader = ClassLoader(path, max_cache=0, bytecode_transforms=[simple_swap, expand_constants])
-        names = classloader.path_map.keys()
-        num_classes = sum(1 for name in names if name.endswith(".class"))
-
-        aggregate = {
-            "source": {
-                "file": path,
-                "classes": num_classes,
-                "other": len(names),
-                "size": os.path.getsize(path)
-            }
-        }
-
-        available = []
-        for topping in to_be_run:
-            missing = [dep for dep in topping.DEPENDS if dep not in available]
-            if len(missing) != 0:
-                if verbose:
-                    print("Dependencies failed for %s: Missing %s" % (topping, missing))
-                continue
-
-            orig_aggregate = aggregate.copy()
-            try:
-                topping.act(aggregate, classloader, verbose)
-                available.extend(topping.PROVIDES)
-            except:
-                aggregate = orig_aggregate # If the topping failed, don't leave things in an incomplete state
+    binary = FORMATS[format]
+    if output_path is None:
+        output = sys.stdout.buffer if binary else sys.stdout
+    else:
+        output = open(output_path, "wb" if binary else "w")
+
+    # Each jar's results are written as soon as they (and those of the jars
+    # before it) are available, rather than once everything is done
+    writer = create_writer(format, output, compact, ndjson)
+    if parallel_jars > 1:
+        # Each jar is processed in its own worker; results are collected as
+        # they finish but written in the order the jars were given in
+        finished = {}
+        next_index = 0
+        work = [(index, path, to_be_run, verbose, cache_size, cache_dir, profile) for index, path in enumerate(jarlist)]
+        with multiprocessing.Pool(parallel_jars, initializer=_init_jar_worker,
+                                  initargs=(topping_options(to_be_run),)) as pool:
+            for index, aggregate in pool.imap_unordered(_munch_jar_worker, work):
                 if verbose:
-                    print("Failed to run %s" % topping)
-                    traceback.print_exc()
-
-        summary.append(aggregate)
-
-    if not compact:
-        json.dump(transform_floats(summary), output, sort_keys=True, indent=4)
+                    print("Finished %s" % jarlist[index])
+                finished[index] = aggregate
+                while next_index in finished:
+                    writer.write(finished.pop(next_index))
+                    next_index += 1
     else:
-        json.dump(transform_floats(summary), output)
+        for path in jarlist:
+            writer.write(munch_jar(path, to_be_run, verbose, cache_size, cache_dir, topping_jobs, profile))
+    writer.close()
 
     # Cleanup temporary downloads (the URL download is temporary)
     if url:
         os.remove(url_path)
     # Cleanup file output (if used)
-    if output is not sys.stdout:
+    if output_path is not None:
         output.close()
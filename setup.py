@@ -15,6 +15,10 @@ setup(
         'six>=1.4.0',
         'Jawa>=2.2.0,<3'
     ],
+    extras_require={
+        'msgpack': ['msgpack>=1.0'],
+        'cbor': ['cbor2>=5.5']
+    },
     classifiers=[
         "Programming Language :: Python",
         "License :: OSI Approved :: MIT License",
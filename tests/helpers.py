@@ -0,0 +1,60 @@
+"""Builds small classes and jars for the tests."""
+import io
+import zipfile
+
+from jawa.cf import ClassFile
+from jawa.assemble import assemble
+from jawa.transforms import simple_swap, expand_constants
+
+from burger.classloader import BurgerClassLoader
+
+def make_class(name, strings=(), superclass="java/lang/Object", methods=()):
+    """
+    Returns the bytes of a class with the given name.  Each of the strings is
+    loaded (and discarded) by a method "strings"; methods is a list of
+    (name, descriptor, build) tuples, where build(constants) returns the
+    method's instructions.  Those methods are static unless a fourth item,
+    False, is given.
+    """
+    cf = ClassFile.create(name, superclass)
+    if strings:
+        method = cf.methods.create("strings", "()V", code=True)
+        instructions = []
+        for value in strings:
+            instructions.append(("ldc_w", cf.constants.create_string(value)))
+            instructions.append(("pop",))
+        instructions.append(("return",))
+        method.code.max_stack = 1
+        method.code.assemble(assemble(instructions))
+    for method_name, descriptor, build, *static in methods:
+        method = cf.methods.create(method_name, descriptor, code=True)
+        method.access_flags.acc_static = static[0] if static else True
+        method.code.max_stack = 10
+        method.code.max_locals = 10
+        method.code.assemble(assemble(build(cf.constants)))
+    data = io.BytesIO()
+    cf.save(data)
+    return data.getvalue()
+
+def make_jar(path, entries):
+    """
+    Writes a jar containing the given entries (a dict of name to bytes or
+    str), and returns its path as a string.
+    """
+    with zipfile.ZipFile(str(path), "w", zipfile.ZIP_DEFLATED) as jar:
+        for name, data in entries.items():
+            jar.writestr(name, data)
+    return str(path)
+
+_toppings = None
+
+def all_toppings():
+    """Returns munch.import_toppings(), which can only be called once."""
+    global _toppings
+    if _toppings is None:
+        import munch
+        _toppings = munch.import_toppings()
+    return _toppings
+
+def make_classloader(path, cache_dir=None):
+    return BurgerClassLoader(path, cache_dir=cache_dir, bytecode_transforms=[simple_swap, expand_constants])
@@ -0,0 +1,80 @@
+import munch
+
+from burger.cache import modified_keys
+from burger.stringindex import string_index
+from burger.toppings.topping import Topping
+
+from helpers import all_toppings, make_class, make_jar, make_classloader
+
+TOPPINGS = all_toppings()
+
+def identify_plan():
+    return munch.plan_toppings(TOPPINGS, [TOPPINGS["identify"]])
+
+def test_identify_scan_is_cached(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {
+        "a.class": make_class("a", ["Corrupt NBT tag"]),
+        "b.class": make_class("b", ["HANDSHAKING"]),
+        "c.class": make_class("c", ["unrelated"]),
+    })
+    cache_dir = str(tmp_path / "cache")
+
+    cold = munch.munch_jar(jar, identify_plan(), cache_dir=cache_dir, profile=True)
+    assert cold["classes"] == {"nbtcompound": "a", "packet.connectionstate": "b"}
+    assert "cached" not in cold["profile"]["identify"]
+
+    # The warm run must not scan the jar at all
+    warm = munch.munch_jar(jar, identify_plan(), cache_dir=cache_dir, profile=True)
+    assert warm["classes"] == cold["classes"]
+    assert warm["profile"]["identify"] == {"cached": True}
+
+def test_identify_cache_is_per_jar(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = make_jar(tmp_path / "first.jar", {"a.class": make_class("a", ["Corrupt NBT tag"])})
+    second = make_jar(tmp_path / "second.jar", {"b.class": make_class("b", ["Corrupt NBT tag"])})
+
+    assert munch.munch_jar(first, identify_plan(), cache_dir=cache_dir)["classes"] == {"nbtcompound": "a"}
+    assert munch.munch_jar(second, identify_plan(), cache_dir=cache_dir)["classes"] == {"nbtcompound": "b"}
+
+class _CountingTopping(Topping):
+    PROVIDES = ["counting.count"]
+    DEPENDS = ["identify.nbtcompound"]
+    MODIFIES = ["classes"]
+
+    runs = 0
+
+    @staticmethod
+    def act(aggregate, classloader, verbose=False):
+        _CountingTopping.runs += 1
+        aggregate.setdefault("counting", {})["count"] = len(aggregate["classes"])
+        aggregate["classes"]["counting"] = aggregate["classes"]["nbtcompound"]
+        aggregate["extra"] = [1, 2, 3]
+
+def test_topping_changes_are_replayed(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {"a.class": make_class("a", ["Corrupt NBT tag"])})
+    cache_dir = str(tmp_path / "cache")
+    plan = munch.plan_toppings(TOPPINGS, [_CountingTopping])
+
+    cold = munch.munch_jar(jar, plan, cache_dir=cache_dir)
+    warm = munch.munch_jar(jar, plan, cache_dir=cache_dir)
+    assert _CountingTopping.runs == 1
+    assert warm == cold
+    assert cold["counting"] == {"count": 1}
+    assert cold["classes"]["counting"] == "a"
+    assert cold["extra"] == [1, 2, 3]
+
+def test_modified_keys():
+    assert modified_keys(TOPPINGS["identify"]) == {"classes"}
+    assert modified_keys(TOPPINGS["blocks"]) == {"classes", "blocks"}
+    assert modified_keys(TOPPINGS["stats"]) == {"stats", "achievements"}
+
+def test_string_index_from_directory(tmp_path):
+    classes = tmp_path / "classes"
+    classes.mkdir()
+    (classes / "a.class").write_bytes(make_class("a", ["Corrupt NBT tag"]))
+    cache_dir = tmp_path / "cache"
+
+    # Only jar files are cached; a directory is indexed in memory
+    index = string_index(make_classloader(str(classes), cache_dir=str(cache_dir)))
+    assert index.classes_with("Corrupt NBT tag") == ("a",)
+    assert not cache_dir.exists() or not any(cache_dir.iterdir())
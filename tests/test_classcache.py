@@ -0,0 +1,109 @@
+import copy
+
+import pytest
+from jawa.constants import String
+
+from burger.classcache import ClassAnalysisCache
+from burger.toppings.packetinstructions import PacketInstructionsTopping
+
+from helpers import make_class, make_jar, make_classloader
+
+def _write_position(c):
+    # buf.a(this.b), where PacketBuffer.a(Ljd;) isn't a known type
+    return [
+        ("aload_1",),
+        ("aload_0",), ("getfield", c.create_field_ref("pk", "b", "Ljd;")),
+        ("invokevirtual", c.create_method_ref("pb", "a", "(Ljd;)Lpb;")),
+        ("pop",), ("return",),
+    ]
+
+def packets_jar(path):
+    return make_jar(path, {
+        "pb.class": make_class("pb"),
+        "jd.class": make_class("jd"),
+        "pk.class": make_class("pk", methods=[("a", "(Lpb;)V", _write_position, False)]),
+        "pl.class": make_class("pl", methods=[("a", "(Lpb;)V", _write_position, False)]),
+    })
+
+AGGREGATE = {
+    "classes": {
+        "packet.packetbuffer": "pb",
+        "nbtcompound": "nb",
+        "itemstack": "is",
+        "chatcomponent": "cc",
+        "metadata": "md",
+    },
+    "packets": {"packet": {
+        "first": {"class": "pk.class"},
+        "second": {"class": "pl.class"},
+    }},
+}
+
+def run_packetinstructions(jar, cache_dir=None):
+    aggregate = copy.deepcopy(AGGREGATE)
+    PacketInstructionsTopping.act(aggregate, make_classloader(jar, cache_dir=cache_dir))
+    return aggregate
+
+def test_packet_instructions_match_with_cache(tmp_path, monkeypatch):
+    jar = packets_jar(tmp_path / "client.jar")
+    cache_dir = str(tmp_path / "cache")
+
+    expected = run_packetinstructions(jar)
+    # The position class is identified from the first packet using it
+    assert expected["classes"]["position"] == "jd"
+    for packet in expected["packets"]["packet"].values():
+        assert [i["type"] for i in packet["instructions"]] == ["position"]
+
+    assert run_packetinstructions(jar, cache_dir) == expected
+
+    # Every packet's result is reused, setting the position class again
+    def class_operations(*args):
+        raise Exception("Not cached")
+    monkeypatch.setattr(PacketInstructionsTopping, "class_operations", staticmethod(class_operations))
+    assert run_packetinstructions(jar, cache_dir) == expected
+
+def _return(c):
+    return [("return",)]
+
+def _constants_and_methods(classloader, name, computed):
+    computed.append(name)
+    cf = classloader[name]
+    return {
+        "strings": sorted(constant.string.value for constant in cf.constants.find(type_=String)),
+        "methods": sorted(method.name.value for method in cf.methods),
+    }
+
+# The same class in a series of jars, where the obfuscated names change and
+# its string constants and method names sometimes coincide with them
+COLLISIONS = [
+    # (name of the class, other classes, strings, method names, reused)
+    ("a", ["b"], ["b", "hello"], ["b"], False),
+    # Everything renamed consistently, so the result is reused
+    ("c", ["d"], ["d", "hello"], ["d"], True),
+    # The string and method name stay the same, but no longer name a class
+    ("c", ["d"], ["b", "hello"], ["b"], False),
+    # They name the class itself rather than the other class
+    ("c", ["d"], ["c", "hello"], ["c"], False),
+    # They name the class's only reference, which makes this a renaming of the
+    # first jar, whatever else is in the jar
+    ("c", ["d", "e"], ["e", "hello"], ["e"], True),
+    # The string names a class, but a different one from the method name
+    ("c", ["d", "e"], ["e", "hello"], ["d"], False),
+]
+
+@pytest.mark.parametrize("count", range(2, len(COLLISIONS) + 1))
+def test_names_colliding_with_classes(tmp_path, count):
+    cache_dir = str(tmp_path / "cache")
+    for index, (name, others, strings, methods, reused) in enumerate(COLLISIONS[:count]):
+        entries = {other + ".class": make_class(other) for other in others}
+        entries[name + ".class"] = make_class(name, strings, methods=[(method, "()V", _return) for method in methods])
+        jar = make_jar(tmp_path / ("%d.jar" % index), entries)
+
+        expected = _constants_and_methods(make_classloader(jar), name, [])
+        computed = []
+        classloader = make_classloader(jar, cache_dir=cache_dir)
+        cache = ClassAnalysisCache(classloader, "collisions", "1")
+        result = cache.get(name, lambda lookups: _constants_and_methods(classloader, name, computed))
+        assert result == expected
+        if index == count - 1:
+            assert computed == ([] if reused else [name])
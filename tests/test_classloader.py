@@ -0,0 +1,32 @@
+import gc
+import weakref
+
+from burger.util import basic_blocks, disassemble
+
+from helpers import make_class, make_jar, make_classloader
+
+def _return(c):
+    return [("return",)]
+
+def test_evicted_classes_are_not_kept_by_memos(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {
+        "a.class": make_class("a", methods=[("m", "()V", _return)]),
+        "b.class": make_class("b", methods=[("m", "()V", _return)]),
+    })
+    classloader = make_classloader(jar)
+    # Only room for one class at a time
+    classloader.max_cache_bytes = 1
+
+    cf = classloader["a"]
+    method = cf.methods.find_one(name="m")
+    assert disassemble(method) is disassemble(method)
+    basic_blocks(method)
+    ref = weakref.ref(cf)
+    del cf, method
+
+    classloader["b"]
+    gc.collect()
+    assert ref() is None
+    for name in ("disassemble", "basic_blocks"):
+        assert not classloader.memos[name].keys_by_class
+        assert len(classloader.memos[name]) == 0
@@ -0,0 +1,95 @@
+import io
+import zipfile
+
+import pytest
+
+from burger.jarfile import MappedJar, UnsupportedJar, open_jar
+
+from helpers import make_classloader
+
+ENTRIES = [
+    ("META-INF/MANIFEST.MF", b"Manifest-Version: 1.0\r\n"),
+    ("data/", b""),
+    ("data/empty.json", b""),
+    ("data/stone.json", b'{"values": ["stone"]}' * 50),
+    ("a.class", bytes(range(256)) * 4),
+]
+
+def write_zip(output, entries=ENTRIES, comment=b""):
+    with zipfile.ZipFile(output, "w") as jar:
+        for i, (name, data) in enumerate(entries):
+            # Alternate between the supported compression methods
+            compression = zipfile.ZIP_DEFLATED if i % 2 else zipfile.ZIP_STORED
+            jar.writestr(name, data, compress_type=compression)
+        jar.comment = comment
+
+def assert_matches_zipfile(path):
+    jar = MappedJar(path)
+    try:
+        with zipfile.ZipFile(path) as expected:
+            assert jar.namelist() == expected.namelist()
+            for name in expected.namelist():
+                assert name in jar
+                assert jar.read(name) == expected.read(name)
+    finally:
+        jar.close()
+
+def test_plain(tmp_path):
+    path = str(tmp_path / "plain.jar")
+    write_zip(path)
+    assert_matches_zipfile(path)
+
+def test_prefix_and_comment(tmp_path):
+    # e.g. a self-extracting archive, with a comment after the directory
+    data = io.BytesIO()
+    write_zip(data, comment=b"Built by a test")
+    path = tmp_path / "prefixed.jar"
+    path.write_bytes(b"#!/bin/sh\nexec java -jar \"$0\"\n" + data.getvalue())
+    assert_matches_zipfile(str(path))
+
+class _Unseekable(io.RawIOBase):
+    """A file that can only be written to in order, as with a pipe."""
+
+    def __init__(self):
+        self.data = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.data.write(data)
+
+def test_streamed_entries(tmp_path):
+    # Entries written without seeking back have their sizes in a data
+    # descriptor after the data rather than in the local header
+    output = _Unseekable()
+    write_zip(output)
+    path = tmp_path / "streamed.jar"
+    path.write_bytes(output.data.getvalue())
+    with zipfile.ZipFile(str(path)) as jar:
+        assert all(info.flag_bits & 0x8 for info in jar.infolist())
+    assert_matches_zipfile(str(path))
+
+def test_name_encodings(tmp_path):
+    data = io.BytesIO()
+    # zipfile writes non-ASCII names as UTF-8 (and flags them as such); a
+    # cp437 one is made by editing an ASCII name afterwards
+    write_zip(data, ENTRIES + [("lang/café.json", b"{}"), ("lang/cafX.json", b"[]")])
+    path = tmp_path / "names.jar"
+    path.write_bytes(data.getvalue().replace(b"cafX", b"caf\x82"))
+    with zipfile.ZipFile(str(path)) as jar:
+        assert "lang/café.json" in jar.namelist()
+        assert "lang/cafÇ.json" not in jar.namelist()
+    assert_matches_zipfile(str(path))
+
+def test_unsupported_falls_back_to_zipfile(tmp_path):
+    path = str(tmp_path / "bzip2.jar")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_BZIP2) as jar:
+        for name, data in ENTRIES:
+            jar.writestr(name, data)
+    with pytest.raises(UnsupportedJar):
+        open_jar(path)
+
+    classloader = make_classloader(path)
+    assert not isinstance(classloader.path_map["a.class"], MappedJar)
+    assert classloader.read("data/stone.json") == dict(ENTRIES)["data/stone.json"]
@@ -0,0 +1,37 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from burger.output import create_writer, read_msgpack
+from burger.roundedfloats import transform_floats
+
+MUNCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "munch.py")
+
+JARS = [
+    {"blocks": {"block": {"stone": {"hardness": 1.5000000001, "text_id": "stone", "states": []}}}, "version": {"id": "1.20.4"}},
+    {"sounds": ["block.stone.break", 1, True, None], "version": {"id": "1.20.3"}},
+]
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    out = io.BytesIO()
+    writer = create_writer("msgpack", out)
+    for aggregate in JARS:
+        writer.write(aggregate)
+    writer.close()
+
+    expected = json.loads(json.dumps(transform_floats(JARS)))
+    assert list(read_msgpack(io.BytesIO(out.getvalue()))) == expected
+    # Plain msgpack, readable without read_msgpack
+    assert list(msgpack.Unpacker(io.BytesIO(out.getvalue()), raw=False)) == expected
+
+@pytest.mark.parametrize("option", ["--compact", "--ndjson"])
+def test_json_options_rejected_for_binary_formats(option):
+    result = subprocess.run([sys.executable, MUNCH, "--format", "msgpack", option],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    assert result.returncode == 1
+    assert b"only apply to JSON output" in result.stdout
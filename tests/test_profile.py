@@ -0,0 +1,41 @@
+import pytest
+
+import munch
+
+from burger.toppings.topping import Topping
+
+from helpers import all_toppings, make_class, make_jar
+
+TOPPINGS = all_toppings()
+
+def _allocate(size):
+    block = bytearray(size)
+    # Touch every page so that it is actually resident
+    for i in range(0, size, 4096):
+        block[i] = 1
+    return len(block)
+
+class _AllocatingTopping(Topping):
+    PROVIDES = ["allocated"]
+    DEPENDS = []
+
+    SIZE = 0
+
+    @staticmethod
+    def act(aggregate, classloader, verbose=False):
+        aggregate["allocated"] = _allocate(_AllocatingTopping.SIZE)
+
+@pytest.mark.skipif(not munch._reset_peak_rss(), reason="peak RSS can't be reset here")
+def test_peak_rss_is_per_topping(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {"a.class": make_class("a")})
+    plan = munch.plan_toppings(TOPPINGS, [_AllocatingTopping])
+
+    _AllocatingTopping.SIZE = 64 * 1024 * 1024
+    large = munch.munch_jar(jar, plan, profile=True)["profile"]["test_profile"]
+    _AllocatingTopping.SIZE = 16 * 1024 * 1024
+    small = munch.munch_jar(jar, plan, profile=True)["profile"]["test_profile"]
+
+    # The smaller allocation's peak is its own, not the process's so far
+    assert large["peak_rss_delta"] >= 60 * 1024 * 1024
+    assert 12 * 1024 * 1024 <= small["peak_rss_delta"] < 60 * 1024 * 1024
+    assert small["rss_delta"] < 12 * 1024 * 1024
@@ -0,0 +1,25 @@
+import json
+
+from burger.resources import json_resources
+from burger.toppings.tags import TagsTopping
+
+from helpers import make_jar, make_classloader
+
+def test_tags_do_not_share_or_keep_parsed_files(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {
+        "data/minecraft/tags/items/logs.json": json.dumps({"values": ["oak_log", "#minecraft:stripped_logs"]}),
+        "data/minecraft/tags/items/stripped_logs.json": json.dumps({"values": ["stripped_oak_log"]}),
+        "data/minecraft/tags/items/planks.json": json.dumps({"values": ["oak_planks"]}),
+    })
+    classloader = make_classloader(jar)
+    resources = json_resources(classloader)
+
+    aggregate = {}
+    TagsTopping.act(aggregate, classloader)
+    tags = aggregate["tags"]
+    assert tags["items/logs"]["values"] == ["oak_log", "stripped_oak_log"]
+    assert not resources.loaded
+
+    # Changing the output doesn't change what is read for anything else
+    tags["items/planks"]["values"].append("birch_planks")
+    assert resources.load("data/minecraft/tags/items/planks.json") == {"values": ["oak_planks"]}
@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+from burger import roundedfloats
+from burger.output import JsonWriter
+from burger.roundedfloats import RoundedFloatEncoder, transform_floats
+
+AGGREGATE = {
+    "blocks": {"block": {"stone": {"hardness": 1.5000000001, "resistance": 6.0, "text_id": "stone"}}},
+    "entities": {"entity": {"pig": {"width": 0.8999999761581421, "height": 0.8999999761581421, "metadata": [{"index": 0, "default": -1e-07}]}}},
+    "sounds": ["block.stone.break", 1, True, None, ()],
+    "version": {"id": u"1.14 é\n"},
+}
+
+@pytest.fixture(params=["private", "public"])
+def encoder_path(request, monkeypatch):
+    """Runs a test with json's private encoder function, and without it."""
+    if request.param == "private":
+        if roundedfloats._make_iterencode is None:
+            pytest.skip("json.encoder._make_iterencode is not usable here")
+    else:
+        monkeypatch.setattr(roundedfloats, "_make_iterencode", None)
+    return request.param
+
+def test_private_encoder_is_used():
+    # Python versions this has been checked against; the fallback covers others
+    assert roundedfloats._make_iterencode is not None
+
+@pytest.mark.parametrize("kwargs", [{}, {"sort_keys": True, "indent": 4}, {"indent": "\t"}])
+def test_matches_rounded_copy(encoder_path, kwargs):
+    expected = json.dumps(transform_floats(AGGREGATE), **kwargs)
+    assert "".join(RoundedFloatEncoder(**kwargs).iterencode(AGGREGATE)) == expected
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_writer_matches_dump(encoder_path, compact):
+    jars = [AGGREGATE, {"version": {"id": "1.13"}}]
+    out = io.StringIO()
+    writer = JsonWriter(out, compact)
+    for aggregate in jars:
+        writer.write(aggregate)
+    writer.close()
+    if compact:
+        expected = json.dumps(transform_floats(jars))
+    else:
+        expected = json.dumps(transform_floats(jars), sort_keys=True, indent=4)
+    assert out.getvalue() == expected
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+import munch
+
+from burger.toppings.topping import Topping
+
+from helpers import all_toppings, make_class, make_jar
+
+TOPPINGS = all_toppings()
+
+class _DyingTopping(Topping):
+    PROVIDES = ["dying"]
+    DEPENDS = ["identify.nbtcompound"]
+
+    @staticmethod
+    def act(aggregate, classloader, verbose=False):
+        if multiprocessing.parent_process() is not None:
+            # As if the worker had been killed
+            os._exit(1)
+        aggregate["dying"] = True
+
+class _SurvivingTopping(Topping):
+    PROVIDES = ["surviving"]
+    DEPENDS = ["identify.nbtcompound"]
+
+    @staticmethod
+    def act(aggregate, classloader, verbose=False):
+        aggregate["surviving"] = aggregate["classes"]["nbtcompound"]
+
+class _DependentTopping(Topping):
+    PROVIDES = ["dependent"]
+    DEPENDS = ["surviving"]
+
+    @staticmethod
+    def act(aggregate, classloader, verbose=False):
+        aggregate["dependent"] = aggregate["surviving"] + "!"
+
+def _timeout(signum, frame):
+    raise AssertionError("munch_jar hung")
+
+def test_dead_worker_does_not_hang(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {"a.class": make_class("a", ["Corrupt NBT tag"])})
+    plan = munch.plan_toppings(TOPPINGS, [_DyingTopping, _SurvivingTopping, _DependentTopping])
+
+    old_handler = signal.signal(signal.SIGALRM, _timeout)
+    signal.alarm(60)
+    try:
+        aggregate = munch.munch_jar(jar, plan, topping_jobs=2)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, old_handler)
+
+    assert "dying" not in aggregate
+    assert aggregate["classes"] == {"nbtcompound": "a"}
+
+def test_topping_jobs_matches_serial(tmp_path):
+    jar = make_jar(tmp_path / "client.jar", {"a.class": make_class("a", ["Corrupt NBT tag"])})
+    plan = munch.plan_toppings(TOPPINGS, [_SurvivingTopping, _DependentTopping])
+
+    assert munch.munch_jar(jar, plan, topping_jobs=2) == munch.munch_jar(jar, plan)
+
+def _worker_settings(_):
+    from burger.toppings.identify import IdentifyTopping
+    from burger.toppings.recipes import RecipesTopping
+    return RecipesTopping.COMPACT, IdentifyTopping.JOBS
+
+@pytest.mark.parametrize("method", ["spawn", "forkserver"])
+def test_options_reach_workers(monkeypatch, method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip("%s is not available here" % method)
+    recipes = TOPPINGS["recipes"]
+    monkeypatch.setattr(recipes, "COMPACT", True)
+    monkeypatch.setattr(TOPPINGS["identify"], "JOBS", 4)
+    options = munch.topping_options(TOPPINGS.values())
+
+    # Workers that aren't forked re-import the toppings with their defaults
+    context = multiprocessing.get_context(method)
+    with context.Pool(1, initializer=munch._init_jar_worker, initargs=(options,)) as pool:
+        assert pool.map(_worker_settings, [None]) == [(True, 1)]
@@ -0,0 +1,180 @@
+from jawa.assemble import Label
+
+from burger.util import WalkerCallback, walk_method, walk_method_cfg, method_has_loop
+from burger.toppings.blockstates import _direction_calls
+
+from helpers import make_class, make_jar, make_classloader
+
+class Recorder(WalkerCallback):
+    def __init__(self):
+        self.calls = []
+
+    def on_new(self, ins, const):
+        return {"new": const.name.value}
+
+    def on_invoke(self, ins, const, obj, args):
+        name = const.name_and_type.name.value
+        self.calls.append((name, obj, list(args)))
+        return name + "()"
+
+    def on_get_field(self, ins, const, obj):
+        return const.name_and_type.name.value
+
+    def on_put_field(self, ins, const, obj, value):
+        self.calls.append(("put " + const.name_and_type.name.value, obj, [value]))
+
+def load_method(tmp_path, descriptor, build, static=True):
+    jar = make_jar(tmp_path / "test.jar", {"t.class": make_class("t", methods=[("m", descriptor, build, static)])})
+    cf = make_classloader(jar)["t"]
+    return cf, cf.methods.find_one(name="m")
+
+def known(values):
+    """Replaces values that aren't simple constants with "?"."""
+    return [value if isinstance(value, (int, str)) else "?" for value in values]
+
+def test_straight_line_matches_walk_method(tmp_path):
+    def build(c):
+        return [
+            ("new", c.create_class("Foo")), ("dup",), ("ldc_w", c.create_string("a")), ("bipush", 3),
+            ("invokespecial", c.create_method_ref("Foo", "<init>", "(Ljava/lang/String;I)V")),
+            ("astore_0",), ("aload_0",), ("getstatic", c.create_field_ref("Foo", "X", "LFoo;")),
+            ("invokestatic", c.create_method_ref("Foo", "combine", "(LFoo;LFoo;)LFoo;")),
+            ("putstatic", c.create_field_ref("Foo", "Y", "LFoo;")),
+            ("aload_0",), ("areturn",),
+        ]
+    cf, method = load_method(tmp_path, "()LFoo;", build)
+
+    linear = Recorder()
+    linear_result = walk_method(cf, method, linear, False)
+    cfg = Recorder()
+    cfg_result = walk_method_cfg(cf, method, cfg, False)
+    assert cfg.calls == linear.calls
+    assert cfg_result == linear_result == {"new": "Foo"}
+
+def test_branches_merge(tmp_path):
+    def build(c):
+        cond = c.create_method_ref("Foo", "cond", "()Z")
+        reg = c.create_method_ref("Foo", "reg", "(Ljava/lang/String;Ljava/lang/String;)V")
+        return [
+            ("invokestatic", cond), ("ifeq", Label("else")),
+            ("ldc_w", c.create_string("a")), ("ldc_w", c.create_string("same")), ("astore_0",),
+            ("goto", Label("join")),
+            Label("else"),
+            ("ldc_w", c.create_string("b")), ("ldc_w", c.create_string("same")), ("astore_0",),
+            Label("join"),
+            ("aload_0",), ("invokestatic", reg),
+            ("return",),
+        ]
+    cf, method = load_method(tmp_path, "()V", build)
+
+    callback = Recorder()
+    walk_method_cfg(cf, method, callback, False)
+    # Each side is evaluated once, and the value that differs is unknown
+    assert [name for name, _, _ in callback.calls] == ["cond", "reg"]
+    assert known(callback.calls[1][2]) == ["?", "same"]
+
+def test_loops_reach_a_fixed_point(tmp_path):
+    def build(c):
+        reg = c.create_method_ref("Foo", "reg", "(Ljava/lang/String;I)V")
+        advance = c.create_method_ref("Foo", "advance", "(Ljava/lang/String;)Ljava/lang/String;")
+        return [
+            ("ldc_w", c.create_string("start")), ("astore_0",),
+            ("bipush", 0), ("istore_1",),
+            Label("loop"),
+            ("iload_1",), ("bipush", 3), ("if_icmpge", Label("end")),
+            ("ldc_w", c.create_string("x")), ("iload_1",), ("invokestatic", reg),
+            ("aload_0",), ("invokestatic", advance), ("astore_0",),
+            ("iinc", 1, 1),
+            ("goto", Label("loop")),
+            Label("end"),
+            ("aload_0",), ("areturn",),
+        ]
+    cf, method = load_method(tmp_path, "()Ljava/lang/String;", build)
+    assert method_has_loop(method)
+
+    callback = Recorder()
+    result = walk_method_cfg(cf, method, callback, False)
+    # The first iteration, then the state after any number of iterations
+    assert [(name, known(args)) for name, _, args in callback.calls] == [
+        ("reg", ["x", 0]), ("advance", ["start"]),
+        ("reg", ["x", "?"]), ("advance", ["?"]),
+    ]
+    # Not just the value from before the loop
+    assert known([result]) == ["?"]
+
+def test_stack_shuffles(tmp_path):
+    def build(c):
+        three = c.create_method_ref("Foo", "three", "(III)V")
+        wide = c.create_method_ref("Foo", "wide", "(JJ)V")
+        return [
+            # pop2 of a long, then of two ints
+            ("lconst_1",), ("pop2",),
+            ("bipush", 1), ("bipush", 2), ("pop2",),
+            # 1 2 3 -> swap -> 1 3 2
+            ("bipush", 1), ("bipush", 2), ("bipush", 3), ("swap",), ("invokestatic", three),
+            # 1 2 -> dup_x1 -> 2 1 2
+            ("bipush", 1), ("bipush", 2), ("dup_x1",), ("invokestatic", three),
+            # 1 2 -> dup2 -> 1 2 1 2, then pop
+            ("bipush", 1), ("bipush", 2), ("dup2",), ("pop",), ("invokestatic", three),
+            # A long duplicated by dup2
+            ("lconst_1",), ("dup2",), ("invokestatic", wide),
+            ("return",),
+        ]
+    cf, method = load_method(tmp_path, "()V", build)
+
+    callback = Recorder()
+    walk_method_cfg(cf, method, callback, False)
+    assert [(name, args) for name, _, args in callback.calls] == [
+        ("three", [1, 3, 2]),
+        ("three", [2, 1, 2]),
+        ("three", [1, 2, 1]),
+        ("wide", [1, 1]),
+    ]
+
+def _registration_class(loops):
+    def build(c):
+        container = c.create_method_ref("Container", "add", "([LProp;)LContainer;")
+        if not loops:
+            return [
+                ("aload_0",), ("aload_1",),
+                ("invokespecial", c.create_method_ref("Base", "registerStates", "(LContainer;)V")),
+                ("aload_1",), ("bipush", 1), ("anewarray", c.create_class("Prop")), ("dup",), ("bipush", 0),
+                ("getstatic", c.create_field_ref("t", "AGE", "LProp;")), ("aastore",),
+                ("invokevirtual", container), ("pop",),
+                ("return",),
+            ]
+        return [
+            ("getstatic", c.create_field_ref("t", "VALUES", "[LDir;")), ("astore_2",),
+            ("aload_2",), ("arraylength",), ("istore_3",),
+            ("bipush", 0), ("istore", 4),
+            Label("loop"),
+            ("iload", 4), ("iload_3",), ("if_icmpge", Label("end")),
+            ("aload_2",), ("iload", 4), ("aaload",), ("astore", 5),
+            ("aload_0",), ("aload", 5),
+            ("invokevirtual", c.create_method_ref("t", "useDirection", "(LDir;)Z")),
+            ("ifeq", Label("next")),
+            ("aload_1",), ("bipush", 1), ("anewarray", c.create_class("Prop")), ("dup",), ("bipush", 0),
+            ("aload", 5), ("invokestatic", c.create_method_ref("t", "getProperty", "(LDir;)LProp;")),
+            ("aastore",), ("invokevirtual", container), ("pop",),
+            Label("next"),
+            ("iinc", 4, 1),
+            ("goto", Label("loop")),
+            Label("end"),
+            ("return",),
+        ]
+    return ("registerStates", "(LContainer;)V", build, False)
+
+def test_direction_calls(tmp_path):
+    jar = make_jar(tmp_path / "test.jar", {
+        "t.class": make_class("t", methods=[_registration_class(True)]),
+        "u.class": make_class("u", methods=[_registration_class(False)]),
+    })
+    classloader = make_classloader(jar)
+
+    cf = classloader["t"]
+    use_direction, get_property = _direction_calls(cf, cf.methods.find_one(name="registerStates"), False)
+    assert use_direction.name_and_type.name.value == "useDirection"
+    assert get_property.name_and_type.name.value == "getProperty"
+
+    cf = classloader["u"]
+    assert _direction_calls(cf, cf.methods.find_one(name="registerStates"), False) is None
@@ -0,0 +1,74 @@
+from burger.util import WalkerCallback, walk_method, walk_method_summarized
+
+from helpers import make_class, make_jar, make_classloader
+
+class StoppingCallback(WalkerCallback):
+    """Records callbacks, raising StopIteration on the given one."""
+
+    def __init__(self, stop_at=None):
+        self.stop_at = stop_at
+        self.calls = []
+
+    def _call(self, *call):
+        if len(self.calls) == self.stop_at:
+            raise StopIteration()
+        self.calls.append(call)
+        return {"result": len(self.calls)}
+
+    def on_new(self, ins, const):
+        return self._call("new", const.name.value)
+
+    def on_invoke(self, ins, const, obj, args):
+        return self._call("invoke", const.name_and_type.name.value, obj, list(args))
+
+    def on_get_field(self, ins, const, obj):
+        return self._call("get", const.name_and_type.name.value, obj)
+
+    def on_put_field(self, ins, const, obj, value):
+        self._call("put", const.name_and_type.name.value, obj, value)
+
+def _outcome(walker, cf, method, callback, sound):
+    try:
+        return ("returned", walker(cf, method, callback, False, [sound]))
+    except IndexError:
+        # Stopping with nothing on the stack of a value-returning method
+        return ("raised", IndexError)
+
+def _builder(c):
+    props = "LProps;"
+    return [
+        ("new", c.create_class("Props")), ("dup",),
+        ("invokespecial", c.create_method_ref("Props", "<init>", "()V")),
+        ("aload_0",), ("invokevirtual", c.create_method_ref("Props", "sound", "(LSound;)" + props)),
+        ("ldc_w", c.create_float(1.5)), ("invokevirtual", c.create_method_ref("Props", "strength", "(F)" + props)),
+        ("getstatic", c.create_field_ref("Colors", "RED", "LColor;")),
+        ("invokevirtual", c.create_method_ref("Props", "color", "(LColor;)" + props)),
+        ("areturn",),
+    ]
+
+def _void_helper(c):
+    return [
+        ("aload_0",), ("bipush", 2), ("invokestatic", c.create_method_ref("Reg", "add", "(LSound;I)V")),
+        ("aload_0",), ("putstatic", c.create_field_ref("Reg", "LAST", "LSound;")),
+        ("return",),
+    ]
+
+def test_summaries_match_walk_method(tmp_path):
+    jar = make_jar(tmp_path / "test.jar", {"t.class": make_class("t", methods=[
+        ("builder", "(LSound;)LProps;", _builder),
+        ("helper", "(LSound;)V", _void_helper),
+    ])})
+    cf = make_classloader(jar)["t"]
+
+    for name in ("builder", "helper"):
+        method = cf.methods.find_one(name=name)
+        # Stopping at each callback in turn, and not at all; the summary is
+        # reused after the first of these
+        for stop_at in [None, 0, 1, 2, 3, 4, 5]:
+            for sound in ("stone", {"sound": "wood"}):
+                plain = StoppingCallback(stop_at)
+                plain_result = _outcome(walk_method, cf, method, plain, sound)
+                summarized = StoppingCallback(stop_at)
+                summarized_result = _outcome(walk_method_summarized, cf, method, summarized, sound)
+                assert summarized.calls == plain.calls, (name, stop_at)
+                assert summarized_result == plain_result, (name, stop_at)